@@ -91,6 +91,9 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = Column(DateTime)
     
+    # با هر تغییر نقش‌ها یا غیرفعال شدن کاربر افزایش می‌یابد (باطل شدن مجوزهای داخل token)
+    role_version = Column(Integer, default=0, nullable=False)
+    
     # Relations
     roles = relationship("Role", secondary=user_roles, back_populates="users")
     
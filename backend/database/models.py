@@ -1,5 +1,5 @@
 # database/models.py
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index, UniqueConstraint, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
@@ -74,8 +74,72 @@ class SMSLog(Base):
     is_successful = Column(Boolean, default=True)
     error_message = Column(Text)
     
+    # لاگ‌های جدید متن کامل را ذخیره نمی‌کنند: قالب + پارامترها (JSON)
+    template_id = Column(Integer, ForeignKey('sms_templates.id'), nullable=True)
+    params = Column(Text)
+    
     order = relationship("Order", back_populates="sms_logs")
 
+    __table_args__ = (
+        # جستجوی «پیامک موفق برای این سفارش» در /sms/ready-orders
+        Index('ix_sms_logs_order_success', 'order_id', 'is_successful'),
+    )
+
+
+class SMSTemplate(Base):
+    """نسخه‌های قالب پیامک (متن هر نسخه فقط یک بار ذخیره می‌شود)"""
+    __tablename__ = 'sms_templates'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), nullable=False, index=True)
+    version = Column(Integer, nullable=False, default=1)
+    body = Column(Text, nullable=False)  # شامل {greeting} و {tracking_code}
+    greeting = Column(Text, nullable=False)  # شامل {customer_name}
+    default_greeting = Column(Text, nullable=False)  # وقتی نام مشتری خالی است
+    content_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('name', 'version', name='uq_sms_templates_name_version'),
+    )
+
+
+class SMSOutbox(Base):
+    """صف ارسال پیامک - ردیف‌ها توسط worker پس‌زمینه ارسال می‌شوند"""
+    __tablename__ = 'sms_outbox'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_id = Column(String(32), nullable=False, index=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False, index=True)
+    tracking_code = Column(String(50))
+    phone_number = Column(String(20))
+    message = Column(Text)
+    template_id = Column(Integer, ForeignKey('sms_templates.id'), nullable=True)
+    params = Column(Text)
+    dry_run = Column(Boolean, default=False)
+    status = Column(String(20), default='queued', index=True)  # queued, sending, sent, failed
+    attempts = Column(Integer, default=0)
+    provider = Column(String(50))  # ارائه‌دهنده‌ای که آخرین بار ارسال کرد
+    error_message = Column(Text)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    # worker ارسال‌کننده و شناسه برداشت (برای جلوگیری از ارسال تکراری بین چند پروسه)
+    claimed_by = Column(String(64))
+    claim_token = Column(String(32))
+    claimed_at = Column(DateTime)
+    sms_log_id = Column(Integer, ForeignKey('sms_logs.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class SentTrackingCode(Base):
+    """کدهای رهگیری که پیامکشان ارسال شده (مشترک بین Streamlit و backend)"""
+    __tablename__ = 'sent_tracking_codes'
+
+    tracking_code = Column(String(50), primary_key=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=True)
+    source = Column(String(20))  # streamlit, backend, import
+    sent_at = Column(DateTime, default=datetime.utcnow)
+
 
 class SenderProfile(Base):
     """پروفایل‌های فرستنده"""
@@ -91,6 +155,38 @@ class SenderProfile(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class TrackingExtraction(Base):
+    """نتایج استخراج رسید پستی (کش بر اساس هش محتوای PDF)"""
+    __tablename__ = 'tracking_extractions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    file_hash = Column(String(64), unique=True, nullable=False, index=True)  # SHA-256
+    filename = Column(String(500))
+    pages = Column(Integer, default=0)
+    extractor_version = Column(String(20))
+    results = Column(Text)  # JSON: [{order_code, tracking_code}, ...]
+    results_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class TrackingPush(Base):
+    """وضعیت ارسال کد رهگیری به پنل فروشنده دیجی‌کالا (برای هر محموله)"""
+    __tablename__ = 'tracking_pushes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    shipment_id = Column(String(50), unique=True, nullable=False, index=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=True)
+    tracking_code = Column(String(50))
+    status = Column(String(20), default='pending')  # pending, accepted, rejected, failed
+    attempts = Column(Integer, default=0)
+    last_status_code = Column(Integer)
+    error_message = Column(Text)
+    accepted_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Product(Base):
     """محصولات موجود در انبار"""
     __tablename__ = 'products_old'
@@ -123,10 +219,63 @@ class Invoice(Base):
 
 # ============= Database Setup =============
 
+# ستون‌هایی که بعد از ساخت اولیه جدول اضافه شده‌اند
+ADDED_COLUMNS = {
+    'users': [
+        ('role_version', 'INTEGER NOT NULL DEFAULT 0'),
+    ],
+    'sms_logs': [
+        ('template_id', 'INTEGER REFERENCES sms_templates(id)'),
+        ('params', 'TEXT'),
+    ],
+}
+
+_upgraded_databases = set()
+
+
+def ensure_columns(engine):
+    """
+    افزودن ستون‌های جدید به جداول موجود
+
+    create_all برای جدولی که از قبل وجود دارد ستون جدید اضافه نمی‌کند.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            for column_name, column_type in columns:
+                if column_name not in existing:
+                    connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}'))
+                    print(f"🔧 ستون {table_name}.{column_name} اضافه شد")
+
+
+def ensure_indexes(engine):
+    """
+    ایجاد ایندکس‌های جدید روی جداول موجود
+
+    create_all برای جدولی که از قبل وجود دارد ایندکس جدید نمی‌سازد.
+    """
+    for index in SMSLog.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def upgrade_schema(engine):
+    """ستون‌ها و ایندکس‌های جدید (یک بار برای هر دیتابیس در هر پروسه)"""
+    key = str(engine.url)
+    if key in _upgraded_databases:
+        return
+    ensure_columns(engine)
+    ensure_indexes(engine)
+    _upgraded_databases.add(key)
+
+
 def init_database(db_path="sales.db"):
     """ایجاد دیتابیس و جداول"""
     engine = create_engine(f'sqlite:///{db_path}', echo=False)
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
     return engine
 
 
@@ -5,10 +5,12 @@
 
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, DateTime, Text, 
-    ForeignKey, Enum as SQLEnum, CheckConstraint
+    ForeignKey, Enum as SQLEnum, CheckConstraint, case, func, update
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional
 import enum
 
 from database.models import Base
@@ -280,15 +282,77 @@ class StockTakeItem(Base):
         return f"<StockTakeItem(product_id={self.product_id}, diff={self.difference})>"
 
 
-# ========== Helper Functions ==========
+class SequenceCounter(Base):
+    """شمارنده‌های شماره‌گذاری (یک ردیف برای هر پیشوند و روز، مثلاً TRX-20250101)"""
+    __tablename__ = "sequence_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SequenceCounter(name='{self.name}', value={self.value})>"
 
-def generate_transaction_number():
-    """تولید شماره یکتا برای تراکنش"""
-    from datetime import datetime
-    return f"TRX-{datetime.now().strftime('%Y%m%d%H%M%S')}"
 
+# ========== Helper Functions ==========
 
-def generate_stock_take_number():
-    """تولید شماره یکتا برای انبارگردانی"""
-    from datetime import datetime
-    return f"ST-{datetime.now().strftime('%Y%m%d%H%M%S')}"
\ No newline at end of file
+def next_sequence_value(session, name: str) -> int:
+    """
+    افزایش شمارنده name و برگرداندن مقدار جدید
+
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING در تراکنش خود session اجرا
+    می‌شود؛ ردیف شمارنده تا commit قفل می‌ماند، بنابراین دو تراکنش همزمان
+    شماره یکسان نمی‌گیرند و با rollback تراکنش شماره هم آزاد می‌شود.
+    """
+    table = SequenceCounter.__table__
+    now = datetime.utcnow()
+    stmt = sqlite_insert(table).values(name=name, value=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"value": table.c.value + 1, "updated_at": now}
+    ).returning(table.c.value)
+    return session.execute(stmt).scalar_one()
+
+
+def _next_number(session, prefix: str) -> str:
+    """شماره یکتای روزانه مثل TRX-20250101-000001 (در تراکنش session)"""
+    today = datetime.now().strftime('%Y%m%d')
+    value = next_sequence_value(session, f"{prefix}-{today}")
+    return f"{prefix}-{today}-{value:06d}"
+
+
+def apply_stock_change(session, product_id: int, delta: int, allow_negative: bool = False) -> Optional[int]:
+    """
+    تغییر اتمی موجودی محصول با یک UPDATE شرطی
+
+    موجودی جدید در خود دیتابیس محاسبه می‌شود، بنابراین دو تراکنش همزمان روی
+    یک محصول نمی‌توانند تغییر یکدیگر را بازنویسی کنند یا هر دو از چک موجودی
+    کافی عبور کنند. ثبت تراکنش انبار باید در همان session و قبل از commit
+    انجام شود.
+
+    Returns:
+        موجودی بعد از تغییر، یا None اگر محصول وجود ندارد یا موجودی کافی نیست
+    """
+    # UPDATE در سطح جدول (Core) تا ORM ستون دیگری به RETURNING اضافه نکند
+    products = WarehouseProduct.__table__
+    stock = func.coalesce(products.c.stock_quantity, 0)
+    new_stock = stock + delta
+    available = new_stock - func.coalesce(products.c.reserved_quantity, 0)
+
+    stmt = update(products).where(products.c.id == product_id)
+    if not allow_negative:
+        stmt = stmt.where(new_stock >= 0)
+
+    row = session.execute(
+        stmt.values(
+            stock_quantity=new_stock,
+            available_quantity=case((available > 0, available), else_=0),
+            last_stock_update=datetime.utcnow()
+        ).returning(products.c.stock_quantity)
+    ).first()
+    return row[0] if row else None
+
+
+def generate_transaction_number(session):
+    """تولید شماره یکتا برای تراکنش"""
+    return _next_number(session, "TRX")
@@ -12,7 +12,7 @@ import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 # ==================== Import همه Models ====================
-from database.models import Order, OrderItem, Base
+from database.models import Order, OrderItem, Base, upgrade_schema
 from database.auth_models import User
 
 # 🔥 CRITICAL: Import کردن تمام مدل‌های warehouse برای register شدن در Base
@@ -38,6 +38,7 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 🔥 ایجاد تمام جداول (شامل warehouse)
 print("🔨 ایجاد جداول...")
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 print("✅ تمام جداول ایجاد شدند\n")
 
 def test_db():
@@ -68,6 +69,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Extraction-Id", "X-Extraction-Cached", "X-Total-Count", "X-Has-More"],
 )
 
 def get_db():
@@ -130,8 +132,63 @@ try:
 except Exception as e:
     print(f"❌ sender_profiles router: {e}")
 
+# 📱 SMS Router
+try:
+    from routers import sms
+    app.include_router(sms.router, prefix="/api", tags=["sms"])
+    print("✅ sms router loaded")
+except Exception as e:
+    print(f"❌ sms router: {e}")
+
 print("✅ تمام routers بارگذاری شدند\n")
 
+# ==================== Lifecycle ====================
+@app.on_event("startup")
+async def start_workers():
+    """شروع worker صف ارسال پیامک، بررسی دوره‌ای سلامت ارائه‌دهندگان و worker لاگ فعالیت"""
+    try:
+        from services.sms_providers import start_health_monitor
+        from services.sms_service import start_outbox_worker
+        start_health_monitor()
+        start_outbox_worker()
+    except Exception as e:
+        print(f"⚠️ خطا در شروع worker پیامک: {e}")
+
+    try:
+        from services.audit_log import start_audit_writer
+        start_audit_writer()
+    except Exception as e:
+        print(f"⚠️ خطا در شروع worker لاگ فعالیت: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """توقف workerهای پیامک و لاگ فعالیت و بستن poolهای استخراج رسید و هش رمز عبور"""
+    try:
+        from services.sms_providers import stop_health_monitor
+        from services.sms_service import stop_outbox_worker
+        await stop_outbox_worker()
+        await stop_health_monitor()
+    except Exception as e:
+        print(f"⚠️ خطا در توقف worker پیامک: {e}")
+
+    try:
+        from services.audit_log import stop_audit_writer
+        await stop_audit_writer()
+    except Exception as e:
+        print(f"⚠️ خطا در توقف worker لاگ فعالیت: {e}")
+
+    try:
+        from utils.receipt_extractor import shutdown_process_pool
+        shutdown_process_pool()
+    except Exception as e:
+        print(f"⚠️ خطا در بستن process pool: {e}")
+
+    try:
+        from services.password_hashing import shutdown_hash_executor
+        shutdown_hash_executor()
+    except Exception as e:
+        print(f"⚠️ خطا در بستن thread pool هش رمز عبور: {e}")
+
 # ==================== Routes ====================
 @app.get("/")
 def root():
@@ -172,6 +229,7 @@ def root():
             "warehouses": "/api/warehouse/warehouses",
             "labels": "/api/labels",
             "tracking": "/api/tracking",
+            "sms": "/api/sms",
             "docs": "/docs"
         }
     }
@@ -1,15 +1,20 @@
 # backend/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from database.models import get_session, init_database
-from database.auth_models import User, Role, Permission, AuditLog
+from database.auth_models import User, Role, Permission
+from services.auth_cache import (
+    AUTH_EMBED_PERMISSIONS, PERMISSION_BITS, Principal, bump_role_version, get_principal,
+    invalidate_user, load_principal, permission_claims, principal_from_claims
+)
+from services.password_hashing import hash_password, verify_password
+from services.audit_log import audit_writer
 import os
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -19,7 +24,6 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 ساعت
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 # ========== Database Dependency ==========
@@ -81,16 +85,6 @@ class AssignRolesRequest(BaseModel):
 
 
 # ========== توابع کمکی ==========
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """چک کردن رمز عبور"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    """هش کردن رمز عبور"""
-    return pwd_context.hash(password)
-
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """ایجاد JWT token"""
     to_encode = data.copy()
@@ -103,21 +97,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    """احراز هویت کاربر"""
+def load_users_with_roles(db: Session):
+    """کوئری کاربران به همراه نقش‌ها و مجوزها (selectinload - تعداد کوئری ثابت)"""
+    return db.query(User).options(
+        selectinload(User.roles).selectinload(Role.permissions)
+    )
+
+
+def build_user_response(user: User, role_permissions: dict) -> UserResponse:
+    """
+    ساخت UserResponse
+
+    Args:
+        role_permissions: کش نام مجوزهای هر نقش (role.id -> frozenset) که بین کاربران مشترک است
+    """
+    permissions = set()
+    for role in user.roles:
+        if role.id not in role_permissions:
+            role_permissions[role.id] = frozenset(perm.name for perm in role.permissions)
+        permissions |= role_permissions[role.id]
+    
+    return UserResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        phone=user.phone,
+        is_active=user.is_active,
+        is_superuser=user.is_superuser,
+        created_at=user.created_at,
+        last_login=user.last_login,
+        roles=[role.name for role in user.roles],
+        permissions=list(permissions)
+    )
+
+
+async def authenticate_user(db: Session, username: str, password: str):
+    """احراز هویت کاربر (bcrypt در thread pool اجرا می‌شود)"""
     user = db.query(User).filter(User.username == username).first()
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    verified, new_hash = await verify_password(password, user.password_hash)
+    if not verified:
         return False
+    if new_hash:
+        # هش با تنظیمات قدیمی ساخته شده - همراه با last_login ذخیره می‌شود
+        user.password_hash = new_hash
     return user
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
-    """دریافت کاربر فعلی از token"""
+) -> Principal:
+    """دریافت کاربر فعلی از token (از کش services/auth_cache.py)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="اعتبار سنجی نشد",
@@ -132,19 +165,22 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    # token با مجوزهای معتبر بدون خواندن نقش‌ها پذیرفته می‌شود
+    principal = principal_from_claims(db, payload) if AUTH_EMBED_PERMISSIONS else None
+    if principal is None:
+        principal = get_principal(db, token_data.username)
+    if principal is None:
         raise credentials_exception
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(status_code=400, detail="کاربر غیرفعال است")
     
-    return user
+    return principal
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """دریافت کاربر فعال"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="کاربر غیرفعال")
@@ -154,8 +190,13 @@ async def get_current_active_user(
 def check_permission(permission: str):
     """دکوراتور چک کردن مجوز"""
     async def permission_checker(
-        current_user: User = Depends(get_current_user)
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_db)
     ):
+        # مجوزهای خارج از PermissionType در bitmask token نیستند
+        if (AUTH_EMBED_PERMISSIONS and permission not in PERMISSION_BITS
+                and not current_user.has_permission(permission)):
+            current_user = get_principal(db, current_user.username) or current_user
         if not current_user.has_permission(permission):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -166,7 +207,6 @@ def check_permission(permission: str):
 
 
 def log_audit(
-    db: Session,
     user_id: int,
     action: str,
     entity_type: str = None,
@@ -174,8 +214,8 @@ def log_audit(
     details: str = None,
     ip_address: str = None
 ):
-    """ثبت لاگ فعالیت"""
-    log = AuditLog(
+    """ثبت لاگ فعالیت (در صف worker لاگ، services/audit_log.py)"""
+    audit_writer.log(
         user_id=user_id,
         action=action,
         entity_type=entity_type,
@@ -183,8 +223,6 @@ def log_audit(
         details=details,
         ip_address=ip_address
     )
-    db.add(log)
-    db.commit()
 
 
 # ========== Endpoints ==========
@@ -195,7 +233,7 @@ async def login(
     db: Session = Depends(get_db)
 ):
     """ورود کاربر"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -208,43 +246,40 @@ async def login(
     db.commit()
     
     # ثبت لاگ
-    log_audit(db, user.id, "login", details="ورود موفق")
+    log_audit(user.id, "login", details="ورود موفق")
+    
+    token_data = {"sub": user.username}
+    if AUTH_EMBED_PERMISSIONS and user.is_active:
+        # مجوزها از دیتابیس خوانده می‌شوند نه از کش؛ نسخه نقش قبل از مجوزها خوانده
+        # می‌شود تا تغییر همزمان نقش‌ها در بدترین حالت فقط token را باطل کند
+        role_version = user.role_version or 0
+        token_data.update(permission_claims(load_principal(db, user.username), role_version))
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=token_data, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(
-    current_user: User = Depends(get_current_active_user)
+    principal: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """دریافت اطلاعات کاربر فعلی"""
-    return UserResponse(
-        id=current_user.id,
-        username=current_user.username,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        phone=current_user.phone,
-        is_active=current_user.is_active,
-        is_superuser=current_user.is_superuser,
-        created_at=current_user.created_at,
-        last_login=current_user.last_login,
-        roles=[role.name for role in current_user.roles],
-        permissions=list(set([
-            perm.name 
-            for role in current_user.roles 
-            for perm in role.permissions
-        ]))
-    )
+    current_user = load_users_with_roles(db).filter(User.id == principal.id).first()
+    if current_user is None:
+        invalidate_user(principal.username)
+        raise HTTPException(status_code=404, detail="کاربر یافت نشد")
+    
+    return build_user_response(current_user, {})
 
 
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     user_data: UserCreate,
-    current_user: User = Depends(check_permission("users_create")),
+    current_user: Principal = Depends(check_permission("users_create")),
     db: Session = Depends(get_db)
 ):
     """ثبت‌نام کاربر جدید (فقط توسط ادمین)"""
@@ -261,7 +296,7 @@ async def register_user(
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await hash_password(user_data.password),
         phone=user_data.phone,
         is_active=True,
         is_superuser=False
@@ -273,7 +308,6 @@ async def register_user(
     
     # ثبت لاگ
     log_audit(
-        db, 
         current_user.id, 
         "create_user", 
         "user", 
@@ -298,39 +332,22 @@ async def register_user(
 
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
-    current_user: User = Depends(check_permission("users_view")),
+    current_user: Principal = Depends(check_permission("users_view")),
     db: Session = Depends(get_db)
 ):
     """دریافت لیست تمام کاربران"""
-    users = db.query(User).all()
+    users = load_users_with_roles(db).all()
     
-    return [
-        UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            phone=user.phone,
-            is_active=user.is_active,
-            is_superuser=user.is_superuser,
-            created_at=user.created_at,
-            last_login=user.last_login,
-            roles=[role.name for role in user.roles],
-            permissions=list(set([
-                perm.name 
-                for role in user.roles 
-                for perm in role.permissions
-            ]))
-        )
-        for user in users
-    ]
+    # مجوزهای هر نقش فقط یک بار محاسبه می‌شود
+    role_permissions = {}
+    return [build_user_response(user, role_permissions) for user in users]
 
 
 @router.post("/users/{user_id}/assign-roles")
 async def assign_roles_to_user(
     user_id: int,
     request: AssignRolesRequest,
-    current_user: User = Depends(check_permission("users_assign_roles")),
+    current_user: Principal = Depends(check_permission("users_assign_roles")),
     db: Session = Depends(get_db)
 ):
     """تخصیص نقش به کاربر"""
@@ -347,11 +364,12 @@ async def assign_roles_to_user(
         if role:
             user.roles.append(role)
     
+    bump_role_version(db, [user.id])
     db.commit()
+    invalidate_user(user.username)
     
     # ثبت لاگ
     log_audit(
-        db,
         current_user.id,
         "assign_roles",
         "user",
@@ -364,11 +382,11 @@ async def assign_roles_to_user(
 
 @router.get("/roles")
 async def get_all_roles(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """دریافت لیست تمام نقش‌ها"""
-    roles = db.query(Role).all()
+    roles = db.query(Role).options(selectinload(Role.permissions)).all()
     
     return [
         {
@@ -392,7 +410,7 @@ async def get_all_roles(
 
 @router.get("/permissions")
 async def get_all_permissions(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """دریافت لیست تمام مجوزها"""
@@ -416,7 +434,7 @@ async def get_all_permissions(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    current_user: User = Depends(check_permission("users_edit")),
+    current_user: Principal = Depends(check_permission("users_edit")),
     db: Session = Depends(get_db)
 ):
     """به‌روزرسانی کاربر"""
@@ -442,14 +460,16 @@ async def update_user(
         user.phone = user_data.phone
     
     if user_data.is_active is not None:
+        if bool(user.is_active) != user_data.is_active:
+            bump_role_version(db, [user.id])
         user.is_active = user_data.is_active
     
     user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_user(user.username)
     
     # ثبت لاگ
     log_audit(
-        db,
         current_user.id,
         "update_user",
         "user",
@@ -463,7 +483,7 @@ async def update_user(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(check_permission("users_delete")),
+    current_user: Principal = Depends(check_permission("users_delete")),
     db: Session = Depends(get_db)
 ):
     """حذف کاربر"""
@@ -480,10 +500,10 @@ async def delete_user(
     username = user.username
     db.delete(user)
     db.commit()
+    invalidate_user(username)
     
     # ثبت لاگ
     log_audit(
-        db,
         current_user.id,
         "delete_user",
         "user",
@@ -3,7 +3,9 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import bindparam, case, and_, or_, func
+from concurrent.futures import ThreadPoolExecutor
 import io
 from datetime import datetime
 import sys
@@ -18,8 +20,12 @@ try:
         generate_label_portrait,
         generate_label_landscape,
         create_pdf_two_labels,
-        get_font_path
+        get_font_path,
+        LABEL_TEMPLATE_VERSION
     )
+    from utils.label_cache import label_cache
+    from utils.label_thermal import generate_thermal_label, THERMAL_FORMATS
+    from utils.pick_list import generate_pick_list_pdf, generate_pick_list_csv
     from reportlab.lib.pagesizes import A5
     LABEL_CORE_AVAILABLE = True
     print("✅ utils.label_core imported successfully")
@@ -39,10 +45,23 @@ except ImportError as e:
     print(f"❌ خطا در import utils.api_core: {e}")
 
 # Import database models
-from database.models import Order, OrderItem, init_database, get_session
+from database.models import Order, OrderItem, SenderProfile, init_database, get_session
+from database.warehouse_models_extended import Warehouse, WarehouseProduct, ProductMarketplace
 
 router = APIRouter(prefix="/labels", tags=["Labels"])
 
+# حداکثر درخواست همزمان به API دیجی‌کالا هنگام تولید برچسب
+LABEL_API_CONCURRENCY = int(os.getenv("LABEL_API_CONCURRENCY", "4"))
+
+# نگاشت ستون‌های سفارش به کلیدهای پاسخ API مشتری
+API_ENRICH_FIELDS = {
+    'full_address': 'address',
+    'postal_code': 'postalCode',
+    'customer_phone': 'phoneNumber',
+    'city': 'city',
+    'province': 'state',
+}
+
 # ========== Pydantic Models ==========
 class ProductItem(BaseModel):
     name: Optional[str] = None
@@ -74,12 +93,33 @@ class LabelSettings(BaseModel):
     include_qrcode: bool = True
     fetch_from_api: bool = False
     update_database: bool = False
+    use_cache: bool = True
+    output_format: str = "pdf"  # pdf | zpl | epl
 
 class GenerateLabelsRequest(BaseModel):
     orders: List[OrderData]
     sender: SenderInfo
     settings: LabelSettings
 
+class LabelOrdersFilter(BaseModel):
+    status: Optional[str] = None
+    has_tracking: Optional[bool] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+class GenerateLabelsByOrdersRequest(BaseModel):
+    order_ids: Optional[List[int]] = None
+    filter: Optional[LabelOrdersFilter] = None
+    sender_profile_id: Optional[int] = None
+    sender: Optional[SenderInfo] = None
+    settings: LabelSettings = LabelSettings()
+
+class PickListRequest(BaseModel):
+    order_ids: Optional[List[int]] = None
+    filter: Optional[LabelOrdersFilter] = None
+    format: str = "pdf"  # pdf | csv
+    include_packing_sheet: bool = False
+
 # ========== Database Dependency ==========
 def get_db():
     """دریافت session دیتابیس"""
@@ -91,6 +131,78 @@ def get_db():
     finally:
         db.close()
 
+# ========== توابع کمکی ==========
+def apply_orders_selection(query, order_ids: Optional[List[int]] = None,
+                           orders_filter: Optional[LabelOrdersFilter] = None):
+    """اعمال شناسه سفارشات و فیلتر روی هر کوئری که شامل جدول سفارش باشد"""
+    if order_ids:
+        query = query.filter(Order.id.in_(order_ids))
+    
+    if orders_filter:
+        if orders_filter.status:
+            query = query.filter(Order.status == orders_filter.status)
+        
+        if orders_filter.has_tracking is not None:
+            if orders_filter.has_tracking:
+                query = query.filter(
+                    Order.tracking_code.isnot(None),
+                    Order.tracking_code != '',
+                    Order.tracking_code != 'نامشخص'
+                )
+            else:
+                query = query.filter(
+                    (Order.tracking_code.is_(None)) |
+                    (Order.tracking_code == '') |
+                    (Order.tracking_code == 'نامشخص')
+                )
+        
+        if orders_filter.date_from:
+            query = query.filter(Order.created_at >= orders_filter.date_from)
+        
+        if orders_filter.date_to:
+            query = query.filter(Order.created_at <= orders_filter.date_to)
+    
+    return query
+
+
+def load_orders_for_labels(db: Session, order_ids: Optional[List[int]] = None,
+                           orders_filter: Optional[LabelOrdersFilter] = None) -> List[Order]:
+    """بارگذاری سفارشات به همراه اقلام در یک کوئری (بر اساس شناسه یا فیلتر)"""
+    query = apply_orders_selection(
+        db.query(Order).options(joinedload(Order.items)), order_ids, orders_filter
+    )
+    orders = query.order_by(Order.created_at.desc()).all()
+    
+    # حفظ ترتیب انتخاب کاربر
+    if order_ids:
+        position = {order_id: i for i, order_id in enumerate(order_ids)}
+        orders.sort(key=lambda o: position.get(o.id, len(position)))
+    
+    return orders
+
+
+def order_to_label_data(order: Order) -> OrderData:
+    """تبدیل سفارش دیتابیس به داده ورودی برچسب"""
+    return OrderData(
+        id=order.id,
+        order_code=order.order_code or "",
+        shipment_id=order.shipment_id or "",
+        customer_name=order.customer_name or "نامشخص",
+        customer_phone=order.customer_phone or "نامشخص",
+        city=order.city or "نامشخص",
+        province=order.province or "نامشخص",
+        full_address=order.full_address or "نامشخص",
+        postal_code=order.postal_code or "نامشخص",
+        items=[
+            ProductItem(
+                name=item.product_title or "نامشخص",
+                qty=item.quantity or 1
+            )
+            for item in order.items
+        ]
+    )
+
+
 # ========== Endpoints ==========
 @router.get("/test")
 async def test_labels_api():
@@ -132,6 +244,31 @@ async def test_font():
         }
 
 
+@router.get("/cache/stats")
+async def get_label_cache_stats():
+    """آمار کش برچسب‌ها (hit/miss و حجم)"""
+    if not LABEL_CORE_AVAILABLE:
+        raise HTTPException(status_code=500, detail="label_core not available")
+    
+    return label_cache.stats()
+
+
+@router.delete("/cache")
+async def clear_label_cache():
+    """پاک کردن کش برچسب‌ها"""
+    if not LABEL_CORE_AVAILABLE:
+        raise HTTPException(status_code=500, detail="label_core not available")
+    
+    removed = label_cache.clear()
+    print(f"🧹 {removed} برچسب از کش حذف شد")
+    
+    return {
+        "success": True,
+        "message": f"{removed} برچسب از کش حذف شد",
+        "removed": removed
+    }
+
+
 @router.get("/sample")
 async def generate_sample_label():
     """تولید یک برچسب نمونه برای تست"""
@@ -210,15 +347,22 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
     print(f"💾 به‌روزرسانی DB: {request.settings.update_database}")
     print(f"{'='*60}\n")
     
-    # بررسی فونت
-    font_path = get_font_path()
-    if not font_path:
-        raise HTTPException(
-            status_code=500,
-            detail="❌ فونت Vazir.ttf پیدا نشد! لطفاً فایل فونت را در روت پروژه قرار دهید."
-        )
+    output_format = request.settings.output_format.lower()
+    if output_format != "pdf" and output_format not in THERMAL_FORMATS:
+        raise HTTPException(status_code=400, detail=f"فرمت خروجی نامعتبر: {output_format}")
     
-    print(f"✅ فونت پیدا شد: {font_path}\n")
+    is_thermal = output_format in THERMAL_FORMATS
+    
+    # بررسی فونت (برای خروجی حرارتی فونت روی خود چاپگر است)
+    if not is_thermal:
+        font_path = get_font_path()
+        if not font_path:
+            raise HTTPException(
+                status_code=500,
+                detail="❌ فونت Vazir.ttf پیدا نشد! لطفاً فایل فونت را در روت پروژه قرار دهید."
+            )
+        
+        print(f"✅ فونت پیدا شد: {font_path}\n")
     
     # آماده‌سازی کوکی‌ها برای API (اگر نیاز باشد)
     cookies_dict = None
@@ -238,9 +382,28 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
         'phone': request.sender.phone
     }
     
+    # تنظیماتی که روی خروجی برچسب اثر دارند (بخشی از کلید کش)
+    render_settings = {
+        'orientation': request.settings.orientation,
+        'include_datamatrix': request.settings.include_datamatrix,
+        'include_qrcode': request.settings.include_qrcode
+    }
+    
     # تولید برچسب‌ها
     label_images = []
+    thermal_labels = []
     updated_orders = []  # برای ذخیره سفارشاتی که باید در DB به‌روزرسانی شوند
+    cache_hits = 0
+    cache_misses = 0
+    
+    # 🔥 دریافت موازی اطلاعات از API (همزمان با رندر برچسب‌ها)
+    api_executor = None
+    api_futures = {}
+    if request.settings.fetch_from_api and cookies_dict:
+        api_executor = ThreadPoolExecutor(max_workers=LABEL_API_CONCURRENCY)
+        for idx, order in enumerate(request.orders, 1):
+            api_futures[idx] = api_executor.submit(get_customer_info, order.shipment_id, cookies_dict)
+        print(f"🔄 دریافت اطلاعات {len(api_futures)} سفارش از API با {LABEL_API_CONCURRENCY} درخواست همزمان...")
     
     for idx, order in enumerate(request.orders, 1):
         try:
@@ -259,10 +422,9 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
             
             # 🔥 دریافت اطلاعات از API (اگر فعال باشد)
             api_data = None
-            if request.settings.fetch_from_api and cookies_dict:
-                print(f"   🔄 دریافت اطلاعات از API برای {order.shipment_id}...")
+            if idx in api_futures:
                 try:
-                    api_data = get_customer_info(order.shipment_id, cookies_dict)
+                    api_data = api_futures[idx].result()
                     if api_data:
                         print(f"   ✅ اطلاعات از API دریافت شد")
                         
@@ -300,6 +462,33 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
                     'qty': product_qty
                 })
             
+            # 🖨️ خروجی بومی چاپگر حرارتی (بدون رستر)
+            if is_thermal:
+                thermal_labels.append(generate_thermal_label(
+                    output_format,
+                    order_id=order.order_code,
+                    sender_info=sender_info,
+                    receiver_info=receiver_info,
+                    include_datamatrix=request.settings.include_datamatrix
+                ))
+                print(f"   ✅ برچسب {output_format.upper()} {order.order_code} تولید شد")
+                continue
+            
+            # 🔥 بررسی کش (برای چاپ مجدد همان سفارش‌ها)
+            cache_key = None
+            if request.settings.use_cache:
+                cache_key = label_cache.make_key(
+                    order.order_code, sender_info, receiver_info,
+                    render_settings, LABEL_TEMPLATE_VERSION
+                )
+                cached_png = label_cache.get(cache_key)
+                if cached_png is not None:
+                    label_images.append(io.BytesIO(cached_png))
+                    cache_hits += 1
+                    print(f"   ♻️ برچسب {order.order_code} از کش خوانده شد")
+                    continue
+                cache_misses += 1
+            
             # تولید برچسب
             if request.settings.orientation == "portrait":
                 label_img = generate_label_portrait(
@@ -321,6 +510,12 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
             img_buffer.seek(0)
             label_images.append(img_buffer)
             
+            if cache_key:
+                try:
+                    label_cache.put(cache_key, img_buffer.getvalue())
+                except OSError as e:
+                    print(f"   ⚠️ خطا در ذخیره برچسب در کش: {e}")
+            
             print(f"   ✅ برچسب {order.order_code} تولید شد")
             
         except Exception as e:
@@ -329,7 +524,10 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
             traceback.print_exc()
             continue
     
-    if not label_images:
+    if api_executor:
+        api_executor.shutdown(wait=False, cancel_futures=True)
+    
+    if not label_images and not thermal_labels:
         raise HTTPException(status_code=500, detail="❌ هیچ برچسبی تولید نشد")
     
     # 🔥 به‌روزرسانی دیتابیس (اگر فعال باشد)
@@ -337,54 +535,67 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
     if request.settings.update_database and updated_orders:
         print(f"\n💾 به‌روزرسانی {len(updated_orders)} سفارش در دیتابیس...")
         
+        # یک UPDATE دسته‌ای؛ فقط فیلدهای خالی یا «نامشخص» پر می‌شوند
+        table = Order.__table__
+        now = datetime.utcnow()
+        values = {}
+        fill_conditions = []
+        
+        for column, api_key in API_ENRICH_FIELDS.items():
+            col = table.c[column]
+            new_value = bindparam(f"new_{column}")
+            should_fill = and_(
+                new_value.isnot(None),
+                or_(col.is_(None), col == '', col == 'نامشخص')
+            )
+            values[column] = case((should_fill, new_value), else_=col)
+            fill_conditions.append(should_fill)
+        
+        values['updated_at'] = bindparam('new_updated_at')
+        
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam('target_id'))
+            .where(or_(*fill_conditions))
+            .values(**values)
+        )
+        
+        params = []
         for update_info in updated_orders:
-            try:
-                # پیدا کردن سفارش در DB
-                db_order = db.query(Order).filter(
-                    Order.id == update_info['order_db_id']
-                ).first()
-                
-                if db_order:
-                    api_data = update_info['api_data']
-                    needs_update = False
-                    
-                    # به‌روزرسانی فقط فیلدهای خالی یا نامشخص
-                    if api_data.get('address') and (not db_order.full_address or db_order.full_address == 'نامشخص'):
-                        db_order.full_address = api_data['address']
-                        needs_update = True
-                    
-                    if api_data.get('postalCode') and (not db_order.postal_code or db_order.postal_code == 'نامشخص'):
-                        db_order.postal_code = api_data['postalCode']
-                        needs_update = True
-                    
-                    if api_data.get('phoneNumber') and (not db_order.customer_phone or db_order.customer_phone == 'نامشخص'):
-                        db_order.customer_phone = api_data['phoneNumber']
-                        needs_update = True
-                    
-                    if api_data.get('city') and (not db_order.city or db_order.city == 'نامشخص'):
-                        db_order.city = api_data['city']
-                        needs_update = True
-                    
-                    if api_data.get('state') and (not db_order.province or db_order.province == 'نامشخص'):
-                        db_order.province = api_data['state']
-                        needs_update = True
-                    
-                    if needs_update:
-                        db_order.updated_at = datetime.utcnow()
-                        updated_count += 1
-                        print(f"   ✅ سفارش {update_info['order_code']} به‌روزرسانی شد")
-                
-            except Exception as e:
-                print(f"   ⚠️ خطا در به‌روزرسانی {update_info['order_code']}: {e}")
+            api_data = update_info['api_data']
+            row = {'target_id': update_info['order_db_id'], 'new_updated_at': now}
+            for column, api_key in API_ENRICH_FIELDS.items():
+                row[f"new_{column}"] = api_data.get(api_key) or None
+            params.append(row)
         
         try:
+            result = db.execute(stmt, params)
+            updated_count = max(result.rowcount, 0)
             db.commit()
             print(f"\n✅ {updated_count} سفارش در دیتابیس به‌روزرسانی شد")
         except Exception as e:
             db.rollback()
             print(f"❌ خطا در commit: {e}")
     
+    if is_thermal:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"labels_{timestamp}.{output_format}"
+        payload = "\n".join(thermal_labels) + "\n"
+        
+        print(f"\n✅ {len(thermal_labels)} برچسب {output_format.upper()} تولید شد ({len(payload.encode('utf-8')) / 1024:.1f} KB)")
+        print(f"{'='*60}\n")
+        
+        return StreamingResponse(
+            io.BytesIO(payload.encode('utf-8')),
+            media_type="text/plain",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}"
+            }
+        )
+    
     print(f"\n✅ {len(label_images)} برچسب تولید شد")
+    if request.settings.use_cache:
+        print(f"♻️ کش: {cache_hits} از کش، {cache_misses} رندر جدید")
     print(f"📄 در حال ایجاد PDF...\n")
     
     # ایجاد PDF با تابع از utils
@@ -424,7 +635,9 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
             pdf_buffer,
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f"attachment; filename={filename}"
+                "Content-Disposition": f"attachment; filename={filename}",
+                "X-Label-Cache-Hits": str(cache_hits),
+                "X-Label-Cache-Misses": str(cache_misses)
             }
         )
         
@@ -432,4 +645,170 @@ async def generate_labels(request: GenerateLabelsRequest, db: Session = Depends(
         print(f"❌ خطا در ایجاد PDF: {e}")
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"خطا در ایجاد PDF: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"خطا در ایجاد PDF: {str(e)}")
+
+
+@router.post("/generate-by-orders")
+async def generate_labels_by_orders(request: GenerateLabelsByOrdersRequest, db: Session = Depends(get_db)):
+    """
+    تولید برچسب با بارگذاری سفارشات در سرور
+    
+    به جای ارسال کامل اطلاعات سفارش از مرورگر، فقط شناسه سفارشات یا فیلتر
+    و شناسه پروفایل فرستنده ارسال می‌شود.
+    """
+    if not request.order_ids and not request.filter:
+        raise HTTPException(status_code=400, detail="شناسه سفارشات یا فیلتر باید مشخص شود")
+    
+    # فرستنده: پروفایل مشخص، اطلاعات ارسالی یا پروفایل پیش‌فرض
+    if request.sender_profile_id is not None:
+        profile = db.query(SenderProfile).filter(SenderProfile.id == request.sender_profile_id).first()
+        if not profile:
+            raise HTTPException(status_code=404, detail="پروفایل فرستنده یافت نشد")
+    elif request.sender is None:
+        profile = db.query(SenderProfile).filter(SenderProfile.is_default == True).first()
+        if not profile:
+            raise HTTPException(status_code=404, detail="پروفایل پیش‌فرض یافت نشد")
+    else:
+        profile = None
+    
+    if profile:
+        sender = SenderInfo(
+            name=profile.sender_name or "",
+            address=profile.address or "",
+            postal_code=profile.postal_code or "",
+            phone=profile.phone or ""
+        )
+    else:
+        sender = request.sender
+    
+    orders = load_orders_for_labels(db, request.order_ids, request.filter)
+    print(f"📥 {len(orders)} سفارش از دیتابیس برای برچسب بارگذاری شد")
+    
+    if not orders:
+        raise HTTPException(status_code=404, detail="هیچ سفارشی با این مشخصات یافت نشد")
+    
+    return await generate_labels(
+        GenerateLabelsRequest(
+            orders=[order_to_label_data(order) for order in orders],
+            sender=sender,
+            settings=request.settings
+        ),
+        db
+    )
+
+
+@router.post("/pick-list")
+async def generate_pick_list(request: PickListRequest, db: Session = Depends(get_db)):
+    """
+    تولید لیست برداشت تجمیعی برای یک موج از سفارشات
+    
+    تعداد هر کالا با یک کوئری group-by روی اقلام سفارش جمع زده می‌شود
+    و کد محصول از طریق نگاشت پلتفرم به SKU و انبار متصل می‌شود.
+    """
+    if not LABEL_CORE_AVAILABLE:
+        raise HTTPException(status_code=500, detail="ماژول label_core در دسترس نیست")
+    
+    if not request.order_ids and not request.filter:
+        raise HTTPException(status_code=400, detail="شناسه سفارشات یا فیلتر باید مشخص شود")
+    
+    if request.format not in ("pdf", "csv"):
+        raise HTTPException(status_code=400, detail=f"فرمت خروجی نامعتبر: {request.format}")
+    
+    # ========== تجمیع اقلام در یک کوئری ==========
+    aggregate_query = apply_orders_selection(
+        db.query(
+            OrderItem.product_code,
+            func.max(OrderItem.product_title),
+            func.sum(func.coalesce(OrderItem.quantity, 1)),
+            func.count(func.distinct(OrderItem.order_id))
+        ).join(Order, Order.id == OrderItem.order_id),
+        request.order_ids,
+        request.filter
+    )
+    aggregated = aggregate_query.group_by(OrderItem.product_code).all()
+    
+    if not aggregated:
+        raise HTTPException(status_code=404, detail="هیچ کالایی برای این سفارشات یافت نشد")
+    
+    orders_count = apply_orders_selection(
+        db.query(func.count(Order.id)), request.order_ids, request.filter
+    ).scalar()
+    
+    # ========== نگاشت کد محصول به SKU و انبار ==========
+    codes = [code for code, _, _, _ in aggregated if code]
+    locations = {}
+    if codes:
+        mappings = db.query(
+            ProductMarketplace.marketplace_sku,
+            WarehouseProduct.sku,
+            Warehouse.name
+        ).join(
+            WarehouseProduct, WarehouseProduct.id == ProductMarketplace.product_id
+        ).join(
+            Warehouse, Warehouse.id == WarehouseProduct.warehouse_id
+        ).filter(
+            ProductMarketplace.marketplace_sku.in_(codes),
+            ProductMarketplace.is_active == True
+        ).order_by(Warehouse.is_default.desc(), Warehouse.id).all()
+        
+        for marketplace_sku, sku, warehouse_name in mappings:
+            # اولویت با انبار پیش‌فرض
+            locations.setdefault(marketplace_sku, (sku, warehouse_name))
+    
+    rows = []
+    for code, title, quantity, order_count in aggregated:
+        sku, warehouse_name = locations.get(code, (None, None))
+        rows.append({
+            "product_code": code or "",
+            "product_title": title or "نامشخص",
+            "sku": sku or "",
+            "warehouse": warehouse_name or "",
+            "quantity": int(quantity or 0),
+            "orders_count": order_count,
+        })
+    
+    # مرتب‌سازی بر اساس مسیر برداشت (انبار، SKU)؛ کالاهای بدون نگاشت در انتها
+    rows.sort(key=lambda r: (not r["warehouse"], r["warehouse"], r["sku"], r["product_code"]))
+    
+    summary = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "orders_count": orders_count,
+        "products_count": len(rows),
+        "total_quantity": sum(r["quantity"] for r in rows),
+    }
+    print(f"📋 لیست برداشت: {summary['products_count']} کالا از {orders_count} سفارش")
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    if request.format == "csv":
+        return StreamingResponse(
+            io.BytesIO(generate_pick_list_csv(rows)),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=pick_list_{timestamp}.csv"}
+        )
+    
+    packing_orders = None
+    if request.include_packing_sheet:
+        packing_orders = [
+            {
+                "order_code": order.order_code or "",
+                "customer_name": order.customer_name or "نامشخص",
+                "items": [
+                    {"product_title": item.product_title or "نامشخص", "quantity": item.quantity or 1}
+                    for item in order.items
+                ],
+            }
+            for order in load_orders_for_labels(db, request.order_ids, request.filter)
+        ]
+    
+    try:
+        pdf_bytes = generate_pick_list_pdf(rows, summary, packing_orders)
+    except Exception as e:
+        print(f"❌ خطا در ایجاد لیست برداشت: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در ایجاد لیست برداشت: {str(e)}")
+    
+    return StreamingResponse(
+        io.BytesIO(pdf_bytes),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=pick_list_{timestamp}.pdf"}
+    )
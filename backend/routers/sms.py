@@ -1,23 +1,27 @@
 # backend/routers/sms.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List
 from datetime import datetime
-import subprocess
+import json
 import os
 
-from database.models import Order, SMSLog, get_session, init_database
+from database.models import Order, SMSLog, SMSOutbox, SMSTemplate, SentTrackingCode, get_session, init_database
+from services.sms_providers import KDECONNECT_CLI_PATH, sms_provider_pool
+from services.sms_service import (
+    PENDING_STATUSES, enqueue_sms_batch, get_batch_status, pending_order_ids
+)
+from services.sms_templates import (
+    get_active_template, load_templates, render_log_message, render_template, template_params
+)
 
 router = APIRouter(prefix="/sms", tags=["مدیریت پیامک"])
 
-# تنظیمات KDE Connect
-DEVICE_ID = os.getenv("DEVICE_ID", "8840ef7242ad4049afc617c52ecb5f57")
-KDECONNECT_CLI_PATH = r"C:\Program Files\KDE Connect\bin\kdeconnect-cli.exe"
-COMPANY_NAME = "تجارت دریای آرام"
-
 def get_db():
-    engine = init_database("digikala_sales.db")
+    db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'digikala_sales.db')
+    engine = init_database(db_path)
     db = get_session(engine)
     try:
         yield db
@@ -30,115 +34,96 @@ class SendSMSRequest(BaseModel):
     dry_run: bool = True
 
 
-def check_kde_connect():
-    """بررسی وضعیت اتصال KDE Connect"""
-    if not os.path.exists(KDECONNECT_CLI_PATH):
-        return False, "KDE Connect نصب نیست"
-    
-    try:
-        result = subprocess.run(
-            [KDECONNECT_CLI_PATH, "--device", DEVICE_ID, "--ping"],
-            capture_output=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            return True, "متصل"
-        else:
-            return False, "دستگاه آفلاین است"
-    except Exception as e:
-        return False, str(e)
-
-
-def send_sms_via_kde(phone: str, message: str, dry_run: bool = False):
-    """ارسال پیامک از طریق KDE Connect"""
-    if dry_run:
-        return True, "حالت تست - پیامک ارسال نشد"
+async def check_providers(force: bool = False):
+    """وضعیت ارائه‌دهندگان پیامک (از کش سلامت؛ force = بررسی مجدد همه)"""
+    providers = sms_provider_pool.providers
+    if not providers:
+        return False, "هیچ ارائه‌دهنده پیامکی تنظیم نشده است"
     
-    try:
-        command = [
-            KDECONNECT_CLI_PATH,
-            "--device", DEVICE_ID,
-            "--send-sms", message,
-            "--destination", phone
-        ]
-        
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            timeout=15
-        )
-        
-        if result.returncode == 0:
-            return True, "پیامک ارسال شد"
-        else:
-            return False, result.stderr.decode('utf-8', errors='ignore')
+    available = await sms_provider_pool.check_health(force=force)
+    if len(providers) == 1:
+        return bool(available), providers[0].status_message
     
-    except Exception as e:
-        return False, str(e)
-
-
-def get_sms_template(customer_name: str, tracking_code: str) -> str:
-    """تولید متن پیامک"""
-    greeting = f"سلام {customer_name} عزیز،" if customer_name else "سلام دوست عزیز،"
-    
-    message = (
-        f"{greeting}\n"
-        f"بسته شما از طرف «{COMPANY_NAME}» ارسال شد. 📦\n\n"
-        f"برای پیگیری لحظه‌ای مرسوله، کد رهگیری زیر را در سایت پست وارد نمایید:\n"
-        f"🔢 {tracking_code}\n\n"
-        f"tracking.post.ir"
-    )
-    
-    return message
+    return bool(available), f"{len(available)} از {len(providers)} ارائه‌دهنده متصل"
 
 
 @router.get("/status")
-async def get_sms_status():
+async def get_sms_status(refresh: bool = False):
     """وضعیت سرویس پیامک"""
-    is_connected, message = check_kde_connect()
+    is_connected, message = await check_providers(force=refresh)
+    providers = [provider.to_dict() for provider in sms_provider_pool.providers]
     
     return {
         "kde_connect_installed": os.path.exists(KDECONNECT_CLI_PATH),
         "device_connected": is_connected,
         "status_message": message,
-        "device_id": DEVICE_ID
+        "device_id": next((p["device_id"] for p in providers if "device_id" in p), None),
+        "strategy": sms_provider_pool.strategy,
+        "providers": providers
     }
 
 
 @router.get("/ready-orders")
-async def get_ready_orders(db: Session = Depends(get_db)):
-    """سفارشات آماده برای ارسال پیامک"""
+async def get_ready_orders(
+    response: Response,
+    limit: int = Query(500, ge=1, le=2000),
+    offset: int = Query(0, ge=0),
+    include_total: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    سفارشات آماده برای ارسال پیامک
+
+    هدر X-Has-More وجود صفحه بعد را نشان می‌دهد (با خواندن limit+1 ردیف).
+    شمارش کل با include_total=true در هدر X-Total-Count برگردانده می‌شود؛ این
+    شمارش کل anti-join را دوباره اجرا می‌کند و فقط برای صفحه اول لازم است.
+    """
+    
+    # سفارشاتی که کد رهگیری دارند، پیامک موفق ندارند، در سوابق ارسال نیستند و در صف ارسال نیستند
+    already_sent = exists().where(
+        SMSLog.order_id == Order.id,
+        SMSLog.is_successful == True
+    )
+    # سوابق مشترک با Streamlit (sent_orders.txt قدیمی)
+    marked_sent = exists().where(
+        SentTrackingCode.tracking_code == Order.tracking_code
+    )
+    in_outbox = exists().where(
+        SMSOutbox.order_id == Order.id,
+        SMSOutbox.status.in_(PENDING_STATUSES)
+    )
     
-    # سفارشاتی که کد رهگیری دارند و پیامک ارسال نشده
-    orders = db.query(Order).filter(
+    query = db.query(
+        Order.id, Order.order_code, Order.customer_name, Order.tracking_code,
+        Order.customer_phone, Order.status, Order.shipment_id
+    ).filter(
         Order.tracking_code.isnot(None),
         Order.tracking_code != '',
         Order.tracking_code != 'نامشخص',
         Order.customer_phone.isnot(None),
-        Order.customer_phone != ''
-    ).all()
+        Order.customer_phone != '',
+        ~already_sent,
+        ~marked_sent,
+        ~in_outbox
+    )
     
-    # فیلتر سفارشاتی که قبلاً پیامک ارسال شده
-    result = []
-    for order in orders:
-        # بررسی لاگ ارسال
-        existing_log = db.query(SMSLog).filter(
-            SMSLog.order_id == order.id,
-            SMSLog.is_successful == True
-        ).first()
-        
-        if not existing_log:
-            result.append({
-                "orderId": order.order_code,
-                "customerName": order.customer_name,
-                "trackingCode": order.tracking_code,
-                "phoneNumber": order.customer_phone,
-                "status": order.status,
-                "shipmentId": order.shipment_id,
-                "id": order.id
-            })
+    if include_total:
+        response.headers["X-Total-Count"] = str(query.count())
     
-    return result
+    rows = query.order_by(Order.id).offset(offset).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response.headers["X-Has-More"] = "1" if has_more else "0"
+    
+    return [{
+        "orderId": row.order_code,
+        "customerName": row.customer_name,
+        "trackingCode": row.tracking_code,
+        "phoneNumber": row.customer_phone,
+        "status": row.status,
+        "shipmentId": row.shipment_id,
+        "id": row.id
+    } for row in rows]
 
 
 @router.post("/send")
@@ -146,18 +131,27 @@ async def send_sms_bulk(
     request: SendSMSRequest,
     db: Session = Depends(get_db)
 ):
-    """ارسال پیامک برای چند سفارش"""
+    """ثبت پیامک چند سفارش در صف ارسال - ارسال توسط worker پس‌زمینه انجام می‌شود"""
     
     # بررسی اتصال
-    is_connected, status_msg = check_kde_connect()
-    if not is_connected and not request.dry_run:
-        raise HTTPException(status_code=503, detail=f"KDE Connect متصل نیست: {status_msg}")
+    if not request.dry_run:
+        is_connected, status_msg = await check_providers()
+        if not is_connected:
+            raise HTTPException(status_code=503, detail=f"سرویس پیامک متصل نیست: {status_msg}")
+    
+    orders = {
+        order.id: order
+        for order in db.query(Order).filter(Order.id.in_(request.order_ids)).all()
+    } if request.order_ids else {}
+    already_queued = pending_order_ids(db, list(orders))
+    template = get_active_template(db)
     
     results = []
-    success_count = 0
+    entries = []
+    seen = set()
     
     for order_id in request.order_ids:
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = orders.get(order_id)
         
         if not order:
             results.append({
@@ -167,68 +161,58 @@ async def send_sms_bulk(
             })
             continue
         
+        error = None
         if not order.tracking_code or order.tracking_code == 'نامشخص':
-            results.append({
-                "order_id": order_id,
-                "order_code": order.order_code,
-                "success": False,
-                "message": "کد رهگیری ندارد"
-            })
-            continue
+            error = "کد رهگیری ندارد"
+        elif not order.customer_phone:
+            error = "شماره تلفن ندارد"
+        elif order_id in seen or order_id in already_queued:
+            error = "پیامک این سفارش در صف ارسال است"
         
-        if not order.customer_phone:
+        if error:
             results.append({
                 "order_id": order_id,
                 "order_code": order.order_code,
                 "success": False,
-                "message": "شماره تلفن ندارد"
+                "message": error
             })
             continue
         
-        # تولید متن پیامک
-        message = get_sms_template(order.customer_name, order.tracking_code)
-        
-        # ارسال
-        success, send_message = send_sms_via_kde(
-            order.customer_phone,
-            message,
-            request.dry_run
-        )
-        
-        # ثبت لاگ
-        sms_log = SMSLog(
-            order_id=order.id,
-            tracking_code=order.tracking_code,
-            phone_number=order.customer_phone,
-            message=message,
-            is_successful=success,
-            error_message=None if success else send_message
-        )
-        db.add(sms_log)
-        
-        if success:
-            success_count += 1
-        
+        seen.add(order_id)
+        params = template_params(order.customer_name)
+        entries.append((order, render_template(template, params, order.tracking_code), params))
         results.append({
             "order_id": order_id,
             "order_code": order.order_code,
             "customer_name": order.customer_name,
             "phone": order.customer_phone,
-            "success": success,
-            "message": send_message
+            "success": True,
+            "message": "در صف ارسال"
         })
     
-    db.commit()
+    batch_id = enqueue_sms_batch(db, entries, request.dry_run, template.id) if entries else None
     
     return {
+        "batch_id": batch_id,
         "total": len(request.order_ids),
-        "success": success_count,
-        "failed": len(request.order_ids) - success_count,
+        "queued": len(entries),
+        "rejected": len(request.order_ids) - len(entries),
         "dry_run": request.dry_run,
         "results": results
     }
 
 
+@router.get("/batches/{batch_id}")
+async def get_sms_batch(batch_id: str, db: Session = Depends(get_db)):
+    """وضعیت ارسال پیامک‌های یک batch"""
+    
+    status = get_batch_status(db, batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="batch یافت نشد")
+    
+    return status
+
+
 @router.get("/logs")
 async def get_sms_logs(
     limit: int = 100,
@@ -239,18 +223,64 @@ async def get_sms_logs(
     logs = db.query(SMSLog).order_by(
         SMSLog.sent_at.desc()
     ).limit(limit).all()
+    templates = load_templates(db, (log.template_id for log in logs))
     
     return [{
         "id": log.id,
         "order_id": log.order_id,
         "tracking_code": log.tracking_code,
         "phone_number": log.phone_number,
+        "message": render_log_message(log, templates),
+        "template_id": log.template_id,
         "sent_at": log.sent_at.isoformat() if log.sent_at else None,
         "is_successful": log.is_successful,
         "error_message": log.error_message
     } for log in logs]
 
 
+@router.get("/logs/{log_id}")
+async def get_sms_log(log_id: int, db: Session = Depends(get_db)):
+    """جزئیات یک پیامک با متن ساخته شده از قالب"""
+    
+    log = db.query(SMSLog).filter(SMSLog.id == log_id).first()
+    if not log:
+        raise HTTPException(status_code=404, detail="لاگ پیامک یافت نشد")
+    
+    templates = load_templates(db, [log.template_id])
+    template = templates.get(log.template_id)
+    
+    return {
+        "id": log.id,
+        "order_id": log.order_id,
+        "tracking_code": log.tracking_code,
+        "phone_number": log.phone_number,
+        "message": render_log_message(log, templates),
+        "template": {"id": template.id, "name": template.name, "version": template.version} if template else None,
+        "params": json.loads(log.params) if log.params else None,
+        "sent_at": log.sent_at.isoformat() if log.sent_at else None,
+        "is_successful": log.is_successful,
+        "error_message": log.error_message
+    }
+
+
+@router.get("/templates")
+async def get_sms_templates(db: Session = Depends(get_db)):
+    """نسخه‌های قالب پیامک"""
+    
+    get_active_template(db)
+    templates = db.query(SMSTemplate).order_by(SMSTemplate.name, SMSTemplate.version.desc()).all()
+    
+    return [{
+        "id": t.id,
+        "name": t.name,
+        "version": t.version,
+        "body": t.body,
+        "greeting": t.greeting,
+        "default_greeting": t.default_greeting,
+        "created_at": t.created_at.isoformat() if t.created_at else None
+    } for t in templates]
+
+
 @router.post("/test")
 async def test_sms(
     phone: str,
@@ -258,13 +288,17 @@ async def test_sms(
 ):
     """تست ارسال یک پیامک"""
     
-    is_connected, status_msg = check_kde_connect()
-    if not is_connected:
-        raise HTTPException(status_code=503, detail=f"KDE Connect متصل نیست: {status_msg}")
+    is_connected, status_msg = await check_providers()
+    provider = sms_provider_pool.pick()
+    if not is_connected or provider is None:
+        raise HTTPException(status_code=503, detail=f"سرویس پیامک متصل نیست: {status_msg}")
     
-    success, result = send_sms_via_kde(phone, message, dry_run=False)
+    await provider.limiter.acquire()
+    success, result = await provider.send(phone, message)
+    provider.record_result(success)
     
     return {
         "success": success,
-        "message": result
+        "message": result,
+        "provider": provider.name
     }
\ No newline at end of file
@@ -1,19 +1,35 @@
 # backend/routers/tracking.py
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import pdfplumber
-import re
-import io
+from sqlalchemy.exc import IntegrityError
+import asyncio
+import hashlib
 import json
-import pandas as pd
-from collections import defaultdict
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
-from database.models import Order, init_database, get_session
+from database.models import Order, TrackingExtraction, TrackingPush, init_database, get_session
+from services.tracking_service import push_tracking_codes, TrackingPushError
+from utils.receipt_extractor import extract_receipt, dedupe_pairs, RECEIPT_EXTRACTOR_VERSION
+from utils.shipment_mapping import iter_mapping_rows, ShipmentMatcher
 
 router = APIRouter(prefix="/tracking", tags=["tracking"])
 
+# اندازه هر تکه هنگام ذخیره فایل آپلود شده روی دیسک
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# حداکثر تعداد مقادیر در هر کوئری IN (محدودیت متغیرهای SQLite)
+MATCH_QUERY_CHUNK_SIZE = 500
+
+# مدت نگهداری نتایج استخراج (از آخرین استفاده)
+EXTRACTION_RETENTION_DAYS = int(os.getenv("TRACKING_EXTRACTION_RETENTION_DAYS", "7"))
+
 def get_db():
     import os
     db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'digikala_sales.db')
@@ -29,84 +45,163 @@ class TrackingItem(BaseModel):
     tracking_code: str
 
 class MatchRequest(BaseModel):
-    tracking_data: List[TrackingItem]
+    tracking_data: List[TrackingItem] = []
+    extraction_id: Optional[int] = None
+
+class TrackingSubmitItem(BaseModel):
+    order_id: int
+    tracking_code: str
+
+class BulkSubmitRequest(BaseModel):
+    items: List[TrackingSubmitItem]
+    mark_dispatched: bool = False
+    dispatch_date: Optional[datetime] = None
+
+class PushItem(BaseModel):
+    shipment_id: str
+    tracking_code: str
+
+class PushDigikalaRequest(BaseModel):
+    order_ids: Optional[List[int]] = None
+    items: Optional[List[PushItem]] = None
+    force: bool = False
+
+def fetch_orders_by(db: Session, column, values) -> dict:
+    """بارگذاری سفارشات با کوئری‌های IN تکه‌تکه و برگرداندن dict بر اساس مقدار ستون"""
+    unique_values = list(dict.fromkeys(v for v in values if v is not None))
+    orders = {}
+    for start in range(0, len(unique_values), MATCH_QUERY_CHUNK_SIZE):
+        chunk = unique_values[start:start + MATCH_QUERY_CHUNK_SIZE]
+        for order in db.query(Order).filter(column.in_(chunk)).all():
+            orders[getattr(order, column.key)] = order
+    return orders
+
 
 @router.get("/test")
 async def test():
     return {"status": "ok", "message": "Tracking API works!"}
 
+async def spool_upload(file: UploadFile, suffix: str = ".pdf"):
+    """
+    ذخیره فایل آپلود شده روی دیسک به صورت تکه‌تکه (بدون خواندن کامل در حافظه)
+    
+    Returns:
+        (مسیر فایل موقت، هش SHA-256 محتوا)
+    """
+    digest = hashlib.sha256()
+    spool = tempfile.NamedTemporaryFile(prefix="upload_", suffix=suffix, delete=False)
+    try:
+        while True:
+            chunk = await file.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spool.write(chunk)
+    finally:
+        spool.close()
+    return spool.name, digest.hexdigest()
+
+
+def save_extraction(db: Session, file_hash: str, filename: str, extraction: dict) -> TrackingExtraction:
+    """ذخیره نتیجه استخراج و حذف نتایج منقضی شده"""
+    cutoff = datetime.utcnow() - timedelta(days=EXTRACTION_RETENTION_DAYS)
+    db.query(TrackingExtraction).filter(
+        TrackingExtraction.last_used_at < cutoff
+    ).delete(synchronize_session=False)
+    
+    record = db.query(TrackingExtraction).filter(TrackingExtraction.file_hash == file_hash).first()
+    if not record:
+        record = TrackingExtraction(file_hash=file_hash)
+        db.add(record)
+    
+    record.filename = filename
+    record.pages = extraction["pages"]
+    record.extractor_version = RECEIPT_EXTRACTOR_VERSION
+    record.results = json.dumps(extraction["pairs"], ensure_ascii=False)
+    record.results_count = len(extraction["pairs"])
+    record.created_at = datetime.utcnow()
+    record.last_used_at = datetime.utcnow()
+    
+    try:
+        db.commit()
+    except IntegrityError:
+        # همین فایل همزمان در درخواست دیگری ذخیره شده است
+        db.rollback()
+        record = db.query(TrackingExtraction).filter(TrackingExtraction.file_hash == file_hash).first()
+    
+    return record
+
+
+def find_cached_extraction(db: Session, file_hash: str) -> Optional[TrackingExtraction]:
+    """نتیجه استخراج ذخیره شده با نسخه فعلی extractor (زمان استفاده به‌روز می‌شود، بدون commit)"""
+    cached = db.query(TrackingExtraction).filter(TrackingExtraction.file_hash == file_hash).first()
+    if cached and cached.extractor_version == RECEIPT_EXTRACTOR_VERSION:
+        cached.last_used_at = datetime.utcnow()
+        return cached
+    return None
+
+
+def cached_extraction_result(cached: TrackingExtraction, started: float) -> dict:
+    return {
+        "id": cached.id,
+        "pairs": json.loads(cached.results or "[]"),
+        "pages": cached.pages,
+        "seconds": round(time.perf_counter() - started, 3),
+        "engine": None,
+        "cached": True,
+    }
+
+
+def remove_spooled(path: Optional[str]):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def extract_uploaded_receipt(file: UploadFile, db: Session) -> dict:
+    """استخراج یک رسید آپلود شده خارج از event loop (با استفاده از نتایج ذخیره شده)"""
+    started = time.perf_counter()
+    path, file_hash = await spool_upload(file)
+    try:
+        cached = find_cached_extraction(db, file_hash)
+        if cached:
+            db.commit()
+            return cached_extraction_result(cached, started)
+        
+        extraction = await run_in_threadpool(extract_receipt, path)
+    finally:
+        remove_spooled(path)
+    
+    record = save_extraction(db, file_hash, file.filename, extraction)
+    return {**extraction, "id": record.id, "cached": False}
+
+
 @router.post("/extract-pdf")
-async def extract_pdf(file: UploadFile = File(...)):
+async def extract_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)):
     """استخراج کدهای رهگیری از PDF - دقیقاً مثل Streamlit"""
     
     try:
         print(f"\n📄 دریافت PDF: {file.filename}")
-        contents = await file.read()
-        pdf_file = io.BytesIO(contents)
-        
-        records = defaultdict(dict)
-        
-        tracking_pattern = re.compile(r'^\d{24}$')
-        order_pattern = re.compile(r'\b(\d{9})\b')
-        row_num_pattern = re.compile(r'^\d{1,2}$')
         
-        last_row_num = None
-        
-        with pdfplumber.open(pdf_file) as pdf:
-            print(f"📑 تعداد صفحات: {len(pdf.pages)}")
-            
-            for page_num, page in enumerate(pdf.pages, 1):
-                print(f"🔍 صفحه {page_num}...")
-                tables = page.extract_tables()
-                
-                if tables:
-                    print(f"   {len(tables)} جدول یافت شد")
-                    for table in tables:
-                        if not table:
-                            continue
-                        
-                        for row in table:
-                            if not row:
-                                continue
-                            
-                            cleaned_row = [cell.strip() if cell else "" for cell in row]
-                            
-                            # شناسایی شماره ردیف
-                            if cleaned_row and row_num_pattern.match(cleaned_row[-1]):
-                                last_row_num = cleaned_row[-1]
-                            
-                            # جستجو برای کدها
-                            if last_row_num:
-                                for cell in cleaned_row:
-                                    if tracking_pattern.match(cell):
-                                        records[last_row_num]['کد رهگیری'] = cell
-                                    
-                                    order_match = order_pattern.search(cell)
-                                    if order_match:
-                                        records[last_row_num]['شماره سفارش'] = order_match.group(1)
-        
-        # تبدیل به لیست
-        results = []
-        for row_num, data in sorted(records.items()):
-            if 'کد رهگیری' in data and 'شماره سفارش' in data:
-                results.append({
-                    "order_code": data['شماره سفارش'],
-                    "tracking_code": data['کد رهگیری']
-                })
-                print(f"   ✓ {data['شماره سفارش']} -> {data['کد رهگیری'][:12]}...")
-        
-        # حذف تکراری
-        unique_results = []
-        seen = set()
-        for item in results:
-            key = (item["order_code"], item["tracking_code"])
-            if key not in seen:
-                seen.add(key)
-                unique_results.append(item)
+        extraction = await extract_uploaded_receipt(file, db)
+        unique_results = extraction["pairs"]
         
+        if extraction["cached"]:
+            print(f"⚡ نتیجه از کش استخراج (شناسه {extraction['id']})")
+        else:
+            print(f"📑 تعداد صفحات: {extraction['pages']} ({extraction['seconds']} ثانیه، موتور: {extraction['engine']})")
         print(f"\n✅ استخراج شد: {len(unique_results)} سفارش\n")
         
-        return unique_results
+        return JSONResponse(
+            content=unique_results,
+            headers={
+                "X-Extraction-Id": str(extraction["id"]),
+                "X-Extraction-Cached": "1" if extraction["cached"] else "0"
+            }
+        )
     
     except Exception as e:
         print(f"❌ خطا: {e}")
@@ -115,20 +210,158 @@ async def extract_pdf(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"خطا در پردازش PDF: {str(e)}")
 
 
+@router.post("/extract-pdf-batch")
+async def extract_pdf_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
+    """
+    استخراج همزمان چند رسید پستی
+    
+    نتایج همه فایل‌ها ادغام و جفت‌های تکراری (کد سفارش، کد رهگیری) حذف می‌شوند.
+    """
+    print(f"\n📄 دریافت {len(files)} فایل PDF")
+    
+    # session درخواست بین coroutineهای همزمان مشترک نمی‌شود: فقط ذخیره فایل‌ها و
+    # استخراج همزمان انجام می‌شوند و خواندن/نوشتن کش در یک پاس ترتیبی است
+    started = time.perf_counter()
+    
+    async def spool(file: UploadFile) -> dict:
+        try:
+            path, file_hash = await spool_upload(file)
+            return {"filename": file.filename, "path": path, "hash": file_hash, "error": None}
+        except Exception as e:
+            return {"filename": file.filename, "path": None, "hash": None, "error": str(e)}
+    
+    uploads = await asyncio.gather(*(spool(file) for file in files))
+    
+    try:
+        # نتایج ذخیره شده (یک بار برای هر محتوای یکسان)
+        cached = {}
+        pending = {}
+        for upload in uploads:
+            if upload["error"] or upload["hash"] in cached or upload["hash"] in pending:
+                continue
+            record = find_cached_extraction(db, upload["hash"])
+            if record:
+                cached[upload["hash"]] = cached_extraction_result(record, started)
+            else:
+                pending[upload["hash"]] = upload
+        if cached:
+            db.commit()
+        
+        async def extract(upload: dict) -> dict:
+            file_started = time.perf_counter()
+            try:
+                extraction = await run_in_threadpool(extract_receipt, upload["path"])
+                return {**extraction, "error": None}
+            except Exception as e:
+                return {"pairs": [], "pages": 0, "seconds": round(time.perf_counter() - file_started, 3),
+                        "engine": None, "error": str(e)}
+        
+        extracted = dict(zip(pending, await asyncio.gather(*(extract(u) for u in pending.values()))))
+    finally:
+        for upload in uploads:
+            remove_spooled(upload["path"])
+    
+    # ذخیره نتایج جدید به ترتیب
+    for file_hash, extraction in extracted.items():
+        if extraction["error"] is None:
+            record = save_extraction(db, file_hash, pending[file_hash]["filename"], extraction)
+            extraction["id"] = record.id
+    
+    extractions = []
+    for upload in uploads:
+        if upload["error"] is None:
+            result = cached.get(upload["hash"]) or extracted[upload["hash"]]
+            error = result.get("error")
+        else:
+            result, error = {}, upload["error"]
+        if error:
+            print(f"❌ خطا در پردازش {upload['filename']}: {error}")
+        extractions.append({
+            "filename": upload["filename"],
+            "id": result.get("id"),
+            "pairs": result.get("pairs", []),
+            "pages": result.get("pages", 0),
+            "seconds": result.get("seconds", 0),
+            "engine": result.get("engine"),
+            "cached": result.get("cached", False),
+            "error": error,
+        })
+    
+    # ادغام به ترتیب فایل‌ها و حذف تکراری بین فایل‌ها
+    seen = set()
+    results = []
+    file_stats = []
+    for extraction in extractions:
+        unique = dedupe_pairs(extraction["pairs"], seen)
+        results.extend(unique)
+        file_stats.append({
+            "filename": extraction["filename"],
+            "extraction_id": extraction["id"],
+            "cached": extraction["cached"],
+            "pages": extraction["pages"],
+            "extracted": len(extraction["pairs"]),
+            "new": len(unique),
+            "seconds": extraction["seconds"],
+            "engine": extraction["engine"],
+            "error": extraction["error"],
+        })
+        print(f"   📄 {extraction['filename']}: {len(extraction['pairs'])} سفارش در {extraction['seconds']} ثانیه")
+    
+    elapsed = round(time.perf_counter() - started, 3)
+    print(f"\n✅ استخراج شد: {len(results)} سفارش از {len(files)} فایل ({elapsed} ثانیه)\n")
+    
+    return {
+        "success": all(stat["error"] is None for stat in file_stats),
+        "total": len(results),
+        "seconds": elapsed,
+        "files": file_stats,
+        "results": results
+    }
+
+
+@router.get("/extractions/{extraction_id}")
+async def get_extraction(extraction_id: int, db: Session = Depends(get_db)):
+    """دریافت نتیجه استخراج ذخیره شده"""
+    extraction = db.query(TrackingExtraction).filter(TrackingExtraction.id == extraction_id).first()
+    if not extraction:
+        raise HTTPException(status_code=404, detail="نتیجه استخراج یافت نشد یا منقضی شده است")
+    
+    return {
+        "id": extraction.id,
+        "filename": extraction.filename,
+        "pages": extraction.pages,
+        "total": extraction.results_count,
+        "created_at": extraction.created_at.isoformat() if extraction.created_at else None,
+        "results": json.loads(extraction.results or "[]")
+    }
+
+
 @router.post("/match-database")
 async def match_database(request: MatchRequest, db: Session = Depends(get_db)):
     """تطبیق با دیتابیس - دقیقاً مثل Streamlit"""
     
+    tracking_data = request.tracking_data
+    if request.extraction_id is not None:
+        extraction = db.query(TrackingExtraction).filter(
+            TrackingExtraction.id == request.extraction_id
+        ).first()
+        if not extraction:
+            raise HTTPException(status_code=404, detail="نتیجه استخراج یافت نشد یا منقضی شده است")
+        
+        tracking_data = [TrackingItem(**item) for item in json.loads(extraction.results or "[]")]
+        extraction.last_used_at = datetime.utcnow()
+        db.commit()
+    
     try:
-        print(f"\n🔍 تطبیق {len(request.tracking_data)} سفارش با دیتابیس...")
+        print(f"\n🔍 تطبیق {len(tracking_data)} سفارش با دیتابیس...")
         
         results = []
         
-        for item in request.tracking_data:
-            # جستجوی دقیق در دیتابیس
-            order = db.query(Order).filter(
-                Order.order_code == item.order_code
-            ).first()
+        # جستجوی دقیق همه کدها در دیتابیس
+        orders_by_code = fetch_orders_by(db, Order.order_code, [item.order_code for item in tracking_data])
+        
+        for item in tracking_data:
+            order = orders_by_code.get(item.order_code)
             
             if order:
                 results.append({
@@ -187,54 +420,52 @@ async def match_excel(
     try:
         print(f"\n📊 تطبیق با Excel...")
         
-        # 1. خواندن Excel
-        excel_contents = await excel.read()
-        df_excel = pd.read_excel(io.BytesIO(excel_contents), dtype=str)
-        
-        # فقط دو ستون اول
-        df_excel = df_excel.iloc[:, [0, 1]]
-        df_excel.columns = ['کد سفارش', 'شناسه محموله']
-        
-        print(f"   📄 Excel: {len(df_excel)} ردیف")
-        
-        # 2. پارس tracking data
+        # 1. پارس tracking data
         tracking_list = json.loads(tracking_data)
-        df_tracking = pd.DataFrame(tracking_list)
-        
-        # اطمینان از نام ستون‌ها
-        if len(df_tracking.columns) == 2:
-            df_tracking.columns = ['order_code', 'tracking_code']
-        
-        print(f"   📄 Tracking: {len(df_tracking)} ردیف")
-        
-        # 3. تطبیق - دقیقاً مثل Streamlit
-        df_tracking['merge_key'] = df_tracking['order_code']
-        
-        # استخراج 9 رقم از Excel - دقیقاً مثل قبل
-        df_excel['merge_key'] = df_excel['کد سفارش'].str.extract(r'(\d{9})', expand=False)
-        
-        # حذف NaN
-        df_excel = df_excel.dropna(subset=['merge_key'])
-        
-        print(f"   📄 Excel پاکسازی شده: {len(df_excel)} ردیف")
-        
-        # Merge
-        merged = pd.merge(df_tracking, df_excel, on='merge_key', how='inner')
+        tracking_rows = []
+        for item in tracking_list:
+            if 'order_code' in item and 'tracking_code' in item:
+                tracking_rows.append((str(item['order_code']), str(item['tracking_code'])))
+            else:
+                # اطمینان از نام ستون‌ها: دو مقدار اول
+                values = list(item.values())
+                tracking_rows.append((str(values[0]), str(values[1])))
+        
+        print(f"   📄 Tracking: {len(tracking_rows)} ردیف")
+        
+        # 2. خواندن جریانی دو ستون اول Excel/CSV (خارج از event loop)
+        suffix = os.path.splitext(excel.filename or "")[1] or ".xlsx"
+        path, _ = await spool_upload(excel, suffix=suffix)
+        try:
+            matcher = ShipmentMatcher(order_code for order_code, _ in tracking_rows)
+            await run_in_threadpool(matcher.feed_all, iter_mapping_rows(path, excel.filename))
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        
+        print(f"   📄 Excel: {matcher.rows_read} ردیف")
+        print(f"   📄 Excel پاکسازی شده: {matcher.rows_with_key} ردیف")
+        
+        # 3. تطبیق - با همان ترتیب merge در Streamlit
+        merged = matcher.merge(tracking_rows, key_func=lambda row: row[0])
         
         print(f"   ✓ تطبیق یافته: {len(merged)} ردیف")
         
         # 4. جستجو در دیتابیس
         results = []
         
-        for _, row in merged.iterrows():
-            shipment_id = str(row['شناسه محموله'])
-            order_code = str(row['order_code'])
-            tracking_code = str(row['tracking_code'])
-            
-            # جستجو با shipment_id
-            order = db.query(Order).filter(
-                Order.shipment_id == shipment_id
-            ).first()
+        merged_rows = [
+            (shipment_cell, order_code, tracking_code)
+            for (order_code, tracking_code), _, shipment_cell in merged
+        ]
+        
+        # جستجوی همه shipment_idها با یک کوئری
+        orders_by_shipment = fetch_orders_by(db, Order.shipment_id, [row[0] for row in merged_rows])
+        
+        for shipment_id, order_code, tracking_code in merged_rows:
+            order = orders_by_shipment.get(shipment_id)
             
             if order:
                 results.append({
@@ -261,18 +492,21 @@ async def match_excel(
                 print(f"   ✗ {order_code} -> یافت نشد در DB")
         
         # 5. پیدا کردن سفارشاتی که در Excel نبودند
-        excel_order_codes = set(df_excel['merge_key'].dropna())
-        tracking_order_codes = set(df_tracking['order_code'])
+        tracking_order_codes = set(order_code for order_code, _ in tracking_rows)
         
-        not_in_excel = tracking_order_codes - excel_order_codes
+        not_in_excel = tracking_order_codes - matcher.matched_keys
         
         if not_in_excel:
+            # اولین کد رهگیری هر سفارش
+            first_tracking = {}
+            for order_code, tracking_code in tracking_rows:
+                first_tracking.setdefault(order_code, tracking_code)
+            
             print(f"\n⚠️  {len(not_in_excel)} سفارش در Excel یافت نشد:")
             for order_code in not_in_excel:
-                tracking_row = df_tracking[df_tracking['order_code'] == order_code].iloc[0]
                 results.append({
                     "order_code": order_code,
-                    "tracking_code": tracking_row['tracking_code'],
+                    "tracking_code": first_tracking[order_code],
                     "shipment_id": None,
                     "customer_name": None,
                     "city": None,
@@ -335,4 +569,152 @@ async def submit_tracking(
     except Exception as e:
         db.rollback()
         print(f"❌ خطا: {e}")
-        raise HTTPException(status_code=500, detail=f"خطا: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"خطا: {str(e)}")
+
+@router.post("/submit-bulk")
+async def submit_tracking_bulk(request: BulkSubmitRequest, db: Session = Depends(get_db)):
+    """
+    ثبت گروهی کدهای رهگیری در یک تراکنش
+    
+    هر ردیف جداگانه اعتبارسنجی می‌شود و نتیجه آن برگردانده می‌شود؛
+    ردیف‌های معتبر همگی با یک commit ثبت می‌شوند.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="لیست کدهای رهگیری خالی است")
+    
+    print(f"\n📮 ثبت گروهی {len(request.items)} کد رهگیری...")
+    
+    orders_by_id = fetch_orders_by(db, Order.id, [item.order_id for item in request.items])
+    dispatch_date = request.dispatch_date or datetime.utcnow()
+    
+    results = []
+    seen_order_ids = set()
+    
+    try:
+        for item in request.items:
+            tracking_code = item.tracking_code.strip()
+            order = orders_by_id.get(item.order_id)
+            error = None
+            
+            if not tracking_code or tracking_code == 'نامشخص':
+                error = "کد رهگیری خالی است"
+            elif len(tracking_code) > 50:
+                error = "کد رهگیری بیش از حد طولانی است"
+            elif item.order_id in seen_order_ids:
+                error = "سفارش تکراری در لیست"
+            elif not order:
+                error = "سفارش یافت نشد"
+            
+            if error:
+                results.append({
+                    "order_id": item.order_id,
+                    "order_code": order.order_code if order else None,
+                    "tracking_code": tracking_code,
+                    "success": False,
+                    "error": error
+                })
+                continue
+            
+            seen_order_ids.add(item.order_id)
+            order.tracking_code = tracking_code
+            if request.mark_dispatched:
+                order.is_warehouse_dispatched = True
+                order.dispatch_date = dispatch_date
+            
+            results.append({
+                "order_id": order.id,
+                "order_code": order.order_code,
+                "tracking_code": tracking_code,
+                "success": True,
+                "error": None
+            })
+        
+        db.commit()
+    
+    except Exception as e:
+        db.rollback()
+        print(f"❌ خطا در ثبت گروهی: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا: {str(e)}")
+    
+    updated_count = sum(1 for r in results if r["success"])
+    print(f"✅ {updated_count} کد رهگیری ثبت شد، {len(results) - updated_count} ناموفق\n")
+    
+    return {
+        "success": True,
+        "total": len(results),
+        "updated": updated_count,
+        "failed": len(results) - updated_count,
+        "results": results
+    }
+
+
+@router.post("/push-digikala")
+async def push_to_digikala(request: PushDigikalaRequest, db: Session = Depends(get_db)):
+    """
+    ارسال گروهی کدهای رهگیری به پنل فروشنده دیجی‌کالا
+    
+    ورودی: شناسه سفارشات (کد رهگیری از دیتابیس خوانده می‌شود) یا لیست
+    (shipment_id, tracking_code). کدهایی که قبلاً پذیرفته شده‌اند دوباره ارسال نمی‌شوند.
+    """
+    items = []
+    
+    if request.order_ids:
+        orders_by_id = fetch_orders_by(db, Order.id, request.order_ids)
+        for order_id in request.order_ids:
+            order = orders_by_id.get(order_id)
+            if not order:
+                continue
+            items.append({
+                "order_id": order.id,
+                "shipment_id": order.shipment_id,
+                "tracking_code": order.tracking_code
+            })
+    
+    if request.items:
+        items.extend(
+            {"order_id": None, "shipment_id": item.shipment_id, "tracking_code": item.tracking_code}
+            for item in request.items
+        )
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="هیچ کد رهگیری برای ارسال مشخص نشده است")
+    
+    try:
+        return await push_tracking_codes(db, items, force=request.force)
+    except TrackingPushError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        print(f"❌ خطا در ارسال به دیجی‌کالا: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"خطا: {str(e)}")
+
+
+@router.get("/pushes")
+async def get_push_states(
+    status: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """وضعیت ارسال کدهای رهگیری به دیجی‌کالا"""
+    query = db.query(TrackingPush)
+    if status:
+        query = query.filter(TrackingPush.status == status)
+    
+    pushes = query.order_by(TrackingPush.updated_at.desc()).limit(limit).all()
+    
+    return [
+        {
+            "shipment_id": push.shipment_id,
+            "order_id": push.order_id,
+            "tracking_code": push.tracking_code,
+            "status": push.status,
+            "attempts": push.attempts,
+            "last_status_code": push.last_status_code,
+            "error_message": push.error_message,
+            "accepted_at": push.accepted_at.isoformat() if push.accepted_at else None,
+            "updated_at": push.updated_at.isoformat() if push.updated_at else None
+        }
+        for push in pushes
+    ]
@@ -14,7 +14,7 @@ from database.warehouse_models_extended import (
     Warehouse, WarehouseProduct, ProductCategory, 
     Marketplace, ProductMarketplace, InventoryTransaction,
     StockTake, StockTakeItem, TransactionType, StockTakeStatus,
-    generate_transaction_number, generate_stock_take_number
+    generate_transaction_number, apply_stock_change
 )
 import os
 
@@ -642,21 +642,32 @@ async def create_transaction(
     if not product:
         raise HTTPException(status_code=404, detail="محصول یافت نشد")
     
-    quantity_before = product.stock_quantity
+    # شماره تراکنش در همین تراکنش دیتابیس گرفته می‌شود (با rollback آزاد می‌شود)
+    transaction_number = generate_transaction_number(db)
     
-    # محاسبه موجودی جدید
+    # تغییر موجودی با UPDATE شرطی در دیتابیس (بدون خواندن و بازنویسی در Python)
     if transaction.type in [TransactionType.RECEIVE, TransactionType.RETURN]:
-        quantity_after = quantity_before + transaction.quantity
+        delta = transaction.quantity
     elif transaction.type in [TransactionType.DISPATCH, TransactionType.DAMAGE]:
-        quantity_after = quantity_before - transaction.quantity
-        if quantity_after < 0:
+        delta = -transaction.quantity
+    else:
+        delta = 0
+    
+    if delta:
+        quantity_after = apply_stock_change(
+            db, product.id, delta,
+            allow_negative=transaction.type not in [TransactionType.DISPATCH, TransactionType.DAMAGE]
+        )
+        if quantity_after is None:
+            db.rollback()
             raise HTTPException(status_code=400, detail="موجودی کافی نیست")
     else:
-        quantity_after = quantity_before
+        quantity_after = product.stock_quantity or 0
+    quantity_before = quantity_after - delta
     
     # ایجاد تراکنش
     new_transaction = InventoryTransaction(
-        transaction_number=generate_transaction_number(),
+        transaction_number=transaction_number,
         type=transaction.type,
         product_id=transaction.product_id,
         warehouse_id=transaction.warehouse_id,
@@ -672,11 +683,6 @@ async def create_transaction(
         is_approved=True
     )
     
-    # به‌روزرسانی موجودی
-    product.stock_quantity = quantity_after
-    product.last_stock_update = datetime.utcnow()
-    product.update_available_quantity()
-    
     db.add(new_transaction)
     db.commit()
     
@@ -0,0 +1,215 @@
+# backend/services/audit_log.py
+"""
+ثبت دسته‌ای لاگ فعالیت کاربران
+
+log_audit در روتر auth به جای add + commit روی session درخواست، رکورد را در
+صف حافظه قرار می‌دهد. task پس‌زمینه رکوردها را هر AUDIT_FLUSH_SECONDS یا با
+رسیدن به AUDIT_BATCH_SIZE رکورد با یک INSERT و یک commit ذخیره می‌کند.
+هنگام خاموش شدن سرور صف خالی می‌شود و اگر صف پر باشد یا worker در حال
+اجرا نباشد رکورد مستقیماً (همزمان) نوشته می‌شود.
+
+اگر نوشتن دسته خطا بدهد رکوردها به _pending برمی‌گردند و تا AUDIT_WRITE_RETRIES
+بار با فاصله افزایشی دوباره نوشته می‌شوند؛ پس از آن هر رکورد جداگانه نوشته
+می‌شود تا فقط رکوردهای خراب از دست بروند.
+
+لاگ‌های قدیمی‌تر از AUDIT_RETENTION_DAYS با task جداگانه روزی یک بار حذف می‌شوند.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database.models import init_database, get_session
+from database.auth_models import AuditLog
+
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_WRITE_RETRIES = int(os.getenv("AUDIT_WRITE_RETRIES", "3"))
+AUDIT_RETRY_BASE_SECONDS = 1.0
+AUDIT_RETRY_MAX_SECONDS = 30.0
+
+# 0 یعنی نگهداری بدون محدودیت
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "180"))
+AUDIT_PURGE_INTERVAL_SECONDS = 24 * 60 * 60
+
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'digikala_sales.db')
+
+
+class AuditWriter:
+    """صف لاگ فعالیت با ذخیره دسته‌ای در پس‌زمینه"""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._engine = None
+        self._queue = None
+        self._task = None
+        self._purge_task = None
+        self._pending = []
+
+    def _session(self) -> Session:
+        if self._engine is None:
+            self._engine = init_database(self.db_path)
+        return get_session(self._engine)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._run())
+        if AUDIT_RETENTION_DAYS > 0:
+            self._purge_task = loop.create_task(self._purge_loop())
+        print("📝 worker لاگ فعالیت شروع شد")
+
+    async def stop(self):
+        """توقف worker و ذخیره رکوردهای باقی‌مانده در صف"""
+        if not self.running:
+            return
+        for task in (self._task, self._purge_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._purge_task = None
+
+        remaining = self._pending + self._drain()
+        self._pending = []
+        if remaining:
+            try:
+                await asyncio.to_thread(self.write, remaining)
+            except Exception as e:
+                print(f"❌ خطا در ذخیره {len(remaining)} لاگ فعالیت: {e} - ذخیره تک‌به‌تک")
+                await asyncio.to_thread(self.write_each, remaining)
+        print(f"🛑 worker لاگ فعالیت متوقف شد ({len(remaining)} رکورد باقی‌مانده ذخیره شد)")
+
+    def log(self, **entry):
+        """ثبت یک رکورد (بدون انتظار برای نوشتن در دیتابیس)"""
+        entry.setdefault("created_at", datetime.utcnow())
+
+        if self.running:
+            try:
+                self._queue.put_nowait(entry)
+                return
+            except asyncio.QueueFull:
+                print("⚠️ صف لاگ فعالیت پر است - ثبت مستقیم")
+
+        self.write([entry])
+
+    def write(self, entries: List[dict]):
+        """نوشتن یک دسته رکورد با یک commit"""
+        db = self._session()
+        try:
+            db.execute(insert(AuditLog), entries)
+            db.commit()
+        finally:
+            db.close()
+
+    def write_each(self, entries: List[dict]) -> int:
+        """نوشتن رکوردها تک‌به‌تک (رکورد خراب بقیه را از بین نمی‌برد)؛ تعداد رکوردهای ذخیره نشده"""
+        failed = 0
+        db = self._session()
+        try:
+            for entry in entries:
+                try:
+                    db.execute(insert(AuditLog), [entry])
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    failed += 1
+                    print(f"❌ لاگ فعالیت ذخیره نشد ({entry.get('action')}): {e}")
+        finally:
+            db.close()
+        return failed
+
+    def purge(self, retention_days: int = AUDIT_RETENTION_DAYS) -> int:
+        """حذف لاگ‌های قدیمی‌تر از retention_days روز"""
+        if retention_days <= 0:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        db = self._session()
+        try:
+            count = db.query(AuditLog).filter(AuditLog.created_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if count:
+            print(f"🧹 {count} لاگ فعالیت قدیمی‌تر از {retention_days} روز حذف شد")
+        return count
+
+    def _drain(self, limit: Optional[int] = None) -> List[dict]:
+        entries = []
+        while not self._queue.empty() and (limit is None or len(entries) < limit):
+            entries.append(self._queue.get_nowait())
+        return entries
+
+    async def _run(self):
+        while True:
+            entries = self._pending = [await self._queue.get()]
+
+            # جمع کردن رکوردها تا رسیدن به اندازه دسته یا پایان مهلت
+            deadline = time.monotonic() + AUDIT_FLUSH_SECONDS
+            while len(entries) < AUDIT_BATCH_SIZE:
+                entries.extend(self._drain(AUDIT_BATCH_SIZE - len(entries)))
+                timeout = deadline - time.monotonic()
+                if len(entries) >= AUDIT_BATCH_SIZE or timeout <= 0:
+                    break
+                try:
+                    entries.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(entries)
+
+    async def _flush(self, entries: List[dict]):
+        """نوشتن دسته با تلاش مجدد؛ در صورت شکست نهایی نوشتن تک‌به‌تک"""
+        delay = AUDIT_RETRY_BASE_SECONDS
+        for attempt in range(1, AUDIT_WRITE_RETRIES + 1):
+            # از این لحظه نوشتن حتی با لغو task در thread کامل می‌شود
+            self._pending = []
+            try:
+                await asyncio.to_thread(self.write, entries)
+                return
+            except Exception as e:
+                # بازگرداندن رکوردها تا stop در حین انتظار آن‌ها را از دست ندهد
+                self._pending = entries
+                print(f"❌ خطا در ذخیره {len(entries)} لاگ فعالیت (تلاش {attempt}/{AUDIT_WRITE_RETRIES}): {e}")
+            if attempt < AUDIT_WRITE_RETRIES:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, AUDIT_RETRY_MAX_SECONDS)
+
+        self._pending = []
+        failed = await asyncio.to_thread(self.write_each, entries)
+        if failed:
+            print(f"⚠️ {failed} از {len(entries)} لاگ فعالیت ذخیره نشد")
+
+    async def _purge_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.purge)
+            except Exception as e:
+                print(f"❌ خطا در حذف لاگ‌های فعالیت قدیمی: {e}")
+            await asyncio.sleep(AUDIT_PURGE_INTERVAL_SECONDS)
+
+
+audit_writer = AuditWriter()
+
+
+def start_audit_writer():
+    audit_writer.start()
+
+
+async def stop_audit_writer():
+    await audit_writer.stop()
@@ -0,0 +1,178 @@
+# backend/services/auth_cache.py
+"""
+کش کوتاه‌مدت کاربران احراز هویت شده
+
+به جای کوئری User و بارگذاری تنبل نقش‌ها و مجوزها در هر درخواست، اطلاعات
+لازم برای احراز هویت (شناسه، وضعیت فعال بودن و مجموعه مجوزها) یک بار
+خوانده و تا AUTH_CACHE_TTL_SECONDS در حافظه نگه داشته می‌شود. ویرایش، حذف یا
+تخصیص نقش به کاربر از طریق روتر auth کش همان کاربر را باطل می‌کند.
+
+با AUTH_EMBED_PERMISSIONS=1 مجوزها به صورت bitmask همراه با role_version کاربر
+داخل JWT قرار می‌گیرند و چک مجوز بدون خواندن نقش‌ها انجام می‌شود. نسخه نقش
+همه کاربران با یک کوئری در هر AUTH_VERSION_TTL_SECONDS خوانده می‌شود؛ token
+با نسخه قدیمی به مسیر کش بالا برمی‌گردد.
+"""
+
+import os
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from database.auth_models import User, Role, PermissionType
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_EMBED_PERMISSIONS = os.getenv("AUTH_EMBED_PERMISSIONS", "").lower() in ("1", "true", "yes")
+AUTH_VERSION_TTL_SECONDS = float(os.getenv("AUTH_VERSION_TTL_SECONDS", "5"))
+
+# جایگاه هر مجوز در bitmask (ترتیب PermissionType؛ مجوز جدید فقط به انتها اضافه شود)
+PERMISSION_BITS: Dict[str, int] = {perm.value: index for index, perm in enumerate(PermissionType)}
+
+
+class Principal:
+    """نمای فقط‌خواندنی کاربر برای احراز هویت و چک مجوز"""
+
+    __slots__ = ("id", "username", "is_active", "is_superuser", "roles", "permissions")
+
+    def __init__(self, id: int, username: str, is_active: bool, is_superuser: bool,
+                 roles: Tuple[str, ...], permissions: FrozenSet[str]):
+        self.id = id
+        self.username = username
+        self.is_active = is_active
+        self.is_superuser = is_superuser
+        self.roles = roles
+        self.permissions = permissions
+
+    def has_permission(self, permission: str) -> bool:
+        return self.is_superuser or permission in self.permissions
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            roles=tuple(role.name for role in user.roles),
+            permissions=frozenset(
+                perm.name for role in user.roles for perm in role.permissions
+            )
+        )
+
+
+# username -> (زمان ذخیره، Principal)
+_principal_cache: Dict[str, Tuple[float, Principal]] = {}
+
+
+def load_principal(db: Session, username: str) -> Optional[Principal]:
+    """خواندن کاربر با نقش‌ها و مجوزها در یک دور کوئری"""
+    user = db.query(User).options(
+        selectinload(User.roles).selectinload(Role.permissions)
+    ).filter(User.username == username).first()
+    if user is None:
+        return None
+    return Principal.from_user(user)
+
+
+def get_principal(db: Session, username: str) -> Optional[Principal]:
+    """Principal کاربر از کش (در صورت نبود یا انقضا از دیتابیس)"""
+    cached = _principal_cache.get(username)
+    if cached is not None and time.monotonic() - cached[0] < AUTH_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    principal = load_principal(db, username)
+    if principal is None:
+        _principal_cache.pop(username, None)
+        return None
+
+    _principal_cache[username] = (time.monotonic(), principal)
+    return principal
+
+
+def invalidate_user(username: Optional[str] = None, user_id: Optional[int] = None):
+    """باطل کردن کش یک کاربر (با نام کاربری یا شناسه)"""
+    if username is not None:
+        _principal_cache.pop(username, None)
+    if user_id is not None:
+        for key, (_, principal) in list(_principal_cache.items()):
+            if principal.id == user_id:
+                _principal_cache.pop(key, None)
+    _role_versions["loaded_at"] = 0.0
+
+
+# ==================== مجوزهای داخل token ====================
+
+def encode_permissions(permissions: Iterable[str]) -> str:
+    """bitmask مجوزها به صورت hex (مجوزهای خارج از PermissionType نادیده گرفته می‌شوند)"""
+    mask = 0
+    for name in permissions:
+        bit = PERMISSION_BITS.get(name)
+        if bit is not None:
+            mask |= 1 << bit
+    return format(mask, "x")
+
+
+def decode_permissions(mask: str) -> FrozenSet[str]:
+    value = int(mask, 16)
+    return frozenset(name for name, bit in PERMISSION_BITS.items() if value >> bit & 1)
+
+
+def permission_claims(principal: Principal, role_version: int) -> dict:
+    """claimهای اضافه access token برای چک مجوز بدون دیتابیس"""
+    return {
+        "uid": principal.id,
+        "su": principal.is_superuser,
+        "roles": list(principal.roles),
+        "perms": encode_permissions(principal.permissions),
+        "rv": role_version,
+    }
+
+
+# user_id -> role_version (برای همه کاربران با یک کوئری)
+_role_versions = {"loaded_at": 0.0, "versions": {}}
+
+
+def get_role_version(db: Session, user_id: int) -> Optional[int]:
+    if time.monotonic() - _role_versions["loaded_at"] >= AUTH_VERSION_TTL_SECONDS:
+        _role_versions["versions"] = {
+            row.id: row.role_version or 0
+            for row in db.query(User.id, User.role_version)
+        }
+        _role_versions["loaded_at"] = time.monotonic()
+    return _role_versions["versions"].get(user_id)
+
+
+def principal_from_claims(db: Session, payload: dict) -> Optional[Principal]:
+    """
+    Principal از روی claimهای token؛ اگر token مجوز ندارد یا نسخه نقش کاربر
+    تغییر کرده None برمی‌گرداند تا از مسیر get_principal خوانده شود
+    """
+    if "rv" not in payload or "perms" not in payload:
+        return None
+    if get_role_version(db, payload["uid"]) != payload["rv"]:
+        return None
+
+    return Principal(
+        id=payload["uid"],
+        username=payload["sub"],
+        is_active=True,
+        is_superuser=bool(payload.get("su")),
+        roles=tuple(payload.get("roles", ())),
+        permissions=decode_permissions(payload["perms"])
+    )
+
+
+def bump_role_version(db: Session, user_ids: Iterable[int]):
+    """
+    افزایش role_version کاربران (پس از تخصیص نقش یا غیرفعال شدن)
+
+    commit بر عهده فراخواننده است.
+    """
+    ids = list(user_ids)
+    if not ids:
+        return
+    db.query(User).filter(User.id.in_(ids)).update(
+        {User.role_version: func.coalesce(User.role_version, 0) + 1},
+        synchronize_session=False
+    )
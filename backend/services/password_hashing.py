@@ -0,0 +1,78 @@
+# backend/services/password_hashing.py
+"""
+هش و بررسی رمز عبور خارج از event loop
+
+bcrypt عمداً کند است (حدود ۱۰۰ میلی‌ثانیه CPU یا بیشتر). اجرای مستقیم آن در
+endpointهای async همه درخواست‌های دیگر را متوقف می‌کند، بنابراین هش و
+بررسی در یک thread pool با تعداد ثابت worker انجام می‌شود (bcrypt هنگام
+محاسبه GIL را آزاد می‌کند).
+
+اگر تنظیمات هش (مثلاً BCRYPT_ROUNDS) تغییر کند، هش کاربر هنگام ورود موفق
+با تنظیمات جدید دوباره ساخته می‌شود.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# min_rounds و max_rounds برابر باعث می‌شوند هر هشی با rounds متفاوت (کمتر یا بیشتر)
+# نیاز به به‌روزرسانی داشته باشد
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    """thread pool مشترک هش رمز عبور (در اولین استفاده ساخته می‌شود)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                           thread_name_prefix="password-hash")
+        return _executor
+
+
+def shutdown_hash_executor():
+    """بستن thread pool هنگام خاموش شدن سرور"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_hash_executor(), func, *args)
+
+
+async def hash_password(password: str) -> str:
+    """هش کردن رمز عبور"""
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    بررسی رمز عبور
+
+    Returns:
+        (درست بودن رمز، هش جدید در صورتی که هش فعلی با تنظیمات قدیمی ساخته شده باشد)
+    """
+    try:
+        return await _run(pwd_context.verify_and_update, password, password_hash)
+    except ValueError:
+        # هش نامعتبر یا ناشناخته در دیتابیس
+        return False, None
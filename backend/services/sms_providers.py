@@ -0,0 +1,480 @@
+# backend/services/sms_providers.py
+"""
+ارائه‌دهندگان ارسال پیامک
+
+هر ارائه‌دهنده (گوشی KDE Connect، درگاه HTTP یا stub محلی) محدودکننده سرعت و
+وضعیت سلامت مخصوص خود را دارد. ProviderPool پیامک‌های صف را به روش
+round-robin یا least-loaded بین ارائه‌دهندگان سالم تقسیم می‌کند تا همه به
+صورت موازی ارسال کنند؛ اضافه کردن گوشی دوم ظرفیت را تقریباً دو برابر می‌کند.
+"""
+
+import asyncio
+import os
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from services.tracking_service import AsyncRateLimiter
+
+DEFAULT_DEVICE_ID = "8840ef7242ad4049afc617c52ecb5f57"
+KDECONNECT_CLI_PATH = os.getenv("KDECONNECT_CLI_PATH", r"C:\Program Files\KDE Connect\bin\kdeconnect-cli.exe")
+
+SMS_SEND_INTERVAL = float(os.getenv("SMS_SEND_INTERVAL", "2"))  # ثانیه بین دو پیامک هر گوشی
+SMS_SEND_TIMEOUT = 15
+SMS_PING_TIMEOUT = 5
+
+SMS_PROVIDER_STRATEGY = os.getenv("SMS_PROVIDER_STRATEGY", "round_robin")  # round_robin | least_loaded
+SMS_PROVIDER_MAX_FAILURES = int(os.getenv("SMS_PROVIDER_MAX_FAILURES", "3"))
+SMS_PROVIDER_RECHECK_SECONDS = float(os.getenv("SMS_PROVIDER_RECHECK_SECONDS", "30"))
+
+# اعتبار نتیجه بررسی سلامت ارائه‌دهنده سالم و فاصله بررسی دوره‌ای پس‌زمینه
+SMS_HEALTH_TTL_SECONDS = float(os.getenv("SMS_HEALTH_TTL_SECONDS", "60"))
+SMS_HEALTH_PROBE_INTERVAL = float(os.getenv("SMS_HEALTH_PROBE_INTERVAL", "30"))
+
+# (اندیس پیامک، موفقیت، پیام) - ثبت نتیجه هر پیامک بلافاصله پس از ارسال
+ResultCallback = Callable[[int, bool, str], None]
+
+
+class SMSProvider(ABC):
+    """کلاس پایه ارائه‌دهنده پیامک"""
+
+    kind = "base"
+    batch_size = 1
+
+    def __init__(self, name: str, rate_per_second: float):
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.limiter = AsyncRateLimiter(rate_per_second)
+        self.healthy: Optional[bool] = None  # None = هنوز بررسی نشده
+        self.status_message = "بررسی نشده"
+        self.last_check = 0.0  # 0 = نتیجه کش شده معتبر نیست
+        self._probe: Optional[asyncio.Task] = None
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.sent_count = 0
+        self.failed_count = 0
+
+    @property
+    def capacity(self) -> float:
+        """تعداد پیامک قابل ارسال در ثانیه"""
+        if self.rate_per_second <= 0:
+            return 1000.0  # بدون محدودیت سرعت
+        return self.rate_per_second * self.batch_size
+
+    @abstractmethod
+    async def send(self, phone: str, message: str) -> Tuple[bool, str]:
+        """ارسال یک پیامک؛ (موفقیت، پیام نتیجه)"""
+
+    async def health_check(self) -> Tuple[bool, str]:
+        return True, "آماده"
+
+    async def deliver(self, messages: List[Tuple[str, str]], on_result: ResultCallback):
+        """ارسال تک‌تک پیامک‌ها با رعایت محدودیت سرعت همین ارائه‌دهنده"""
+        for index, (phone, message) in enumerate(messages):
+            await self.limiter.acquire()
+            self.in_flight += 1
+            try:
+                success, result = await self.send(phone, message)
+            finally:
+                self.in_flight -= 1
+            self.record_result(success)
+            on_result(index, success, result)
+
+    def health_is_fresh(self, now: Optional[float] = None) -> bool:
+        """آیا نتیجه کش شده سلامت هنوز معتبر است؟"""
+        if not self.last_check:
+            return False
+        ttl = SMS_HEALTH_TTL_SECONDS if self.healthy else SMS_PROVIDER_RECHECK_SECONDS
+        return (now or time.monotonic()) - self.last_check < ttl
+
+    async def _run_probe(self) -> bool:
+        try:
+            healthy, message = await self.health_check()
+        except Exception as e:
+            healthy, message = False, str(e)
+        self.healthy = healthy
+        self.status_message = message
+        self.last_check = time.monotonic()
+        if healthy:
+            self.consecutive_failures = 0
+        return healthy
+
+    async def refresh_health(self) -> bool:
+        """بررسی سلامت؛ درخواست‌های همزمان منتظر همان یک بررسی می‌مانند"""
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.ensure_future(self._run_probe())
+        return await asyncio.shield(self._probe)
+
+    def record_result(self, success: bool):
+        """ثبت نتیجه یک پیامک که با یک درخواست جداگانه ارسال شده است"""
+        self.record_count(success)
+        self.record_health(success)
+
+    def record_count(self, success: bool):
+        """شمارنده پیامک‌های ارسال شده / ناموفق"""
+        if success:
+            self.sent_count += 1
+        else:
+            self.failed_count += 1
+
+    def record_health(self, success: bool):
+        """ثبت نتیجه یک درخواست به ارائه‌دهنده در وضعیت سلامت"""
+        if success:
+            self.consecutive_failures = 0
+            if not self.healthy:
+                self.healthy = True
+                self.status_message = "متصل"
+                self.last_check = time.monotonic()
+            return
+
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= SMS_PROVIDER_MAX_FAILURES:
+            self.healthy = False
+            self.status_message = f"{self.consecutive_failures} خطای پیاپی"
+            self.last_check = time.monotonic()
+        else:
+            # پس از خطا، نتیجه کش شده باطل می‌شود تا پیش از ارسال بعدی دوباره بررسی شود
+            self.last_check = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "healthy": self.healthy,
+            "status_message": self.status_message,
+            "checked_seconds_ago": round(time.monotonic() - self.last_check, 1) if self.last_check else None,
+            "rate_per_second": self.rate_per_second,
+            "batch_size": self.batch_size,
+            "in_flight": self.in_flight,
+            "sent": self.sent_count,
+            "failed": self.failed_count
+        }
+
+
+async def run_command(command: List[str], timeout: float) -> Tuple[int, str]:
+    """اجرای دستور بدون مسدود کردن event loop؛ (کد خروج، stderr)"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except NotImplementedError:
+        # SelectorEventLoop در ویندوز subprocess async ندارد
+        result = await asyncio.to_thread(subprocess.run, command, capture_output=True, timeout=timeout)
+        return result.returncode, result.stderr.decode('utf-8', errors='ignore')
+
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(command, timeout)
+
+    return process.returncode, stderr.decode('utf-8', errors='ignore')
+
+
+class KDEConnectProvider(SMSProvider):
+    """ارسال از طریق یک گوشی متصل با KDE Connect"""
+
+    kind = "kde_connect"
+
+    def __init__(self, device_id: str, cli_path: str = KDECONNECT_CLI_PATH,
+                 rate_per_second: Optional[float] = None):
+        if rate_per_second is None:
+            rate_per_second = 1.0 / SMS_SEND_INTERVAL if SMS_SEND_INTERVAL > 0 else 0
+        super().__init__(f"kde:{device_id[:8]}", rate_per_second)
+        self.device_id = device_id
+        self.cli_path = cli_path
+
+    async def send(self, phone: str, message: str) -> Tuple[bool, str]:
+        command = [
+            self.cli_path,
+            "--device", self.device_id,
+            "--send-sms", message,
+            "--destination", phone
+        ]
+        try:
+            returncode, stderr = await run_command(command, SMS_SEND_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return False, "زمان ارسال پیامک تمام شد"
+        except Exception as e:
+            return False, str(e)
+
+        if returncode == 0:
+            return True, "پیامک ارسال شد"
+        return False, stderr
+
+    async def health_check(self) -> Tuple[bool, str]:
+        if not os.path.exists(self.cli_path):
+            return False, "KDE Connect نصب نیست"
+        try:
+            returncode, _ = await run_command(
+                [self.cli_path, "--device", self.device_id, "--ping"], SMS_PING_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            return False, "زمان پاسخگویی KDE Connect تمام شد"
+        except Exception as e:
+            return False, str(e)
+
+        if returncode == 0:
+            return True, "متصل"
+        return False, "دستگاه آفلاین است"
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "device_id": self.device_id}
+
+
+class HTTPGatewayProvider(SMSProvider):
+    """
+    درگاه پیامک HTTP با ارسال گروهی
+
+    بدنه درخواست: {"sender": ..., "messages": [{"to": ..., "text": ...}, ...]}
+    در صورتی که پاسخ شامل لیست results باشد، نتیجه هر پیامک از آن خوانده می‌شود.
+    """
+
+    kind = "http_gateway"
+
+    def __init__(self, url: str, api_key: str = "", sender: str = "",
+                 rate_per_second: float = 1.0, batch_size: int = 100,
+                 health_url: Optional[str] = None):
+        super().__init__("gateway", rate_per_second)
+        self.url = url
+        self.api_key = api_key
+        self.sender = sender
+        self.batch_size = max(1, batch_size)
+        self.health_url = health_url
+
+    def _headers(self) -> dict:
+        headers = {"accept": "application/json", "content-type": "application/json"}
+        if self.api_key:
+            headers["authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _post_batch(self, messages: List[Tuple[str, str]]) -> Tuple[bool, List[Tuple[bool, str]]]:
+        """
+        ارسال یک دسته با یک درخواست HTTP
+
+        Returns:
+            (موفقیت خود درخواست، نتیجه هر پیامک)
+        """
+        payload = {
+            "sender": self.sender,
+            "messages": [{"to": phone, "text": message} for phone, message in messages]
+        }
+        try:
+            response = requests.post(self.url, json=payload, headers=self._headers(), timeout=30)
+        except requests.exceptions.RequestException as e:
+            return False, [(False, str(e))] * len(messages)
+
+        if not 200 <= response.status_code < 300:
+            return False, [(False, f"خطای درگاه ({response.status_code}): {response.text[:200]}")] * len(messages)
+
+        try:
+            results = response.json().get("results")
+        except (ValueError, AttributeError):
+            results = None
+
+        if not isinstance(results, list) or len(results) != len(messages):
+            return True, [(True, "پیامک ارسال شد")] * len(messages)
+
+        outcome = []
+        for item in results:
+            success = bool(item.get("success", item.get("status") in ("ok", "sent", "queued")))
+            outcome.append((success, "پیامک ارسال شد" if success else str(item.get("error") or item)))
+        return True, outcome
+
+    async def send(self, phone: str, message: str) -> Tuple[bool, str]:
+        _, outcome = await asyncio.to_thread(self._post_batch, [(phone, message)])
+        return outcome[0]
+
+    async def deliver(self, messages: List[Tuple[str, str]], on_result: ResultCallback):
+        """ارسال در دسته‌های batch_size تایی - هر دسته یک درخواست HTTP"""
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start:start + self.batch_size]
+            await self.limiter.acquire()
+            self.in_flight += len(chunk)
+            try:
+                request_ok, outcome = await asyncio.to_thread(self._post_batch, chunk)
+            finally:
+                self.in_flight -= len(chunk)
+
+            # سلامت درگاه با نتیجه هر درخواست سنجیده می‌شود، نه تک‌تک پیامک‌های آن
+            self.record_health(request_ok)
+            for offset, (success, result) in enumerate(outcome):
+                self.record_count(success)
+                on_result(start + offset, success, result)
+
+    async def health_check(self) -> Tuple[bool, str]:
+        if not self.health_url:
+            return True, "آماده"
+        try:
+            response = await asyncio.to_thread(
+                requests.get, self.health_url, headers=self._headers(), timeout=SMS_PING_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            return False, str(e)
+        if 200 <= response.status_code < 300:
+            return True, "متصل"
+        return False, f"خطای درگاه ({response.status_code})"
+
+
+class StubProvider(SMSProvider):
+    """ارائه‌دهنده محلی برای تست - پیامکی ارسال نمی‌شود"""
+
+    kind = "stub"
+
+    def __init__(self, name: str = "stub", rate_per_second: float = 0, delay: float = 0.0,
+                 fail_numbers: Optional[set] = None):
+        super().__init__(name, rate_per_second)
+        self.delay = delay
+        self.fail_numbers = fail_numbers or set()
+        self.outbox: List[Tuple[str, str]] = []
+
+    async def send(self, phone: str, message: str) -> Tuple[bool, str]:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if phone in self.fail_numbers:
+            return False, "خطای شبیه‌سازی شده"
+        self.outbox.append((phone, message))
+        print(f"🧪 [{self.name}] پیامک برای {phone} شبیه‌سازی شد")
+        return True, "پیامک ارسال شد (stub)"
+
+
+class ProviderPool:
+    """تقسیم پیامک‌ها بین ارائه‌دهندگان سالم"""
+
+    def __init__(self, providers: List[SMSProvider], strategy: str = SMS_PROVIDER_STRATEGY):
+        self.providers = providers
+        self.strategy = strategy
+        self._cursor = 0
+        self._monitor: Optional[asyncio.Task] = None
+
+    def available(self) -> List[SMSProvider]:
+        """ارائه‌دهندگانی که ناسالم علامت نخورده‌اند"""
+        return [p for p in self.providers if p.healthy is not False]
+
+    async def check_health(self, force: bool = False) -> List[SMSProvider]:
+        """
+        سلامت ارائه‌دهندگان از کش؛ فقط موارد منقضی (یا همه در حالت force) بررسی می‌شوند
+
+        نتیجه سالم SMS_HEALTH_TTL_SECONDS و نتیجه ناسالم SMS_PROVIDER_RECHECK_SECONDS
+        معتبر است؛ خطای ارسال نتیجه کش شده را باطل می‌کند.
+        """
+        now = time.monotonic()
+        stale = [p for p in self.providers if force or not p.health_is_fresh(now)]
+        if stale:
+            await asyncio.gather(*(p.refresh_health() for p in stale))
+        return self.available()
+
+    def start_monitor(self):
+        """شروع بررسی دوره‌ای سلامت در پس‌زمینه"""
+        if self._monitor is not None and not self._monitor.done():
+            return
+        self._monitor = asyncio.get_running_loop().create_task(self._monitor_loop())
+
+    async def stop_monitor(self):
+        if self._monitor is None or self._monitor.done():
+            return
+        self._monitor.cancel()
+        try:
+            await self._monitor
+        except asyncio.CancelledError:
+            pass
+        self._monitor = None
+
+    async def _monitor_loop(self):
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                print(f"⚠️ خطا در بررسی سلامت ارائه‌دهندگان پیامک: {e}")
+            await asyncio.sleep(SMS_HEALTH_PROBE_INTERVAL)
+
+    def assign(self, count: int) -> Dict[SMSProvider, List[int]]:
+        """
+        تقسیم اندیس پیامک‌ها بین ارائه‌دهندگان
+
+        round_robin: به نوبت؛ least_loaded: به ارائه‌دهنده‌ای که زودتر از همه
+        صف خود را تمام می‌کند (بر اساس ظرفیت هر ارائه‌دهنده).
+        """
+        providers = self.available()
+        assignments: Dict[SMSProvider, List[int]] = {}
+        if not providers:
+            return assignments
+
+        if self.strategy == "least_loaded":
+            load = {p: p.in_flight for p in providers}
+            for index in range(count):
+                provider = min(providers, key=lambda p: (load[p] + 1) / p.capacity)
+                load[provider] += 1
+                assignments.setdefault(provider, []).append(index)
+            return assignments
+
+        for index in range(count):
+            provider = providers[self._cursor % len(providers)]
+            self._cursor += 1
+            assignments.setdefault(provider, []).append(index)
+        return assignments
+
+    def pick(self) -> Optional[SMSProvider]:
+        """انتخاب یک ارائه‌دهنده برای ارسال تکی"""
+        assignment = self.assign(1)
+        return next(iter(assignment), None)
+
+    @property
+    def claim_size(self) -> int:
+        """تعداد ردیفی که worker در هر دور برمی‌دارد"""
+        return sum(max(p.batch_size, 5) for p in self.available()) or 0
+
+
+def build_providers_from_env() -> List[SMSProvider]:
+    """
+    ساخت ارائه‌دهندگان از متغیرهای محیطی
+
+    SMS_STUB_PROVIDER=1        فقط ارائه‌دهنده stub (برای تست)
+    SMS_KDE_DEVICES            شناسه دستگاه‌ها با کاما (پیش‌فرض: DEVICE_ID)
+    SMS_KDE_RATE               پیامک در ثانیه برای هر گوشی
+    SMS_GATEWAY_URL            آدرس درگاه HTTP (اختیاری)
+    SMS_GATEWAY_API_KEY / SMS_GATEWAY_SENDER / SMS_GATEWAY_RATE /
+    SMS_GATEWAY_BATCH_SIZE / SMS_GATEWAY_HEALTH_URL
+    """
+    if os.getenv("SMS_STUB_PROVIDER", "").lower() in ("1", "true", "yes"):
+        return [StubProvider(delay=float(os.getenv("SMS_STUB_DELAY", "0")))]
+
+    providers: List[SMSProvider] = []
+
+    devices = os.getenv("SMS_KDE_DEVICES") or os.getenv("DEVICE_ID", DEFAULT_DEVICE_ID)
+    kde_rate = os.getenv("SMS_KDE_RATE")
+    for device_id in [d.strip() for d in devices.split(",") if d.strip()]:
+        providers.append(KDEConnectProvider(
+            device_id,
+            rate_per_second=float(kde_rate) if kde_rate else None
+        ))
+
+    gateway_url = os.getenv("SMS_GATEWAY_URL")
+    if gateway_url:
+        providers.append(HTTPGatewayProvider(
+            gateway_url,
+            api_key=os.getenv("SMS_GATEWAY_API_KEY", ""),
+            sender=os.getenv("SMS_GATEWAY_SENDER", ""),
+            rate_per_second=float(os.getenv("SMS_GATEWAY_RATE", "1")),
+            batch_size=int(os.getenv("SMS_GATEWAY_BATCH_SIZE", "100")),
+            health_url=os.getenv("SMS_GATEWAY_HEALTH_URL")
+        ))
+
+    return providers
+
+
+sms_provider_pool = ProviderPool(build_providers_from_env())
+
+
+def start_health_monitor():
+    sms_provider_pool.start_monitor()
+
+
+async def stop_health_monitor():
+    await sms_provider_pool.stop_monitor()
@@ -0,0 +1,337 @@
+# backend/services/sms_service.py
+"""
+صف ارسال پیامک (outbox)
+
+درخواست /sms/send فقط ردیف‌ها را در جدول sms_outbox ثبت می‌کند و بلافاصله
+شناسه batch را برمی‌گرداند. worker پس‌زمینه ردیف‌های صف را برمی‌دارد،
+بین ارائه‌دهندگان سالم (services/sms_providers.py) تقسیم و ارسال می‌کند و
+نتیجه هر پیامک را در SMSLog ثبت می‌کند.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from database.models import Order, SMSLog, SMSOutbox, SentTrackingCode, init_database, get_session
+from services.sms_providers import ProviderPool, sms_provider_pool
+
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", "3"))
+
+# تعداد پیامک‌های آزمایشی که worker در هر دور پردازش می‌کند
+SMS_CLAIM_BATCH = 20
+SMS_WORKER_POLL_SECONDS = 5
+
+# ردیف 'sending' که بیش از این مدت در دست یک worker مانده باشد (مثلاً پروسه
+# متوقف شده) دوباره به صف برمی‌گردد
+SMS_CLAIM_STALE_SECONDS = int(os.getenv("SMS_CLAIM_STALE_SECONDS", "600"))
+
+PENDING_STATUSES = ('queued', 'sending')
+
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'digikala_sales.db')
+
+
+def pending_order_ids(db: Session, order_ids: List[int]) -> set:
+    """سفارشاتی که پیامکشان در صف یا در حال ارسال است"""
+    if not order_ids:
+        return set()
+    rows = db.query(SMSOutbox.order_id).filter(
+        SMSOutbox.order_id.in_(order_ids),
+        SMSOutbox.status.in_(PENDING_STATUSES)
+    ).all()
+    return {row.order_id for row in rows}
+
+
+def mark_tracking_code_sent(db: Session, tracking_code: Optional[str], order_id: Optional[int] = None,
+                            source: str = "backend"):
+    """ثبت کد رهگیری در سوابق مشترک ارسال (همان جدولی که Streamlit استفاده می‌کند)"""
+    if not tracking_code or db.get(SentTrackingCode, tracking_code) is not None:
+        return
+    db.add(SentTrackingCode(tracking_code=tracking_code, order_id=order_id, source=source))
+
+
+def enqueue_sms_batch(db: Session, entries: List[Tuple[Order, str, dict]], dry_run: bool,
+                      template_id: Optional[int] = None) -> str:
+    """
+    ثبت پیامک‌ها در صف ارسال
+
+    Args:
+        entries: لیست (سفارش، متن پیامک، پارامترهای قالب)
+        template_id: قالبی که متن‌ها از آن ساخته شده‌اند
+
+    Returns:
+        شناسه batch برای پیگیری وضعیت
+    """
+    batch_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+
+    for order, message, params in entries:
+        db.add(SMSOutbox(
+            batch_id=batch_id,
+            order_id=order.id,
+            tracking_code=order.tracking_code,
+            phone_number=order.customer_phone,
+            message=message,
+            template_id=template_id,
+            params=json.dumps(params, ensure_ascii=False) if template_id else None,
+            dry_run=dry_run,
+            status='queued',
+            attempts=0,
+            next_attempt_at=now
+        ))
+
+    db.commit()
+    print(f"📥 {len(entries)} پیامک در صف ارسال قرار گرفت (batch: {batch_id})")
+
+    sms_outbox_worker.notify()
+    return batch_id
+
+
+def get_batch_status(db: Session, batch_id: str) -> Optional[dict]:
+    """وضعیت پیامک‌های یک batch"""
+    rows = db.query(SMSOutbox).filter(SMSOutbox.batch_id == batch_id).order_by(SMSOutbox.id).all()
+    if not rows:
+        return None
+
+    counts = {status: 0 for status in ('queued', 'sending', 'sent', 'failed')}
+    for row in rows:
+        counts[row.status] = counts.get(row.status, 0) + 1
+
+    return {
+        "batch_id": batch_id,
+        "total": len(rows),
+        **counts,
+        "pending": counts['queued'] + counts['sending'],
+        "done": counts['queued'] + counts['sending'] == 0,
+        "dry_run": bool(rows[0].dry_run),
+        "items": [{
+            "id": row.id,
+            "order_id": row.order_id,
+            "phone": row.phone_number,
+            "status": row.status,
+            "attempts": row.attempts,
+            "provider": row.provider,
+            "error": row.error_message,
+            "sent_at": row.sent_at.isoformat() if row.sent_at else None
+        } for row in rows]
+    }
+
+
+class SMSOutboxWorker:
+    """worker پس‌زمینه که صف پیامک را بین ارائه‌دهندگان تقسیم و ارسال می‌کند"""
+
+    def __init__(self, pool: ProviderPool, db_path: str = DB_PATH):
+        self.pool = pool
+        self.db_path = db_path
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._engine = None
+        self._task = None
+        self._wake = None
+
+    def _session(self) -> Session:
+        if self._engine is None:
+            self._engine = init_database(self.db_path)
+        return get_session(self._engine)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._wake = asyncio.Event()
+        self._recover()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        print("📨 worker ارسال پیامک شروع شد")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        print("🛑 worker ارسال پیامک متوقف شد")
+
+    def notify(self):
+        """بیدار کردن worker پس از ثبت ردیف جدید (در صورت نیاز شروع آن)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if not self.running:
+            self.start()
+        self._wake.set()
+
+    def _recover(self):
+        """
+        ردیف‌های نیمه‌کاره به صف برمی‌گردند: ردیف‌های همین worker و ردیف‌هایی که
+        برداشت آن‌ها قدیمی است (worker دیگری که متوقف شده). ردیف‌هایی که worker
+        زنده دیگری در حال ارسال آن‌هاست دست نمی‌خورند.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=SMS_CLAIM_STALE_SECONDS)
+        db = self._session()
+        try:
+            count = db.query(SMSOutbox).filter(
+                SMSOutbox.status == 'sending',
+                or_(
+                    SMSOutbox.claimed_by == self.worker_id,
+                    SMSOutbox.claimed_at.is_(None),
+                    SMSOutbox.claimed_at < stale_before
+                )
+            ).update(
+                {SMSOutbox.status: 'queued', SMSOutbox.claimed_by: None, SMSOutbox.claim_token: None},
+                synchronize_session=False
+            )
+            db.commit()
+            if count:
+                print(f"♻️ {count} پیامک نیمه‌کاره به صف برگشت")
+        finally:
+            db.close()
+
+    def _claim(self, db: Session, dry_run: bool, limit: int) -> List[SMSOutbox]:
+        """
+        برداشت اتمی ردیف‌های صف با UPDATE شرطی
+
+        فقط ردیف‌هایی که هنوز 'queued' هستند به این worker داده می‌شوند؛ اگر
+        worker دیگری همزمان همان ردیف‌ها را بردارد، هر ردیف فقط به یکی می‌رسد.
+        """
+        if limit <= 0:
+            return []
+
+        now = datetime.utcnow()
+        ids = [row.id for row in db.query(SMSOutbox.id).filter(
+            SMSOutbox.status == 'queued',
+            SMSOutbox.dry_run == dry_run,
+            SMSOutbox.next_attempt_at <= now
+        ).order_by(SMSOutbox.id).limit(limit)]
+        if not ids:
+            return []
+
+        token = uuid.uuid4().hex
+        claimed = db.query(SMSOutbox).filter(
+            SMSOutbox.id.in_(ids),
+            SMSOutbox.status == 'queued'
+        ).update({
+            SMSOutbox.status: 'sending',
+            SMSOutbox.claimed_by: self.worker_id,
+            SMSOutbox.claim_token: token,
+            SMSOutbox.claimed_at: now
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return []
+
+        return db.query(SMSOutbox).filter(
+            SMSOutbox.claim_token == token
+        ).order_by(SMSOutbox.id).all()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                print(f"❌ خطا در worker پیامک: {e}")
+                processed = 0
+
+            if processed:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=SMS_WORKER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def drain_once(self) -> int:
+        """برداشتن و ارسال یک دسته از صف؛ تعداد ردیف‌های پردازش شده"""
+        await self.pool.check_health()
+
+        self._recover()
+
+        db = self._session()
+        try:
+            # پیامک‌های آزمایشی بدون ارائه‌دهنده پردازش می‌شوند
+            dry_rows = self._claim(db, True, SMS_CLAIM_BATCH)
+            for row in dry_rows:
+                self._finish(db, row, True, "حالت تست - پیامک ارسال نشد", None)
+
+            rows = self._claim(db, False, self.pool.claim_size)
+            if not rows:
+                return len(dry_rows)
+
+            assignments = self.pool.assign(len(rows))
+
+            async def deliver(provider, indices: List[int]):
+                provider_rows = [rows[i] for i in indices]
+                messages = [(row.phone_number, row.message) for row in provider_rows]
+
+                def on_result(index: int, success: bool, result: str):
+                    self._finish(db, provider_rows[index], success, result, provider.name)
+
+                await provider.deliver(messages, on_result)
+
+            await asyncio.gather(*(
+                deliver(provider, indices) for provider, indices in assignments.items()
+            ))
+            return len(dry_rows) + len(rows)
+        finally:
+            db.close()
+
+    def _finish(self, db: Session, row: SMSOutbox, success: bool, result: str, provider: Optional[str]):
+        """ثبت نتیجه ارسال؛ خطاها تا SMS_MAX_ATTEMPTS دوباره در صف قرار می‌گیرند"""
+        row.attempts = (row.attempts or 0) + 1
+        row.provider = provider
+
+        if not success and row.attempts < SMS_MAX_ATTEMPTS:
+            row.status = 'queued'
+            row.claimed_by = None
+            row.claim_token = None
+            row.error_message = result
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=30 * row.attempts)
+            db.commit()
+            print(f"⚠️ ارسال پیامک {row.phone_number} ناموفق بود، تلاش مجدد ({row.attempts}/{SMS_MAX_ATTEMPTS})")
+            return
+
+        # لاگ پیامک‌های قالب‌دار فقط شناسه قالب و پارامترها را نگه می‌دارد
+        sms_log = SMSLog(
+            order_id=row.order_id,
+            tracking_code=row.tracking_code,
+            phone_number=row.phone_number,
+            message=None if row.template_id else row.message,
+            template_id=row.template_id,
+            params=row.params,
+            is_successful=success,
+            error_message=None if success else result
+        )
+        db.add(sms_log)
+        db.flush()
+
+        row.status = 'sent' if success else 'failed'
+        row.error_message = None if success else result
+        row.sms_log_id = sms_log.id
+        if success:
+            row.sent_at = datetime.utcnow()
+            if not row.dry_run:
+                mark_tracking_code_sent(db, row.tracking_code, row.order_id)
+        db.commit()
+
+
+sms_outbox_worker = SMSOutboxWorker(sms_provider_pool)
+
+
+def start_outbox_worker():
+    sms_outbox_worker.start()
+
+
+async def stop_outbox_worker():
+    await sms_outbox_worker.stop()
@@ -0,0 +1,155 @@
+# backend/services/sms_templates.py
+"""
+قالب‌های نسخه‌دار پیامک
+
+متن قالب فقط یک بار در جدول sms_templates ذخیره می‌شود و هر لاگ پیامک فقط
+شناسه قالب و پارامترهای خود (نام مشتری) را نگه می‌دارد. متن کامل هنگام
+خواندن از روی قالب و ستون tracking_code لاگ ساخته می‌شود.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import SMSLog, SMSTemplate
+from utils.constants import COMPANY_NAME
+
+TRACKING_TEMPLATE_NAME = "tracking_notice"
+
+# {greeting} از greeting / default_greeting قالب ساخته می‌شود
+TRACKING_TEMPLATE_BODY = (
+    "{greeting}\n"
+    "بسته شما از طرف «" + COMPANY_NAME + "» ارسال شد. 📦\n\n"
+    "برای پیگیری لحظه‌ای مرسوله، کد رهگیری زیر را در سایت پست وارد نمایید:\n"
+    "🔢 {tracking_code}\n\n"
+    "tracking.post.ir"
+)
+TRACKING_TEMPLATE_GREETING = "سلام {customer_name} عزیز،"
+TRACKING_TEMPLATE_DEFAULT_GREETING = "سلام دوست عزیز،"
+
+# تلاش‌های درج نسخه جدید در صورت برخورد با درج همزمان
+TEMPLATE_INSERT_ATTEMPTS = 3
+
+
+def template_hash(body: str, greeting: str, default_greeting: str) -> str:
+    return hashlib.sha256("\x00".join((body, greeting, default_greeting)).encode("utf-8")).hexdigest()
+
+
+def get_active_template(db: Session, name: str = TRACKING_TEMPLATE_NAME,
+                        body: str = TRACKING_TEMPLATE_BODY,
+                        greeting: str = TRACKING_TEMPLATE_GREETING,
+                        default_greeting: str = TRACKING_TEMPLATE_DEFAULT_GREETING) -> SMSTemplate:
+    """
+    آخرین نسخه قالب؛ اگر متن قالب در کد تغییر کرده باشد نسخه جدید ثبت می‌شود
+
+    اگر درخواست همزمان همان نسخه را زودتر ثبت کند، درج در savepoint با خطای
+    unique برمی‌گردد و ردیف ثبت شده دوباره خوانده می‌شود.
+    """
+    content_hash = template_hash(body, greeting, default_greeting)
+
+    for _ in range(TEMPLATE_INSERT_ATTEMPTS):
+        latest = _latest_template(db, name)
+        if latest and latest.content_hash == content_hash:
+            return latest
+
+        template = SMSTemplate(
+            name=name,
+            version=(latest.version + 1) if latest else 1,
+            body=body,
+            greeting=greeting,
+            default_greeting=default_greeting,
+            content_hash=content_hash
+        )
+        try:
+            with db.begin_nested():
+                db.add(template)
+        except IntegrityError:
+            continue
+
+        db.commit()
+        print(f"📝 نسخه {template.version} قالب پیامک «{name}» ثبت شد")
+        return template
+
+    # درخواست‌های همزمان با متن‌های متفاوت - آخرین نسخه ثبت شده استفاده می‌شود
+    return _latest_template(db, name)
+
+
+def _latest_template(db: Session, name: str) -> Optional[SMSTemplate]:
+    return db.query(SMSTemplate).filter(
+        SMSTemplate.name == name
+    ).order_by(SMSTemplate.version.desc()).first()
+
+
+def template_params(customer_name: Optional[str]) -> Dict[str, str]:
+    """پارامترهای ذخیره شده در لاگ (کد رهگیری در ستون خود لاگ است)"""
+    return {"customer_name": customer_name} if customer_name else {}
+
+
+def render_template(template: SMSTemplate, params: Dict[str, str], tracking_code: Optional[str]) -> str:
+    customer_name = params.get("customer_name")
+    if customer_name:
+        greeting = template.greeting.format(customer_name=customer_name)
+    else:
+        greeting = template.default_greeting
+
+    return template.body.format(greeting=greeting, tracking_code=tracking_code or "")
+
+
+def load_templates(db: Session, template_ids: Iterable[int]) -> Dict[int, SMSTemplate]:
+    ids = {template_id for template_id in template_ids if template_id}
+    if not ids:
+        return {}
+    return {t.id: t for t in db.query(SMSTemplate).filter(SMSTemplate.id.in_(ids)).all()}
+
+
+def render_log_message(log: SMSLog, templates: Dict[int, SMSTemplate]) -> Optional[str]:
+    """متن پیامک یک لاگ (لاگ‌های قدیمی متن کامل را در message دارند)"""
+    if log.message is not None or not log.template_id:
+        return log.message
+
+    template = templates.get(log.template_id)
+    if template is None:
+        return None
+    return render_template(template, json.loads(log.params or "{}"), log.tracking_code)
+
+
+def template_pattern(template: SMSTemplate) -> re.Pattern:
+    """الگوی regex برای تشخیص متن ساخته شده از یک قالب (برای فشرده‌سازی لاگ‌های قدیمی)"""
+    parts = re.split(r'(\{greeting\}|\{tracking_code\})', template.body)
+    pattern = ''
+    for part in parts:
+        if part == '{greeting}':
+            pattern += r'(?P<greeting>[^\n]*)'
+        elif part == '{tracking_code}':
+            pattern += r'(?P<tracking_code>[^\n]*)'
+        else:
+            pattern += re.escape(part)
+    return re.compile(pattern + r'\Z')
+
+
+def match_template(template: SMSTemplate, pattern: re.Pattern, message: str,
+                   tracking_code: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    پارامترهای یک متن قدیمی اگر دقیقاً از همین قالب ساخته شده باشد
+    (بررسی نهایی با ساخت دوباره متن انجام می‌شود)
+    """
+    match = pattern.match(message or "")
+    if not match or match.group('tracking_code') != (tracking_code or ""):
+        return None
+
+    greeting = match.group('greeting')
+    if greeting == template.default_greeting:
+        params = {}
+    else:
+        prefix, _, suffix = template.greeting.partition("{customer_name}")
+        if not (greeting.startswith(prefix) and greeting.endswith(suffix)) or len(greeting) <= len(prefix) + len(suffix):
+            return None
+        params = {"customer_name": greeting[len(prefix):len(greeting) - len(suffix)]}
+
+    if render_template(template, params, tracking_code) != message:
+        return None
+    return params
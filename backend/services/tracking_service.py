@@ -0,0 +1,275 @@
+# backend/services/tracking_service.py
+"""
+ارسال گروهی کدهای رهگیری به پنل فروشنده دیجی‌کالا
+
+درخواست‌ها با همزمانی محدود (semaphore)، یک محدودکننده سرعت مشترک و
+تلاش مجدد ارسال می‌شوند. وضعیت هر محموله در جدول tracking_pushes ثبت
+می‌شود تا اجرای مجدد، کدهای پذیرفته شده را دوباره ارسال نکند.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import requests
+from sqlalchemy.orm import Session
+
+from database.models import TrackingPush
+from utils.api_core import (
+    BASE_URL_SHIP_BY_SELLER, USER_AGENT,
+    load_session_cookies, format_cookies_for_requests
+)
+
+TRACKING_PUSH_URL = f"{BASE_URL_SHIP_BY_SELLER}/tracking-code"
+
+PUSH_CONCURRENCY = int(os.getenv("DIGIKALA_PUSH_CONCURRENCY", "4"))
+PUSH_RATE_PER_SECOND = float(os.getenv("DIGIKALA_PUSH_RATE", "2"))
+PUSH_MAX_RETRIES = int(os.getenv("DIGIKALA_PUSH_MAX_RETRIES", "3"))
+
+# تعداد نتایجی که پس از آن وضعیت‌ها در دیتابیس commit می‌شوند
+PUSH_COMMIT_EVERY = 20
+
+QUERY_CHUNK_SIZE = 500
+
+# توقف پیش‌فرض پس از 429 وقتی Retry-After وجود ندارد یا قابل خواندن نیست
+DEFAULT_RETRY_AFTER_SECONDS = 15
+
+
+class TrackingPushError(Exception):
+    """خطایی که مانع شروع ارسال می‌شود (مثلاً نبود کوکی)"""
+
+
+class AsyncRateLimiter:
+    """محدودکننده سرعت با فاصله ثابت بین درخواست‌ها (مشترک بین همه ارسال‌ها)"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        # بخش بحرانی await ندارد، بنابراین در یک event loop نیازی به قفل نیست
+        now = time.monotonic()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """توقف همه درخواست‌ها (پس از پاسخ 429)"""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+digikala_rate_limiter = AsyncRateLimiter(PUSH_RATE_PER_SECOND)
+
+
+def _post_tracking_code(shipment_id: str, tracking_code: str, cookies: Dict[str, str]) -> requests.Response:
+    """ارسال یک کد رهگیری (فراخوانی همگام - داخل thread اجرا می‌شود)"""
+    payload = {
+        "tracking_codes": [{"tracking_code": tracking_code, "id": None}],
+        "order_shipment_id": int(shipment_id),
+        "infra_type": "post",
+        "service_name": ""
+    }
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "origin": "https://seller.digikala.com",
+        "referer": "https://seller.digikala.com/pwa/orders/ship-by-seller/",
+        "user-agent": USER_AGENT
+    }
+    return requests.post(TRACKING_PUSH_URL, json=payload, headers=headers, cookies=cookies, timeout=30)
+
+
+def parse_retry_after(value: Optional[str], default: float = DEFAULT_RETRY_AFTER_SECONDS) -> float:
+    """مقدار Retry-After به ثانیه (عدد ثانیه یا تاریخ HTTP طبق RFC 9110)"""
+    if not value:
+        return default
+    value = value.strip()
+
+    try:
+        return max(0.0, float(int(value)))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return default
+    if retry_at is None:
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+async def push_one(shipment_id: str, tracking_code: str, cookies: Dict[str, str],
+                   limiter: AsyncRateLimiter, state: dict) -> dict:
+    """ارسال یک کد رهگیری با تلاش مجدد برای خطاهای موقت"""
+    attempts = 0
+    last_status = None
+    error = None
+
+    while attempts <= PUSH_MAX_RETRIES:
+        if state.get("session_expired"):
+            return {"status": "failed", "attempts": attempts, "status_code": 401,
+                    "error": "نشست دیجی‌کالا منقضی شده است"}
+
+        await limiter.acquire()
+        attempts += 1
+
+        try:
+            response = await asyncio.to_thread(_post_tracking_code, shipment_id, tracking_code, cookies)
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+            await asyncio.sleep(min(2 ** attempts, 30))
+            continue
+
+        last_status = response.status_code
+
+        if 200 <= response.status_code < 300:
+            return {"status": "accepted", "attempts": attempts, "status_code": last_status, "error": None}
+
+        if response.status_code == 401:
+            state["session_expired"] = True
+            return {"status": "failed", "attempts": attempts, "status_code": 401,
+                    "error": "نشست دیجی‌کالا منقضی شده است"}
+
+        if response.status_code == 429:
+            wait_time = parse_retry_after(response.headers.get("Retry-After"))
+            print(f"⏳ Rate limit: توقف ارسال برای {wait_time:.0f} ثانیه...")
+            limiter.pause(wait_time)
+            error = "محدودیت سرعت (429)"
+            continue
+
+        if response.status_code >= 500:
+            error = f"خطای سرور ({response.status_code})"
+            await asyncio.sleep(min(2 ** attempts, 30))
+            continue
+
+        # سایر خطاهای 4xx: کد توسط دیجی‌کالا رد شده است
+        return {"status": "rejected", "attempts": attempts, "status_code": last_status,
+                "error": response.text[:500]}
+
+    return {"status": "failed", "attempts": attempts, "status_code": last_status, "error": error}
+
+
+def load_push_states(db: Session, shipment_ids: List[str]) -> Dict[str, TrackingPush]:
+    """بارگذاری وضعیت ارسال محموله‌ها با کوئری‌های IN تکه‌تکه"""
+    states = {}
+    unique_ids = list(dict.fromkeys(shipment_ids))
+    for start in range(0, len(unique_ids), QUERY_CHUNK_SIZE):
+        chunk = unique_ids[start:start + QUERY_CHUNK_SIZE]
+        for push in db.query(TrackingPush).filter(TrackingPush.shipment_id.in_(chunk)).all():
+            states[push.shipment_id] = push
+    return states
+
+
+async def push_tracking_codes(db: Session, items: List[dict], force: bool = False,
+                              cookies: Optional[Dict[str, str]] = None) -> dict:
+    """
+    ارسال گروهی کدهای رهگیری
+
+    Args:
+        items: لیست {shipment_id, tracking_code, order_id}
+        force: ارسال مجدد حتی اگر همین کد قبلاً پذیرفته شده باشد
+        cookies: کوکی‌های نشست (در صورت عدم ارسال از فایل خوانده می‌شود)
+    """
+    if cookies is None:
+        cookies = format_cookies_for_requests(load_session_cookies())
+    if not cookies:
+        raise TrackingPushError("کوکی نشست دیجی‌کالا یافت نشد")
+
+    states = load_push_states(db, [str(item["shipment_id"] or "").strip() for item in items])
+    results = []
+    to_push = []
+    queued = set()
+
+    for item in items:
+        shipment_id = str(item["shipment_id"] or "").strip()
+        tracking_code = str(item["tracking_code"] or "").strip()
+        push = states.get(shipment_id)
+
+        error = None
+        if not shipment_id.isdigit():
+            error = "شناسه محموله نامعتبر است"
+        elif not tracking_code or tracking_code == 'نامشخص':
+            error = "کد رهگیری خالی است"
+        elif shipment_id in queued:
+            error = "محموله تکراری در لیست"
+
+        if error:
+            results.append({"shipment_id": shipment_id, "tracking_code": tracking_code,
+                            "status": "invalid", "error": error})
+            continue
+
+        if push and push.status == 'accepted' and push.tracking_code == tracking_code and not force:
+            results.append({"shipment_id": shipment_id, "tracking_code": tracking_code,
+                            "status": "skipped", "error": None})
+            continue
+
+        if push is None:
+            push = TrackingPush(shipment_id=shipment_id, attempts=0)
+            db.add(push)
+            states[shipment_id] = push
+
+        queued.add(shipment_id)
+
+        push.order_id = item.get("order_id") or push.order_id
+        push.tracking_code = tracking_code
+        push.status = 'pending'
+
+        # نتیجه در جای خود (ترتیب ورودی) قرار می‌گیرد و پس از ارسال تکمیل می‌شود
+        result = {"shipment_id": shipment_id, "tracking_code": tracking_code, "status": "pending", "error": None}
+        results.append(result)
+        to_push.append((push, result))
+
+    db.commit()
+    print(f"📤 ارسال {len(to_push)} کد رهگیری به دیجی‌کالا ({len(results) - len(to_push)} مورد بدون نیاز به ارسال)")
+
+    semaphore = asyncio.Semaphore(PUSH_CONCURRENCY)
+    shared_state = {"session_expired": False}
+    completed = 0
+
+    async def worker(push: TrackingPush, result: dict):
+        nonlocal completed
+        async with semaphore:
+            try:
+                outcome = await push_one(
+                    result["shipment_id"], result["tracking_code"], cookies,
+                    digikala_rate_limiter, shared_state
+                )
+            except Exception as e:
+                # خطای پیش‌بینی نشده فقط همین محموله را ناموفق می‌کند
+                print(f"❌ خطا در ارسال کد رهگیری محموله {result['shipment_id']}: {e}")
+                outcome = {"status": "failed", "attempts": 1, "status_code": None,
+                           "error": f"خطای داخلی: {e}"}
+
+        push.status = outcome["status"]
+        push.attempts = (push.attempts or 0) + outcome["attempts"]
+        push.last_status_code = outcome["status_code"]
+        push.error_message = outcome["error"]
+        if outcome["status"] == 'accepted':
+            push.accepted_at = datetime.utcnow()
+
+        result.update(status=outcome["status"], error=outcome["error"])
+
+        completed += 1
+        if completed % PUSH_COMMIT_EVERY == 0:
+            db.commit()
+
+    await asyncio.gather(*(worker(push, result) for push, result in to_push))
+    db.commit()
+
+    summary = {status: sum(1 for r in results if r["status"] == status)
+               for status in ("accepted", "skipped", "invalid", "rejected", "failed")}
+    print(f"✅ ارسال به دیجی‌کالا: {summary}")
+
+    return {
+        "total": len(results),
+        **summary,
+        "session_expired": shared_state["session_expired"],
+        "results": results
+    }
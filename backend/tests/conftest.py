@@ -0,0 +1,53 @@
+# backend/tests/conftest.py
+"""
+تنظیمات مشترک تست‌های backend
+
+هر تست یک دیتابیس SQLite جداگانه در پوشه موقت pytest می‌گیرد.
+اجرا: cd backend && python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import init_database, get_session, Order  # noqa: E402
+import database.auth_models  # noqa: E402,F401
+import database.warehouse_models_extended  # noqa: E402,F401
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "test.db")
+    init_database(path).dispose()
+    return path
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = init_database(db_path)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = get_session(engine)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def orders(db):
+    """چند سفارش نمونه با کد رهگیری و شماره تلفن"""
+    rows = [
+        Order(order_code=str(100000 + i), shipment_id=str(500000 + i),
+              customer_name=f"مشتری {i}", customer_phone=f"0912000{i:04d}",
+              status="ارسال شده", tracking_code=f"T{i:06d}")
+        for i in range(40)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
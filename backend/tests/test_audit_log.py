@@ -0,0 +1,41 @@
+# backend/tests/test_audit_log.py
+"""ذخیره دسته‌ای لاگ فعالیت و تلاش مجدد پس از خطای نوشتن"""
+
+import asyncio
+
+from database.auth_models import AuditLog
+from services import audit_log
+from services.audit_log import AuditWriter
+
+
+def test_failed_batches_are_retried_and_flushed_on_stop(db, db_path, monkeypatch):
+    monkeypatch.setattr(audit_log, "AUDIT_FLUSH_SECONDS", 0.05)
+    monkeypatch.setattr(audit_log, "AUDIT_RETRY_BASE_SECONDS", 0.05)
+
+    writer = AuditWriter(db_path)
+    write = writer.write
+    failures = {"left": 2}
+
+    def flaky_write(entries):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("database is locked")
+        write(entries)
+
+    writer.write = flaky_write
+
+    async def run():
+        writer.start()
+        for i in range(5):
+            writer.log(user_id=1, action=f"action-{i}")
+        await asyncio.sleep(0.5)
+        saved_while_running = db.query(AuditLog).count()
+
+        failures["left"] = 1
+        writer.log(user_id=1, action="last")
+        await writer.stop()
+        return saved_while_running
+
+    assert asyncio.run(run()) == 5
+    db.expire_all()
+    assert db.query(AuditLog).count() == 6
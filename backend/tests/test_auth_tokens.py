@@ -0,0 +1,72 @@
+# backend/tests/test_auth_tokens.py
+"""مجوزهای داخل token و باطل شدن آن‌ها با تغییر role_version"""
+
+import pytest
+
+from database.auth_models import Role, User, create_default_permissions, create_default_roles
+from services import auth_cache
+from services.auth_cache import (
+    PERMISSION_BITS, bump_role_version, decode_permissions, encode_permissions,
+    invalidate_user, load_principal, permission_claims, principal_from_claims
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_auth_cache():
+    auth_cache._principal_cache.clear()
+    invalidate_user()
+    yield
+    auth_cache._principal_cache.clear()
+    invalidate_user()
+
+
+@pytest.fixture
+def user(db):
+    create_default_permissions(db)
+    create_default_roles(db)
+    user = User(username="bob", email="bob@example.com", full_name="باب",
+                password_hash="-", is_active=True, is_superuser=False)
+    user.roles.append(db.query(Role).filter(Role.name == "sales_staff").first())
+    db.add(user)
+    db.commit()
+    return user
+
+
+def token_payload(db, user):
+    principal = load_principal(db, user.username)
+    return {"sub": user.username, **permission_claims(principal, user.role_version or 0)}
+
+
+def test_permission_bitmask_round_trip():
+    names = list(PERMISSION_BITS)[::3]
+    assert decode_permissions(encode_permissions(names + ["unknown"])) == frozenset(names)
+
+
+def test_claims_carry_the_users_permissions(db, user):
+    principal = principal_from_claims(db, token_payload(db, user))
+
+    assert principal is not None
+    assert principal.id == user.id
+    assert principal.roles == ("sales_staff",)
+    assert principal.permissions == load_principal(db, user.username).permissions
+
+
+def test_role_version_bump_invalidates_embedded_permissions(db, user):
+    payload = token_payload(db, user)
+
+    user.roles = [db.query(Role).filter(Role.name == "admin").first()]
+    bump_role_version(db, [user.id])
+    db.commit()
+    invalidate_user(user.username)
+
+    assert principal_from_claims(db, payload) is None
+
+    # token جدید با نسخه فعلی دوباره پذیرفته می‌شود
+    db.refresh(user)
+    principal = principal_from_claims(db, token_payload(db, user))
+    assert principal is not None
+    assert principal.roles == ("admin",)
+
+
+def test_token_without_embedded_permissions_falls_back(db, user):
+    assert principal_from_claims(db, {"sub": user.username}) is None
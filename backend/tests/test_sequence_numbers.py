@@ -0,0 +1,57 @@
+# backend/tests/test_sequence_numbers.py
+"""شماره‌گذاری تراکنش‌ها با شمارنده دیتابیس"""
+
+import re
+import threading
+
+from database.models import get_session
+from database.warehouse_models_extended import Warehouse, generate_transaction_number
+
+
+def test_numbers_are_sequential_per_day(db):
+    first = generate_transaction_number(db)
+    second = generate_transaction_number(db)
+    db.commit()
+
+    assert re.fullmatch(r"TRX-\d{8}-000001", first)
+    assert second == first[:-6] + "000002"
+
+
+def test_concurrent_callers_get_unique_numbers(engine):
+    callers, per_caller = 6, 25
+    barrier = threading.Barrier(callers)
+    numbers = []
+    errors = []
+
+    def allocate():
+        session = get_session(engine)
+        try:
+            barrier.wait()
+            for _ in range(per_caller):
+                numbers.append(generate_transaction_number(session))
+                session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=allocate) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(numbers) == len(set(numbers)) == callers * per_caller
+    assert max(int(number[-6:]) for number in numbers) == callers * per_caller
+
+
+def test_allocation_after_a_write_joins_the_callers_transaction(db):
+    db.add(Warehouse(code="W1", name="انبار"))
+    db.flush()
+    released = generate_transaction_number(db)
+    db.rollback()
+
+    assert db.query(Warehouse).count() == 0
+    assert generate_transaction_number(db) == released
+    db.commit()
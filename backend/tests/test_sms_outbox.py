@@ -0,0 +1,91 @@
+# backend/tests/test_sms_outbox.py
+"""برداشت اتمی ردیف‌های صف پیامک بین چند worker"""
+
+import threading
+from datetime import datetime, timedelta
+
+from database.models import SMSOutbox
+from services.sms_providers import ProviderPool, StubProvider
+from services.sms_service import SMSOutboxWorker, SMS_CLAIM_STALE_SECONDS
+
+
+def queue_messages(db, orders):
+    for order in orders:
+        db.add(SMSOutbox(batch_id="b", order_id=order.id, phone_number=order.customer_phone,
+                         message="m", status="queued", attempts=0, dry_run=False,
+                         next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+
+def make_worker(db_path):
+    return SMSOutboxWorker(ProviderPool([StubProvider()]), db_path)
+
+
+def test_concurrent_workers_never_claim_the_same_row(db, db_path, orders):
+    queue_messages(db, orders)
+    workers = [make_worker(db_path) for _ in range(4)]
+    barrier = threading.Barrier(len(workers))
+    claimed = {}
+    errors = []
+
+    def claim(worker):
+        session = worker._session()
+        try:
+            barrier.wait()
+            ids = []
+            while True:
+                rows = worker._claim(session, False, 5)
+                if not rows:
+                    break
+                ids.extend(row.id for row in rows)
+            claimed[worker.worker_id] = ids
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=claim, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    all_ids = [row_id for ids in claimed.values() for row_id in ids]
+    assert len(all_ids) == len(set(all_ids)) == len(orders)
+
+    db.expire_all()
+    for worker_id, ids in claimed.items():
+        for row in db.query(SMSOutbox).filter(SMSOutbox.id.in_(ids)):
+            assert row.status == "sending"
+            assert row.claimed_by == worker_id
+
+
+def test_recover_leaves_live_claims_of_other_workers(db, db_path, orders):
+    queue_messages(db, orders[:4])
+    owner, other = make_worker(db_path), make_worker(db_path)
+
+    session = owner._session()
+    claimed = [row.id for row in owner._claim(session, False, 10)]
+    session.close()
+    assert len(claimed) == 4
+
+    other._recover()
+    db.expire_all()
+    assert {row.status for row in db.query(SMSOutbox)} == {"sending"}
+
+    # برداشت قدیمی (worker متوقف شده) به صف برمی‌گردد
+    stale = datetime.utcnow() - timedelta(seconds=SMS_CLAIM_STALE_SECONDS + 1)
+    db.query(SMSOutbox).filter(SMSOutbox.id == claimed[0]).update({SMSOutbox.claimed_at: stale})
+    db.commit()
+
+    other._recover()
+    db.expire_all()
+    statuses = {row.id: row.status for row in db.query(SMSOutbox)}
+    assert statuses[claimed[0]] == "queued"
+    assert all(statuses[row_id] == "sending" for row_id in claimed[1:])
+
+    # worker صاحب برداشت ردیف‌های خودش را پس می‌گیرد
+    owner._recover()
+    db.expire_all()
+    assert {row.status for row in db.query(SMSOutbox)} == {"queued"}
@@ -0,0 +1,77 @@
+# backend/tests/test_warehouse_stock.py
+"""تغییر اتمی موجودی انبار با UPDATE شرطی"""
+
+import threading
+
+import pytest
+
+from database.models import get_session
+from database.warehouse_models_extended import Warehouse, WarehouseProduct, apply_stock_change
+
+
+@pytest.fixture
+def product(db):
+    warehouse = Warehouse(code="W1", name="انبار اصلی")
+    db.add(warehouse)
+    db.flush()
+    product = WarehouseProduct(sku="SKU-1", title="کالا", warehouse_id=warehouse.id,
+                               stock_quantity=5, reserved_quantity=0)
+    db.add(product)
+    db.commit()
+    return product
+
+
+def stock_of(db, product_id):
+    db.expire_all()
+    return db.get(WarehouseProduct, product_id).stock_quantity
+
+
+def test_decrement_beyond_stock_is_rejected(db, product):
+    assert apply_stock_change(db, product.id, -6) is None
+    db.rollback()
+    assert stock_of(db, product.id) == 5
+
+    assert apply_stock_change(db, product.id, -5) == 0
+    db.commit()
+    assert stock_of(db, product.id) == 0
+
+
+def test_allow_negative_skips_the_stock_check(db, product):
+    assert apply_stock_change(db, product.id, -7, allow_negative=True) == -2
+    db.commit()
+    assert stock_of(db, product.id) == -2
+
+
+def test_missing_product_returns_none(db, product):
+    assert apply_stock_change(db, product.id + 100, 1) is None
+
+
+def test_concurrent_decrements_never_oversell(db, engine, product):
+    attempts = 12
+    barrier = threading.Barrier(attempts)
+    results = []
+    errors = []
+
+    def dispatch_one():
+        session = get_session(engine)
+        try:
+            barrier.wait()
+            result = apply_stock_change(session, product.id, -1)
+            session.commit()
+            results.append(result)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=dispatch_one) for _ in range(attempts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    accepted = [result for result in results if result is not None]
+    assert len(accepted) == 5
+    assert sorted(accepted) == [0, 1, 2, 3, 4]
+    assert stock_of(db, product.id) == 0
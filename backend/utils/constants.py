@@ -3,6 +3,7 @@
 # --- مسیر فایل‌ها ---
 COOKIES_FILE_PATH = "sessions/digikala_cookies.json" 
 DB_FILE = "orders_database_complete.csv" 
+SALES_DB_FILE = "data/digikala_sales.db"
 SENDER_PROFILES_FILE = "sender_profiles.json" 
 FONT_PATH = "Vazir.ttf" 
 LABELS_DIR = "generated_labels" 
@@ -0,0 +1,163 @@
+# backend/utils/label_cache.py
+"""
+کش برچسب‌های رندر شده روی دیسک (content-addressed)
+
+هر برچسب با هش SHA-256 از (اطلاعات سفارش، فرستنده، تنظیمات، نسخه قالب)
+ذخیره می‌شود تا چاپ مجدد یا دسته‌های جزئی بدون رندر دوباره ساخته شوند.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '..', 'data', 'label_cache')
+
+LABEL_CACHE_DIR = os.path.abspath(os.getenv("LABEL_CACHE_DIR", DEFAULT_CACHE_DIR))
+LABEL_CACHE_MAX_MB = int(os.getenv("LABEL_CACHE_MAX_MB", "200"))
+
+
+class LabelCache:
+    """کش برچسب‌ها با حذف قدیمی‌ترین فایل‌ها پس از عبور از سقف حجم"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._total_bytes = None  # در اولین استفاده از روی دیسک محاسبه می‌شود
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(order_id, sender_info: dict, receiver_info: dict, settings: dict, template_version: str) -> str:
+        """ساخت کلید یکتا از تمام داده‌هایی که روی خروجی برچسب اثر دارند"""
+        payload = json.dumps(
+            {
+                "template_version": template_version,
+                "order_id": str(order_id),
+                "sender": sender_info,
+                "receiver": receiver_info,
+                "settings": settings,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def _ensure_size_loaded(self):
+        if self._total_bytes is not None:
+            return
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        self._total_bytes = total
+
+    def get(self, key: str) -> Optional[bytes]:
+        """خواندن برچسب از کش (None در صورت نبودن)"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # به‌روزرسانی زمان دسترسی برای ترتیب حذف (LRU)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """ذخیره برچسب در کش و حذف فایل‌های قدیمی در صورت نیاز"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # نوشتن اتمیک تا درخواست‌های همزمان فایل نیمه‌کاره نخوانند
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            self._ensure_size_loaded()
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - previous_size
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """حذف قدیمی‌ترین برچسب‌ها تا رسیدن به ۹۰٪ سقف حجم"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        target = int(self.max_bytes * 0.9)
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+
+        self._total_bytes = total
+
+    def clear(self) -> int:
+        """پاک کردن کامل کش"""
+        removed = 0
+        with self._lock:
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    try:
+                        os.remove(os.path.join(root, name))
+                        removed += 1
+                    except OSError:
+                        pass
+            self._total_bytes = 0
+        return removed
+
+    def stats(self) -> dict:
+        """آمار کش"""
+        with self._lock:
+            self._ensure_size_loaded()
+            total_requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total_requests * 100, 2) if total_requests else 0,
+                "evictions": self.evictions,
+                "size_mb": round(self._total_bytes / (1024 * 1024), 2),
+                "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "cache_dir": self.cache_dir,
+            }
+
+
+label_cache = LabelCache(LABEL_CACHE_DIR, LABEL_CACHE_MAX_MB * 1024 * 1024)
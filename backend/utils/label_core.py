@@ -11,6 +11,10 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.pagesizes import A5
 
+# نسخه قالب برچسب - با هر تغییر در چیدمان برچسب باید افزایش یابد
+# (کلید کش برچسب‌ها به این مقدار وابسته است)
+LABEL_TEMPLATE_VERSION = "1"
+
 # بررسی و import treepoem برای Data Matrix
 try:
     import treepoem
@@ -80,6 +84,17 @@ def load_fonts():
     }
 
 
+def build_datamatrix_payload(order_id, receiver_info):
+    """ساخت رشته Data Matrix برچسب (مشترک بین خروجی PDF و چاپگر حرارتی)"""
+    city = receiver_info.get('city', receiver_info.get('شهر', ''))
+    customer = receiver_info.get('نام مشتری', '')
+    postal = receiver_info.get('postalCode', receiver_info.get('کد پستی', ''))
+    phone = receiver_info.get('phoneNumber', receiver_info.get('شماره تلفن', ''))
+    address = receiver_info.get('address', receiver_info.get('آدرس کامل', ''))
+    
+    return f"{city}\t{customer} {order_id}\t\t{postal}\t\t{phone}\t{address}\t{city}\t\r"
+
+
 def generate_label_portrait(order_id, sender_info, receiver_info, include_datamatrix=True):
     """تولید برچسب پستی عمودی A5 با پشتیبانی کامل فارسی"""
     
@@ -114,13 +129,7 @@ def generate_label_portrait(order_id, sender_info, receiver_info, include_datama
     # Data Matrix Barcode
     if include_datamatrix and TREEPOEM_AVAILABLE:
         try:
-            city = receiver_info.get('city', receiver_info.get('شهر', ''))
-            customer = receiver_info.get('نام مشتری', '')
-            postal = receiver_info.get('postalCode', receiver_info.get('کد پستی', ''))
-            phone = receiver_info.get('phoneNumber', receiver_info.get('شماره تلفن', ''))
-            address = receiver_info.get('address', receiver_info.get('آدرس کامل', ''))
-            
-            dm_string = f"{city}\t{customer} {order_id}\t\t{postal}\t\t{phone}\t{address}\t{city}\t\r"
+            dm_string = build_datamatrix_payload(order_id, receiver_info)
             
             dm_image = treepoem.generate_barcode(
                 barcode_type='datamatrix',
@@ -0,0 +1,190 @@
+# backend/utils/label_thermal.py
+"""
+تولید برچسب پستی به صورت دستورات بومی چاپگر حرارتی (ZPL / EPL)
+
+به جای رستر کردن برچسب و ارسال تصویر به درایور، همان چیدمان
+(فرستنده، گیرنده، اقلام، QR و Data Matrix) به صورت متن دستوری تولید می‌شود
+و بارکدها توسط خود چاپگر رسم می‌شوند.
+"""
+
+import os
+import textwrap
+
+from utils.label_core import process_persian, build_datamatrix_payload
+
+# ابعاد برچسب به dot (پیش‌فرض: 100x70 میلی‌متر در 203dpi)
+THERMAL_LABEL_WIDTH = int(os.getenv("THERMAL_LABEL_WIDTH", "800"))
+THERMAL_LABEL_HEIGHT = int(os.getenv("THERMAL_LABEL_HEIGHT", "560"))
+
+# فونت TTF فارسی که باید یک‌بار روی حافظه چاپگر Zebra دانلود شده باشد
+ZPL_FONT = os.getenv("THERMAL_ZPL_FONT", "E:VAZIR.TTF")
+
+THERMAL_FORMATS = ("zpl", "epl")
+
+# ناحیه متن (سمت راست) و ناحیه بارکدها (سمت چپ)
+_TEXT_LEFT = 190
+_MARGIN = 20
+
+
+# ========== ZPL ==========
+
+def _zpl_field(text) -> str:
+    """Escape کاراکترهای کنترلی ZPL برای استفاده با ^FH"""
+    result = []
+    for ch in str(text):
+        if ch in "_^~" or ord(ch) < 32:
+            result.append("_%02X" % ord(ch))
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def _zpl_text_line(y, text, size=24):
+    """یک خط متن راست‌چین فارسی در ناحیه متن"""
+    width = THERMAL_LABEL_WIDTH - _TEXT_LEFT - _MARGIN
+    return (
+        f"^FO{_TEXT_LEFT},{y}^A1N,{size},{size}"
+        f"^FB{width},1,0,R^FH^FD{_zpl_field(process_persian(text))}^FS"
+    )
+
+
+def generate_label_zpl(order_id, sender_info, receiver_info, include_datamatrix=True):
+    """تولید یک برچسب ZPL با همان چیدمان برچسب عمودی"""
+    lines = [
+        "^XA",
+        "^CI28",  # UTF-8
+        f"^PW{THERMAL_LABEL_WIDTH}",
+        f"^LL{THERMAL_LABEL_HEIGHT}",
+        f"^CW1,{ZPL_FONT}",
+    ]
+
+    # ========== بارکدها (سمت چپ) ==========
+    lines.append(f"^FO{_MARGIN},{_MARGIN}^BQN,2,5^FH^FDQA,{_zpl_field(order_id)}^FS")
+    lines.append(f"^FO{_MARGIN},165^A0N,24,24^FD{_zpl_field(order_id)}^FS")
+
+    if include_datamatrix:
+        dm_string = build_datamatrix_payload(order_id, receiver_info)
+        lines.append(f"^FO{_MARGIN},200^BXN,4,200^FH^FD{_zpl_field(dm_string)}^FS")
+
+    # ========== فرستنده و گیرنده (سمت راست) ==========
+    y = _MARGIN
+    line_height = 28
+
+    lines.append(_zpl_text_line(y, "فرستنده:"))
+    y += line_height
+    lines.append(_zpl_text_line(y, f"نام: {sender_info.get('name', '')}"))
+    y += line_height
+    for line in textwrap.wrap(f"آدرس: {sender_info.get('address', '')}", width=45):
+        lines.append(_zpl_text_line(y, line, size=20))
+        y += line_height - 4
+    lines.append(_zpl_text_line(
+        y, f"کد پستی: {sender_info.get('postal_code', '')} - تلفن: {sender_info.get('phone', '')}"
+    ))
+    y += int(line_height * 1.5)
+
+    lines.append(_zpl_text_line(y, "گیرنده:"))
+    y += line_height
+    customer_name = receiver_info.get('نام مشتری', receiver_info.get('customer_name', 'نامشخص'))
+    lines.append(_zpl_text_line(y, f"نام: {customer_name}"))
+    y += line_height
+
+    receiver_address = receiver_info.get('address', receiver_info.get('آدرس کامل', 'نامشخص'))
+    for line in textwrap.wrap(f"آدرس: {receiver_address}", width=45):
+        lines.append(_zpl_text_line(y, line, size=20))
+        y += line_height - 4
+
+    province = receiver_info.get('state', receiver_info.get('استان', ''))
+    city = receiver_info.get('city', receiver_info.get('شهر', ''))
+    postal = receiver_info.get('postalCode', receiver_info.get('کد پستی', ''))
+    lines.append(_zpl_text_line(y, f"استان: {province} - شهر: {city} - کد پستی: {postal}", size=20))
+    y += line_height
+
+    phone = receiver_info.get('phoneNumber', receiver_info.get('شماره تلفن', 'نامشخص'))
+    lines.append(_zpl_text_line(y, f"تلفن: {phone}"))
+    y += line_height
+
+    # ========== اقلام ==========
+    products = receiver_info.get('products', [])
+    if products:
+        y += 6
+        lines.append(f"^FO{_TEXT_LEFT},{y}^GB{THERMAL_LABEL_WIDTH - _TEXT_LEFT - _MARGIN},3,3^FS")
+        y += 10
+        for item in products:
+            item_name = item.get('name', item.get('product_title', 'نامشخص'))
+            item_qty = int(item.get('qty', item.get('quantity', 1)))
+            lines.append(_zpl_text_line(y, f"{item_name}  ×{item_qty}", size=22))
+            y += line_height
+
+    # ========== هشدار چندقلمی ==========
+    if len(products) > 1:
+        lines.append(f"^FO{_MARGIN},{THERMAL_LABEL_HEIGHT - 60}^GB150,40,40^FS")
+        lines.append(
+            f"^FO{_MARGIN},{THERMAL_LABEL_HEIGHT - 52}^A1N,24,24^FR"
+            f"^FB150,1,0,C^FH^FD{_zpl_field(process_persian('چندقلمی'))}^FS"
+        )
+
+    lines.append("^XZ")
+    return "\n".join(lines)
+
+
+# ========== EPL ==========
+
+def _epl_field(text) -> str:
+    """EPL فقط کاراکترهای ASCII را با فونت‌های داخلی چاپ می‌کند"""
+    value = str(text).replace('\\', '\\\\').replace('"', '\\"')
+    return value.encode('ascii', errors='ignore').decode('ascii')
+
+
+def generate_label_epl(order_id, sender_info, receiver_info, include_datamatrix=True):
+    """
+    تولید یک برچسب EPL2
+
+    فونت‌های داخلی EPL فارسی ندارند؛ بنابراین فقط فیلدهای عددی
+    (کد سفارش، کد پستی، تلفن، تعداد اقلام) و بارکدها چاپ می‌شوند.
+    برای متن فارسی از خروجی ZPL استفاده کنید.
+    """
+    postal = receiver_info.get('postalCode', receiver_info.get('کد پستی', ''))
+    phone = receiver_info.get('phoneNumber', receiver_info.get('شماره تلفن', ''))
+    products = receiver_info.get('products', [])
+
+    lines = [
+        "",
+        "N",
+        f"q{THERMAL_LABEL_WIDTH}",
+        f"Q{THERMAL_LABEL_HEIGHT},24",
+        f'b{_MARGIN},{_MARGIN},Q,m2,s5,eM,"{_epl_field(order_id)}"',
+        f'A{_MARGIN},165,0,3,1,1,N,"{_epl_field(order_id)}"',
+    ]
+
+    if include_datamatrix:
+        # EPL داده باینری را در رشته نمی‌پذیرد؛ نسخه ASCII رشته Data Matrix
+        dm_string = _epl_field(build_datamatrix_payload(order_id, receiver_info).replace('\t', '|').replace('\r', ''))
+        lines.append(f'b{_MARGIN},200,D,h4,"{dm_string}"')
+
+    y = _MARGIN
+    lines.append(f'A{_TEXT_LEFT},{y},0,4,1,1,N,"ORDER {_epl_field(order_id)}"')
+    y += 40
+    lines.append(f'A{_TEXT_LEFT},{y},0,3,1,1,N,"POSTAL {_epl_field(postal)}"')
+    y += 30
+    lines.append(f'A{_TEXT_LEFT},{y},0,3,1,1,N,"TEL {_epl_field(phone)}"')
+    y += 30
+    lines.append(f'A{_TEXT_LEFT},{y},0,3,1,1,N,"FROM {_epl_field(sender_info.get("postal_code", ""))}"')
+    y += 40
+
+    total_qty = sum(int(item.get('qty', item.get('quantity', 1))) for item in products)
+    lines.append(f'A{_TEXT_LEFT},{y},0,4,1,1,N,"ITEMS {len(products)} / QTY {total_qty}"')
+    if len(products) > 1:
+        y += 40
+        lines.append(f'A{_TEXT_LEFT},{y},0,4,1,1,R,"MULTI-ITEM"')
+
+    lines.append("P1")
+    return "\n".join(lines)
+
+
+def generate_thermal_label(output_format, order_id, sender_info, receiver_info, include_datamatrix=True):
+    """انتخاب مولد بر اساس فرمت خروجی"""
+    if output_format == "zpl":
+        return generate_label_zpl(order_id, sender_info, receiver_info, include_datamatrix)
+    if output_format == "epl":
+        return generate_label_epl(order_id, sender_info, receiver_info, include_datamatrix)
+    raise ValueError(f"فرمت خروجی نامعتبر: {output_format}")
@@ -0,0 +1,158 @@
+# backend/utils/pick_list.py
+"""
+تولید لیست برداشت (Pick List) و برگه بسته‌بندی
+
+لیست برداشت مجموع تعداد هر کالا در یک موج از سفارشات است تا انباردار
+به جای بررسی تک‌تک برچسب‌ها، یک‌بار کالاها را از قفسه بردارد.
+"""
+
+import csv
+import io
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from utils.label_core import get_font_path, process_persian
+
+PICK_LIST_FONT = "Vazir"
+
+# ستون‌های لیست برداشت (از راست به چپ): (عنوان، کلید، عرض)
+PICK_LIST_COLUMNS = [
+    ("ردیف", "row", 30),
+    ("انبار", "warehouse", 80),
+    ("SKU", "sku", 80),
+    ("کد محصول", "product_code", 75),
+    ("شرح کالا", "product_title", 190),
+    ("تعداد", "quantity", 40),
+    ("سفارش", "orders_count", 40),
+]
+
+
+def _register_font() -> str:
+    """ثبت فونت فارسی در reportlab (یک‌بار)"""
+    if PICK_LIST_FONT in pdfmetrics.getRegisteredFontNames():
+        return PICK_LIST_FONT
+
+    font_path = get_font_path()
+    if not font_path:
+        return "Helvetica"
+
+    pdfmetrics.registerFont(TTFont(PICK_LIST_FONT, font_path))
+    return PICK_LIST_FONT
+
+
+def _fit_text(text, font_name, font_size, max_width) -> str:
+    """کوتاه کردن متن تا در عرض ستون جا شود"""
+    text = str(text if text is not None else "")
+    if pdfmetrics.stringWidth(process_persian(text), font_name, font_size) <= max_width:
+        return process_persian(text)
+
+    while text and pdfmetrics.stringWidth(process_persian(text + "…"), font_name, font_size) > max_width:
+        text = text[:-1]
+    return process_persian(text + "…")
+
+
+def generate_pick_list_csv(rows) -> bytes:
+    """تولید CSV لیست برداشت (با BOM برای نمایش صحیح در Excel)"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([title for title, _, _ in PICK_LIST_COLUMNS])
+
+    for i, row in enumerate(rows, 1):
+        values = dict(row, row=i)
+        writer.writerow([values.get(key) or "" for _, key, _ in PICK_LIST_COLUMNS])
+
+    return output.getvalue().encode('utf-8-sig')
+
+
+def generate_pick_list_pdf(rows, summary: dict, packing_orders=None) -> bytes:
+    """
+    تولید PDF لیست برداشت
+
+    Args:
+        rows: ردیف‌های تجمیع شده (product_code, product_title, sku, warehouse, quantity, orders_count)
+        summary: خلاصه موج (تعداد سفارش، تعداد اقلام، تاریخ)
+        packing_orders: در صورت ارسال، برای هر سفارش یک بخش برگه بسته‌بندی اضافه می‌شود
+    """
+    font_name = _register_font()
+    buffer = io.BytesIO()
+    page_width, page_height = A4
+    c = canvas.Canvas(buffer, pagesize=A4)
+
+    margin = 30
+    row_height = 18
+    table_width = sum(width for _, _, width in PICK_LIST_COLUMNS)
+    right_edge = page_width - margin - (page_width - 2 * margin - table_width) / 2
+
+    def draw_header():
+        c.setFont(font_name, 16)
+        c.drawRightString(page_width - margin, page_height - margin - 10, process_persian("لیست برداشت کالا"))
+        c.setFont(font_name, 10)
+        c.drawRightString(
+            page_width - margin, page_height - margin - 30,
+            process_persian(
+                f"تاریخ: {summary.get('generated_at', '')} - "
+                f"سفارشات: {summary.get('orders_count', 0)} - "
+                f"اقلام: {summary.get('products_count', 0)} - "
+                f"تعداد کل: {summary.get('total_quantity', 0)}"
+            )
+        )
+        y = page_height - margin - 55
+        x = right_edge
+        c.setFont(font_name, 9)
+        for title, _, width in PICK_LIST_COLUMNS:
+            c.rect(x - width, y - 4, width, row_height, stroke=1, fill=0)
+            c.drawCentredString(x - width / 2, y + 1, process_persian(title))
+            x -= width
+        return y - row_height
+
+    y = draw_header()
+    for i, row in enumerate(rows, 1):
+        if y < margin + row_height:
+            c.showPage()
+            y = draw_header()
+
+        values = dict(row, row=i)
+        x = right_edge
+        for _, key, width in PICK_LIST_COLUMNS:
+            c.rect(x - width, y - 4, width, row_height, stroke=1, fill=0)
+            c.drawCentredString(x - width / 2, y + 1, _fit_text(values.get(key), font_name, 9, width - 6))
+            x -= width
+        y -= row_height
+
+    # ========== برگه بسته‌بندی (هر سفارش جداگانه) ==========
+    if packing_orders:
+        c.showPage()
+        y = page_height - margin - 10
+        c.setFont(font_name, 16)
+        c.drawRightString(page_width - margin, y, process_persian("برگه بسته‌بندی"))
+        y -= 30
+
+        for order in packing_orders:
+            needed = 22 + 16 * len(order['items'])
+            if y - needed < margin:
+                c.showPage()
+                y = page_height - margin - 10
+
+            c.setFont(font_name, 11)
+            c.drawRightString(
+                page_width - margin, y,
+                process_persian(f"سفارش {order['order_code']} - {order['customer_name']}")
+            )
+            y -= 16
+            c.setFont(font_name, 9)
+            for item in order['items']:
+                c.rect(page_width - margin - 10, y - 1, 8, 8, stroke=1, fill=0)
+                c.drawRightString(
+                    page_width - margin - 16, y,
+                    _fit_text(f"{item['product_title']} ×{item['quantity']}", font_name, 9, table_width)
+                )
+                y -= 16
+            c.line(margin, y + 6, page_width - margin, y + 6)
+            y -= 6
+
+    c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
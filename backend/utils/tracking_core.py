@@ -2,50 +2,23 @@
 
 import streamlit as st
 import pdfplumber
-import re
 import pandas as pd
-from collections import defaultdict
 import requests
 from typing import Union
 
 # وارد کردن تابع جدید
 from utils.api_handler import api_request_with_relogin
 from utils.constants import USER_AGENT
+from utils.receipt_extractor import extract_page_rows, fold_rows
 
 def extract_shipping_data_robust(pdf_file_object) -> pd.DataFrame:
     """استخراج جفت‌های (کد سفارش، کد رهگیری) از فایل PDF رسید پستی"""
-    # ... (این تابع بدون تغییر باقی می‌ماند) ...
-    records = defaultdict(dict)
-    
-    tracking_pattern = re.compile(r'^\d{24}$')
-    order_pattern = re.compile(r'\b(\d{9})\b')
-    row_num_pattern = re.compile(r'^\d{1,2}$')
-    
-    last_row_num = None
-    
+    # موتور سریع مبتنی بر کلمات؛ در صورت عدم اطمینان برای هر صفحه به جدول برمی‌گردد
     try:
         with pdfplumber.open(pdf_file_object) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                if not tables:
-                    continue
-                
-                for table in tables:
-                    if not table or len(table[0]) < 5:
-                        continue
-                    
-                    for row in table:
-                        cleaned_row = [cell.strip() if cell else "" for cell in row]
-                        
-                        if cleaned_row and row_num_pattern.match(cleaned_row[-1]):
-                            last_row_num = cleaned_row[-1]
-                        
-                        if last_row_num:
-                            for cell in cleaned_row:
-                                if tracking_pattern.match(cell):
-                                    records[last_row_num]['کد رهگیری'] = cell
-                                elif order_match := order_pattern.search(cell):
-                                    records[last_row_num]['شماره سفارش'] = order_match.group(1)
+            rows, _ = extract_page_rows(pdf, range(len(pdf.pages)), min_table_columns=5)
+        
+        records, _ = fold_rows(rows)
         
         final_list = []
         for row_num, data in sorted(records.items()):
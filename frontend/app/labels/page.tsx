@@ -230,22 +230,12 @@ export default function LabelsPage() {
       console.log(`🔄 دریافت از API: ${fetchFromAPI}`)
       console.log(`💾 به‌روزرسانی دیتابیس: ${updateDB}`)
 
-      const response = await fetch('http://localhost:8000/api/labels/generate', {
+      // فقط شناسه سفارشات ارسال می‌شود؛ اطلاعات کامل در سرور بارگذاری می‌شود
+      const response = await fetch('http://localhost:8000/api/labels/generate-by-orders', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
-          orders: selectedOrdersList.map(o => ({
-            id: o.id,
-            order_code: o.order_code,
-            shipment_id: o.shipment_id,
-            customer_name: o.customer_name,
-            customer_phone: o.customer_phone,
-            city: o.city,
-            province: o.province,
-            full_address: o.full_address,
-            postal_code: o.postal_code,
-            items: o.items
-          })),
+          order_ids: selectedOrdersList.map(o => o.id),
           sender: currentSender,
           settings: {
             orientation,
@@ -21,12 +21,18 @@ interface SMSStatus {
   device_id: string;
 }
 
+const PAGE_SIZE = 500;
+
 export default function SMSPage() {
   const [orders, setOrders] = useState<Order[]>([]);
+  const [totalOrders, setTotalOrders] = useState(0);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedOrders, setSelectedOrders] = useState<number[]>([]);
   const [isDryRun, setIsDryRun] = useState(true);
   const [loading, setLoading] = useState(true);
   const [sending, setSending] = useState(false);
+  const [progress, setProgress] = useState<{ done: number; total: number } | null>(null);
   const [smsStatus, setSmsStatus] = useState<SMSStatus | null>(null);
 
   useEffect(() => {
@@ -34,9 +40,9 @@ export default function SMSPage() {
     checkSMSStatus();
   }, []);
 
-  const checkSMSStatus = async () => {
+  const checkSMSStatus = async (refresh: boolean = false) => {
     try {
-      const response = await fetch('http://localhost:8000/api/sms/status');
+      const response = await fetch(`http://localhost:8000/api/sms/status${refresh ? '?refresh=true' : ''}`);
       const data = await response.json();
       setSmsStatus(data);
     } catch (error) {
@@ -44,12 +50,25 @@ export default function SMSPage() {
     }
   };
 
+  // شمارش کل فقط برای صفحه اول درخواست می‌شود
+  const fetchOrdersPage = async (offset: number) => {
+    const includeTotal = offset === 0;
+    const response = await fetch(
+      `http://localhost:8000/api/sms/ready-orders?limit=${PAGE_SIZE}&offset=${offset}` +
+        (includeTotal ? '&include_total=true' : '')
+    );
+    const data: Order[] = await response.json();
+    if (includeTotal) {
+      setTotalOrders(Number(response.headers.get('X-Total-Count') ?? data.length));
+    }
+    setHasMore(response.headers.get('X-Has-More') === '1');
+    return data;
+  };
+
   const loadOrders = async () => {
     try {
       setLoading(true);
-      const response = await fetch('http://localhost:8000/api/sms/ready-orders');
-      const data = await response.json();
-      setOrders(data);
+      setOrders(await fetchOrdersPage(0));
     } catch (error) {
       console.error('خطا:', error);
       alert('خطا در دریافت سفارشات');
@@ -58,6 +77,19 @@ export default function SMSPage() {
     }
   };
 
+  const loadMoreOrders = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await fetchOrdersPage(orders.length);
+      setOrders((prev) => [...prev, ...data]);
+    } catch (error) {
+      console.error('خطا:', error);
+      alert('خطا در دریافت سفارشات');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSelectAll = () => {
     if (selectedOrders.length === orders.length) {
       setSelectedOrders([]);
@@ -74,6 +106,19 @@ export default function SMSPage() {
     );
   };
 
+  const waitForBatch = async (batchId: string) => {
+    while (true) {
+      const response = await fetch(`http://localhost:8000/api/sms/batches/${batchId}`);
+      if (!response.ok) throw new Error('خطا در دریافت وضعیت ارسال');
+
+      const batch = await response.json();
+      setProgress({ done: batch.total - batch.pending, total: batch.total });
+      if (batch.done) return batch;
+
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
   const handleSendSMS = async () => {
     if (selectedOrders.length === 0) {
       alert('لطفاً حداقل یک سفارش انتخاب کنید');
@@ -98,7 +143,16 @@ export default function SMSPage() {
       if (!response.ok) throw new Error('خطا در ارسال');
 
       const data = await response.json();
-      alert(`✅ ارسال کامل شد!\n\nموفق: ${data.success}\nناموفق: ${data.failed}`);
+      let sent = 0;
+      let failed = data.rejected;
+
+      if (data.batch_id) {
+        const batch = await waitForBatch(data.batch_id);
+        sent = batch.sent;
+        failed += batch.failed;
+      }
+
+      alert(`✅ ارسال کامل شد!\n\nموفق: ${sent}\nناموفق: ${failed}`);
       
       setSelectedOrders([]);
       await loadOrders();
@@ -106,6 +160,7 @@ export default function SMSPage() {
       alert('❌ خطا در ارسال پیامک');
     } finally {
       setSending(false);
+      setProgress(null);
     }
   };
 
@@ -159,7 +214,7 @@ export default function SMSPage() {
               </div>
             </div>
             <button
-              onClick={checkSMSStatus}
+              onClick={() => checkSMSStatus(true)}
               className="px-4 py-2 bg-white rounded-lg hover:bg-gray-50 transition flex items-center gap-2"
             >
               <RefreshCw size={18} />
@@ -172,7 +227,7 @@ export default function SMSPage() {
         <div className="grid grid-cols-1 md:grid-cols-3 gap-6 mb-6">
           <div className="bg-white rounded-xl shadow-lg p-6">
             <h3 className="text-gray-600 text-sm mb-2">کل سفارشات</h3>
-            <p className="text-4xl font-bold text-gray-900">{orders.length}</p>
+            <p className="text-4xl font-bold text-gray-900">{totalOrders}</p>
           </div>
           <div className="bg-white rounded-xl shadow-lg p-6">
             <h3 className="text-gray-600 text-sm mb-2">انتخاب شده</h3>
@@ -218,7 +273,7 @@ export default function SMSPage() {
                 {sending ? (
                   <>
                     <div className="animate-spin rounded-full h-5 w-5 border-b-2 border-white"></div>
-                    در حال ارسال...
+                    در حال ارسال{progress ? ` (${progress.done}/${progress.total})` : '...'}
                   </>
                 ) : (
                   <>
@@ -299,6 +354,17 @@ export default function SMSPage() {
                   ))}
                 </tbody>
               </table>
+              {hasMore && (
+                <div className="text-center mt-4">
+                  <button
+                    onClick={loadMoreOrders}
+                    disabled={loadingMore}
+                    className="text-blue-600 hover:text-blue-700 font-medium disabled:text-gray-400"
+                  >
+                    {loadingMore ? 'در حال بارگذاری...' : `نمایش بیشتر (${orders.length} از ${totalOrders})`}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -56,6 +56,7 @@ export default function TrackingPage() {
       }
 
       const data = await response.json()
+      const extractionId = response.headers.get('X-Extraction-Id')
       
       console.log('✅ داده دریافت شد:', data)
       
@@ -69,7 +70,7 @@ export default function TrackingPage() {
       
       // اگر دیتابیس فعاله، مستقیماً تطبیق بده
       if (useDatabase && data.length > 0) {
-        await matchWithDatabase(data)
+        await matchWithDatabase(data, extractionId ? Number(extractionId) : undefined)
       } else {
         setCurrentStep(2)
       }
@@ -83,7 +84,7 @@ export default function TrackingPage() {
     }
   }
 
-  const matchWithDatabase = async (trackingList: TrackingData[]) => {
+  const matchWithDatabase = async (trackingList: TrackingData[], extractionId?: number) => {
     setProcessing(true)
     
     try {
@@ -92,7 +93,10 @@ export default function TrackingPage() {
       const response = await fetch('http://localhost:8000/api/tracking/match-database', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ tracking_data: trackingList })
+        // در صورت وجود شناسه استخراج، نیازی به ارسال دوباره لیست نیست
+        body: JSON.stringify(
+          extractionId ? { extraction_id: extractionId } : { tracking_data: trackingList }
+        )
       })
 
       if (!response.ok) throw new Error('خطا در تطبیق')
@@ -175,6 +179,39 @@ export default function TrackingPage() {
     }
   }
 
+  const handleSubmitAll = async () => {
+    const items = matchedOrders
+      .filter(o => o.matched && o.id)
+      .map(o => ({ order_id: o.id!, tracking_code: o.tracking_code }))
+
+    setProcessing(true)
+
+    try {
+      const response = await fetch('http://localhost:8000/api/tracking/submit-bulk', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items })
+      })
+
+      if (!response.ok) throw new Error('خطا در ثبت')
+
+      const data = await response.json()
+      const submittedIds = new Set(
+        data.results.filter((r: any) => r.success).map((r: any) => r.order_id)
+      )
+
+      setMatchedOrders(prev => prev.map(o =>
+        o.id && submittedIds.has(o.id) ? { ...o, submitted: true } : o
+      ))
+
+      alert(`✅ ${data.updated} کد رهگیری ثبت شد${data.failed ? `\n⚠️ ${data.failed} مورد ناموفق` : ''}`)
+    } catch (error) {
+      alert('❌ خطا در ثبت کدهای رهگیری')
+    } finally {
+      setProcessing(false)
+    }
+  }
+
   const matchedCount = matchedOrders.filter(o => o.matched).length
   const unmatchedCount = matchedOrders.length - matchedCount
 
@@ -452,11 +489,8 @@ export default function TrackingPage() {
             {matchedCount > 0 && (
               <div className="bg-white rounded-xl shadow-lg p-6">
                 <button
-                  onClick={() => {
-                    matchedOrders
-                      .filter(o => o.matched && o.id)
-                      .forEach(o => handleSubmit(o.id!, o.tracking_code))
-                  }}
+                  onClick={handleSubmitAll}
+                  disabled={processing}
                   className="w-full px-6 py-3 bg-gradient-to-r from-green-600 to-blue-600 text-white rounded-lg hover:from-green-700 hover:to-blue-700 transition font-medium text-lg"
                 >
                   🚀 ثبت همه کدهای رهگیری ({matchedCount})
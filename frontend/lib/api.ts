@@ -145,6 +145,22 @@ export const trackingAPI = {
     return handleResponse(response)
   },
 
+  // استخراج همزمان از چند PDF
+  async extractPDFBatch(files: File[]) {
+    const formData = new FormData()
+    files.forEach(file => formData.append('files', file))
+
+    const response = await fetch(`${API_BASE_URL}/tracking/extract-pdf-batch`, {
+      method: 'POST',
+      body: formData,
+      headers: {
+        ...(getAuthToken() ? { 'Authorization': `Bearer ${getAuthToken()}` } : {}),
+      },
+    })
+
+    return handleResponse(response)
+  },
+
   // تطبیق با دیتابیس
   async matchDatabase(trackingData: any[]) {
     const response = await fetch(`${API_BASE_URL}/tracking/match-database`, {
@@ -172,6 +188,17 @@ export const trackingAPI = {
 
     return handleResponse(response)
   },
+
+  // ثبت گروهی کدهای رهگیری
+  async submitBulk(items: { order_id: number; tracking_code: string }[], markDispatched = false) {
+    const response = await fetch(`${API_BASE_URL}/tracking/submit-bulk`, {
+      method: 'POST',
+      headers: getHeaders(),
+      body: JSON.stringify({ items, mark_dispatched: markDispatched }),
+    })
+
+    return handleResponse(response)
+  },
 }
 
 export const smsAPI = {
@@ -186,8 +213,8 @@ export const smsAPI = {
   },
 
   // سفارشات آماده
-  async getReadyOrders() {
-    const response = await fetch(`${API_BASE_URL}/sms/ready-orders`, {
+  async getReadyOrders(limit: number = 500, offset: number = 0) {
+    const response = await fetch(`${API_BASE_URL}/sms/ready-orders?limit=${limit}&offset=${offset}`, {
       method: 'GET',
       headers: getHeaders(),
     })
@@ -209,6 +236,16 @@ export const smsAPI = {
     return handleResponse(response)
   },
 
+  // وضعیت batch ارسال
+  async getBatch(batchId: string) {
+    const response = await fetch(`${API_BASE_URL}/sms/batches/${batchId}`, {
+      method: 'GET',
+      headers: getHeaders(),
+    })
+
+    return handleResponse(response)
+  },
+
   // تاریخچه
   async getLogs(limit: number = 100) {
     const response = await fetch(`${API_BASE_URL}/sms/logs?limit=${limit}`, {
@@ -18,6 +18,7 @@ st.set_page_config(layout="wide", page_title="ثبت رهگیری")
 
 try:
     from utils.tracking_core import extract_shipping_data_robust, send_tracking_code_to_api
+    from utils.shipment_mapping import iter_mapping_rows, ShipmentMatcher
     from utils.data_manager import save_database, load_database
 except ImportError as e:
     st.error(f"خطا در import: {e}")
@@ -51,22 +52,24 @@ if st.session_state.pdf_data is not None:
     st.subheader("مرحله ۲: آپلود اکسل")
     st.info("ستون A = کد سفارش، ستون B = شناسه محموله")
     
-    uploaded_excel = st.file_uploader("فایل اکسل", type=["xlsx", "xls"])
+    uploaded_excel = st.file_uploader("فایل اکسل", type=["xlsx", "xls", "csv"])
     
     if uploaded_excel:
-        excel_df = pd.read_excel(uploaded_excel, dtype=str)
-        excel_df = excel_df.iloc[:, [0, 1]]
-        excel_df.columns = ['کد سفارش', 'شناسه محموله']
+        pdf_df = st.session_state.pdf_data
+        pdf_rows = list(zip(pdf_df['شماره سفارش'], pdf_df['کد رهگیری']))
         
-        pdf_df = st.session_state.pdf_data.copy()
-        pdf_df['merge_key'] = pdf_df['شماره سفارش']
-        excel_df['merge_key'] = excel_df['کد سفارش'].str.extract(r'(\d{9})', expand=False)
+        # خواندن جریانی دو ستون اول و نگه داشتن فقط ردیف‌های مرتبط با رسید
+        matcher = ShipmentMatcher(order_code for order_code, _ in pdf_rows)
+        matcher.feed_all(iter_mapping_rows(uploaded_excel, uploaded_excel.name))
         
-        merged = pd.merge(pdf_df, excel_df, on='merge_key', how='inner')
+        merged = matcher.merge(pdf_rows, key_func=lambda row: row[0])
         
-        if not merged.empty:
-            final = merged[['کد سفارش', 'کد رهگیری', 'شناسه محموله']].copy()
-            final.columns = ['شماره سفارش', 'کد رهگیری', 'شناسه محموله']
+        if merged:
+            final = pd.DataFrame(
+                [(order_cell, tracking_code, shipment_cell)
+                 for (_, tracking_code), order_cell, shipment_cell in merged],
+                columns=['شماره سفارش', 'کد رهگیری', 'شناسه محموله']
+            )
             st.session_state.merged_data = final
             st.success(f"{len(final)} سفارش تطبیق یافت")
             st.dataframe(final, use_container_width=True)
@@ -9,8 +9,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from utils.sms_core import (
-    load_sent_orders, save_sent_order, check_kde_connect_cli, 
-    send_sms, overwrite_sent_orders, get_sms_template
+    sent_codes_among, save_sent_order, check_kde_connect_cli, 
+    send_sms, add_sent_orders, remove_sent_orders, is_order_sent, get_sms_template
 )
 from utils.constants import UNKNOWN_TRACKING_CODE
 from utils.data_manager import load_database
@@ -38,7 +38,6 @@ with tab1:
     if st.session_state.orders_df.empty:
         st.warning("ابتدا سفارشات را از صفحه مربوطه دریافت کنید.")
     else:
-        sent_codes = load_sent_orders()
         df = st.session_state.orders_df.copy()
         
         df_trackable = df[
@@ -46,6 +45,7 @@ with tab1:
             (df['کد رهگیری'] != '') &
             (df['کد رهگیری'] != UNKNOWN_TRACKING_CODE)
         ].copy()
+        sent_codes = sent_codes_among(df_trackable['کد رهگیری'])
 
         df_new = df_trackable[~df_trackable['کد رهگیری'].isin(sent_codes)]
         
@@ -82,7 +82,6 @@ with tab1:
 # --- تب ۲: ارسال دستی (کد کامل بازیابی شد) ---
 with tab2:
     st.subheader("ارسال دستی یک پیامک")
-    sent_codes = load_sent_orders()
     with st.form("manual_sms_form"):
         name = st.text_input("نام مشتری")
         phone = st.text_input("شماره تلفن")
@@ -91,7 +90,7 @@ with tab2:
         if submitted:
             if not all([name, phone, tracking]):
                 st.error("لطفاً تمام فیلدها را پر کنید.")
-            elif tracking in sent_codes:
+            elif is_order_sent(tracking):
                 st.warning("این کد رهگیری قبلاً در لیست ارسال شده‌ها بوده است.")
             else:
                 message = get_sms_template(name, tracking)
@@ -107,10 +106,10 @@ with tab3:
     st.subheader("مدیریت لیست ارسال (Exclusion List)")
     st.info("سفارشات را بین دو لیست جابجا کنید. سفارشاتی که در لیست 'ارسال شده‌ها' باشند، در تب 'ارسال خودکار' نمایش داده نخواهند شد.")
 
-    sent_codes = load_sent_orders()
     df = st.session_state.orders_df.copy()
     
     df_trackable = df[df['کد رهگیری'].notna() & (df['کد رهگیری'] != '') & (df['کد رهگیری'] != UNKNOWN_TRACKING_CODE)].copy()
+    sent_codes = sent_codes_among(df_trackable['کد رهگیری'])
     df_trackable['تاریخ میلادی'] = pd.to_datetime(df_trackable['تاریخ ثبت'].apply(persian_to_gregorian), errors='coerce')
 
     df_excluded = df_trackable[df_trackable['کد رهگیری'].isin(sent_codes)]
@@ -154,8 +153,7 @@ with tab3:
             if selected_sendable:
                 indices_to_move = [options_sendable[key] for key in selected_sendable]
                 codes_to_add = set(df_sendable_filtered.loc[indices_to_move]['کد رهگیری'].unique())
-                new_sent_codes = sent_codes.union(codes_to_add)
-                overwrite_sent_orders(new_sent_codes)
+                add_sent_orders(codes_to_add)
                 st.success(f"{len(codes_to_add)} سفارش به لیست ارسال شده‌ها اضافه شد.")
                 st.rerun()
         
@@ -163,8 +161,7 @@ with tab3:
             if 'selected_excluded' in st.session_state and st.session_state.selected_excluded:
                 indices_to_move = [st.session_state.options_excluded[key] for key in st.session_state.selected_excluded]
                 codes_to_remove = set(df_excluded.loc[indices_to_move]['کد رهگیری'].unique())
-                new_sent_codes = sent_codes.difference(codes_to_remove)
-                overwrite_sent_orders(new_sent_codes)
+                remove_sent_orders(codes_to_remove)
                 st.success(f"{len(codes_to_remove)} سفارش از لیست ارسال شده‌ها حذف شد.")
                 st.rerun()
 
@@ -0,0 +1,116 @@
+# scripts/benchmark_login.py
+"""
+بنچمارک توان ورود (/api/auth/login)
+
+تعدادی درخواست ورود همزمان به سرور در حال اجرا ارسال می‌کند و هم‌زمان
+زمان پاسخ یک endpoint سبک (/) را اندازه می‌گیرد تا مشخص شود هش bcrypt
+event loop را مسدود می‌کند یا نه.
+
+استفاده:
+    python scripts/benchmark_login.py --username admin --password admin123
+    python scripts/benchmark_login.py --requests 100 --concurrency 20 --url http://localhost:8000
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def login_once(url, username, password):
+    started = time.perf_counter()
+    response = requests.post(
+        f"{url}/api/auth/login",
+        data={"username": username, "password": password},
+        timeout=60
+    )
+    return time.perf_counter() - started, response.status_code
+
+
+def probe(url, stop_event, latencies):
+    """درخواست‌های پشت سر هم به / در طول بنچمارک"""
+    with requests.Session() as session:
+        while not stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                session.get(f"{url}/", timeout=60)
+            except requests.RequestException:
+                continue
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.02)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک توان ورود")
+    parser.add_argument("--url", default="http://localhost:8000", help="آدرس سرور")
+    parser.add_argument("--username", default="admin", help="نام کاربری")
+    parser.add_argument("--password", default="admin123", help="رمز عبور")
+    parser.add_argument("--requests", type=int, default=50, help="تعداد کل درخواست‌های ورود")
+    parser.add_argument("--concurrency", type=int, default=10, help="تعداد درخواست همزمان")
+    args = parser.parse_args()
+
+    try:
+        _, status = login_once(args.url, args.username, args.password)
+    except requests.RequestException as e:
+        print(f"❌ اتصال به سرور ممکن نیست: {e}")
+        return 1
+    if status != 200:
+        print(f"❌ ورود ناموفق بود (HTTP {status}) - نام کاربری و رمز را بررسی کنید")
+        return 1
+
+    # زمان پاسخ / بدون بار ورود
+    idle_latencies = []
+    stop_event = threading.Event()
+    prober = threading.Thread(target=probe, args=(args.url, stop_event, idle_latencies))
+    prober.start()
+    time.sleep(1)
+    stop_event.set()
+    prober.join()
+
+    busy_latencies = []
+    stop_event = threading.Event()
+    prober = threading.Thread(target=probe, args=(args.url, stop_event, busy_latencies))
+    prober.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda _: login_once(args.url, args.username, args.password),
+            range(args.requests)
+        ))
+    elapsed = time.perf_counter() - started
+
+    stop_event.set()
+    prober.join()
+
+    login_latencies = [latency for latency, _ in results]
+    failed = sum(1 for _, status in results if status != 200)
+
+    print(f"🔐 {args.requests} ورود با {args.concurrency} درخواست همزمان در {elapsed:.2f}s "
+          f"({args.requests / elapsed:.1f} ورود در ثانیه)")
+    print(f"   زمان ورود: میانه {statistics.median(login_latencies) * 1000:.0f}ms - "
+          f"p95 {percentile(login_latencies, 0.95) * 1000:.0f}ms")
+    if failed:
+        print(f"   ⚠️ {failed} درخواست ناموفق")
+
+    print(f"📡 زمان پاسخ / بدون بار: میانه {statistics.median(idle_latencies) * 1000:.0f}ms"
+          if idle_latencies else "📡 زمان پاسخ / بدون بار: -")
+    print(f"📡 زمان پاسخ / هنگام ورود: میانه {statistics.median(busy_latencies) * 1000:.0f}ms - "
+          f"بیشینه {max(busy_latencies) * 1000:.0f}ms ({len(busy_latencies)} درخواست)"
+          if busy_latencies else "📡 زمان پاسخ / هنگام ورود: -")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# scripts/benchmark_receipt_extraction.py
+"""
+مقایسه سرعت و نتیجه موتورهای استخراج رسید پستی
+
+استفاده:
+    python scripts/benchmark_receipt_extraction.py receipt1.pdf receipt2.pdf --runs 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# اضافه کردن مسیر backend به Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(os.path.dirname(current_dir), 'backend')
+sys.path.insert(0, backend_dir)
+
+from utils.receipt_extractor import extract_receipt
+
+
+def run_engine(pdf_path, engine, runs):
+    """اجرای چندباره یک موتور و برگرداندن بهترین زمان"""
+    best = None
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = extract_receipt(pdf_path, use_pool=False, engine=engine)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک استخراج رسید پستی")
+    parser.add_argument("pdfs", nargs="+", help="مسیر فایل‌های PDF رسید")
+    parser.add_argument("--runs", type=int, default=3, help="تعداد تکرار هر موتور")
+    args = parser.parse_args()
+
+    total_tables = 0
+    total_fast = 0
+    all_identical = True
+
+    print(f"{'فایل':<40} {'صفحات':>6} {'جدول(s)':>9} {'سریع(s)':>9} {'افزایش':>7} {'fallback':>9}  نتیجه")
+    for pdf_path in args.pdfs:
+        if not os.path.exists(pdf_path):
+            print(f"❌ فایل یافت نشد: {pdf_path}")
+            continue
+
+        tables_time, tables_result = run_engine(pdf_path, "tables", args.runs)
+        fast_time, fast_result = run_engine(pdf_path, "auto", args.runs)
+
+        identical = tables_result["pairs"] == fast_result["pairs"]
+        all_identical = all_identical and identical
+        total_tables += tables_time
+        total_fast += fast_time
+
+        print(
+            f"{os.path.basename(pdf_path):<40} {fast_result['pages']:>6} "
+            f"{tables_time:>9.3f} {fast_time:>9.3f} {tables_time / fast_time:>6.1f}x "
+            f"{fast_result['engine']['tables']:>9}  "
+            f"{'✅ یکسان' if identical else '❌ متفاوت'} ({len(fast_result['pairs'])} سفارش)"
+        )
+
+    if total_fast:
+        print(f"\n📊 مجموع: جدول {total_tables:.3f}s - سریع {total_fast:.3f}s ({total_tables / total_fast:.1f}x)")
+    print("✅ نتایج همه فایل‌ها یکسان است" if all_identical else "❌ نتایج برخی فایل‌ها متفاوت است")
+    return 0 if all_identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
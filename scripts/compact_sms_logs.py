@@ -0,0 +1,113 @@
+# scripts/compact_sms_logs.py
+"""
+فشرده‌سازی لاگ‌های قدیمی پیامک
+
+متن کامل لاگ‌هایی که دقیقاً از یکی از نسخه‌های قالب ساخته شده‌اند با شناسه
+قالب و پارامترها جایگزین می‌شود. لاگ‌هایی که با هیچ قالبی منطبق نیستند
+بدون تغییر باقی می‌مانند.
+
+استفاده:
+    python scripts/compact_sms_logs.py --dry-run
+    python scripts/compact_sms_logs.py --vacuum
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# اضافه کردن مسیر backend به Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(os.path.dirname(current_dir), 'backend')
+sys.path.insert(0, backend_dir)
+
+from sqlalchemy import text
+
+from database.models import SMSLog, SMSTemplate, init_database, get_session
+# ثبت جداول کاربران و انبار در Base (کلیدهای خارجی orders به آن‌ها اشاره می‌کنند)
+import database.auth_models  # noqa: F401
+import database.warehouse_models_extended  # noqa: F401
+from services.sms_templates import get_active_template, match_template, template_pattern
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(current_dir), 'data', 'digikala_sales.db')
+CHUNK_SIZE = 1000
+
+
+def compact(db, dry_run: bool = False) -> dict:
+    get_active_template(db)
+    templates = db.query(SMSTemplate).order_by(SMSTemplate.version.desc()).all()
+    patterns = [(template, template_pattern(template)) for template in templates]
+
+    stats = {"scanned": 0, "compacted": 0, "unmatched": 0, "bytes_saved": 0}
+    last_id = 0
+
+    while True:
+        logs = db.query(SMSLog).filter(
+            SMSLog.id > last_id,
+            SMSLog.message.isnot(None)
+        ).order_by(SMSLog.id).limit(CHUNK_SIZE).all()
+        if not logs:
+            break
+
+        for log in logs:
+            last_id = log.id
+            stats["scanned"] += 1
+
+            for template, pattern in patterns:
+                params = match_template(template, pattern, log.message, log.tracking_code)
+                if params is None:
+                    continue
+
+                encoded = json.dumps(params, ensure_ascii=False) if params else None
+                stats["compacted"] += 1
+                stats["bytes_saved"] += len(log.message.encode('utf-8')) - len((encoded or '').encode('utf-8'))
+                if not dry_run:
+                    log.template_id = template.id
+                    log.params = encoded
+                    log.message = None
+                break
+            else:
+                stats["unmatched"] += 1
+
+        if dry_run:
+            db.expunge_all()
+        else:
+            db.commit()
+        print(f"  ... {stats['scanned']} لاگ بررسی شد")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="فشرده‌سازی لاگ‌های پیامک")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="مسیر دیتابیس")
+    parser.add_argument("--dry-run", action="store_true", help="فقط گزارش، بدون تغییر")
+    parser.add_argument("--vacuum", action="store_true", help="اجرای VACUUM پس از فشرده‌سازی")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ دیتابیس یافت نشد: {args.db}")
+        return 1
+
+    engine = init_database(args.db)
+    db = get_session(engine)
+    try:
+        stats = compact(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    print(f"\n📊 بررسی شده: {stats['scanned']} - فشرده شده: {stats['compacted']} - "
+          f"بدون قالب منطبق: {stats['unmatched']}")
+    print(f"💾 حجم متن آزاد شده: {stats['bytes_saved'] / 1024:.1f} KB"
+          + (" (حالت آزمایشی)" if args.dry_run else ""))
+
+    if args.vacuum and not args.dry_run:
+        print("🧹 اجرای VACUUM...")
+        with engine.connect() as connection:
+            connection.execute(text("VACUUM"))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
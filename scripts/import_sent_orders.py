@@ -0,0 +1,121 @@
+# scripts/import_sent_orders.py
+"""
+انتقال یک‌باره sent_orders.txt به جدول sent_tracking_codes
+
+کدهای رهگیری فایل قدیمی (و در صورت درخواست، کدهای پیامک‌های موفق SMSLog)
+به جدول مشترک منتقل می‌شوند. کدهای تکراری نادیده گرفته می‌شوند، بنابراین
+اجرای دوباره اسکریپت بی‌خطر است.
+
+استفاده:
+    python scripts/import_sent_orders.py
+    python scripts/import_sent_orders.py --file sent_orders.txt --include-sms-logs --archive
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# اضافه کردن مسیر backend به Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(current_dir)
+backend_dir = os.path.join(project_dir, 'backend')
+sys.path.insert(0, backend_dir)
+
+from sqlalchemy import insert
+
+from database.models import Order, SMSLog, SentTrackingCode, init_database, get_session
+# ثبت جداول کاربران و انبار در Base (کلیدهای خارجی orders به آن‌ها اشاره می‌کنند)
+import database.auth_models  # noqa: F401
+import database.warehouse_models_extended  # noqa: F401
+
+DEFAULT_DB_PATH = os.path.join(project_dir, 'data', 'digikala_sales.db')
+DEFAULT_FILE_PATH = os.path.join(project_dir, 'sent_orders.txt')
+CHUNK_SIZE = 500
+
+
+def read_sent_file(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def order_ids_by_tracking(db, codes: list) -> dict:
+    """شناسه سفارش هر کد رهگیری با کوئری‌های IN تکه‌تکه"""
+    result = {}
+    for start in range(0, len(codes), CHUNK_SIZE):
+        chunk = codes[start:start + CHUNK_SIZE]
+        for order_id, tracking_code in db.query(Order.id, Order.tracking_code).filter(
+            Order.tracking_code.in_(chunk)
+        ):
+            result.setdefault(tracking_code, order_id)
+    return result
+
+
+def import_codes(db, codes: list, source: str) -> int:
+    """درج کدها با INSERT OR IGNORE؛ تعداد ردیف‌های جدید"""
+    if not codes:
+        return 0
+
+    order_ids = order_ids_by_tracking(db, codes)
+    now = datetime.utcnow()
+    before = db.query(SentTrackingCode).count()
+
+    for start in range(0, len(codes), CHUNK_SIZE):
+        chunk = codes[start:start + CHUNK_SIZE]
+        db.execute(
+            insert(SentTrackingCode).prefix_with("OR IGNORE"),
+            [{"tracking_code": code, "order_id": order_ids.get(code), "source": source, "sent_at": now}
+             for code in chunk]
+        )
+    db.commit()
+
+    return db.query(SentTrackingCode).count() - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="انتقال sent_orders.txt به دیتابیس")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="مسیر دیتابیس")
+    parser.add_argument("--file", default=DEFAULT_FILE_PATH, help="مسیر فایل sent_orders.txt")
+    parser.add_argument("--include-sms-logs", action="store_true",
+                        help="افزودن کدهای پیامک‌های موفق ثبت شده در SMSLog")
+    parser.add_argument("--archive", action="store_true",
+                        help="تغییر نام فایل قدیمی به .imported پس از انتقال")
+    args = parser.parse_args()
+
+    engine = init_database(args.db)
+    db = get_session(engine)
+
+    try:
+        if os.path.exists(args.file):
+            codes = read_sent_file(args.file)
+            added = import_codes(db, codes, "import")
+            print(f"📄 {len(codes)} کد در فایل - {added} کد جدید وارد شد")
+        else:
+            print(f"⚠️ فایل یافت نشد: {args.file}")
+            codes = None
+
+        if args.include_sms_logs:
+            log_codes = [
+                row.tracking_code for row in db.query(SMSLog.tracking_code).filter(
+                    SMSLog.is_successful == True,
+                    SMSLog.tracking_code.isnot(None),
+                    SMSLog.tracking_code != ''
+                ).distinct()
+            ]
+            added = import_codes(db, log_codes, "backend")
+            print(f"📨 {len(log_codes)} کد در SMSLog - {added} کد جدید وارد شد")
+
+        print(f"✅ مجموع کدهای ثبت شده: {db.query(SentTrackingCode).count()}")
+    finally:
+        db.close()
+
+    if args.archive and codes is not None:
+        archived = args.file + ".imported"
+        os.replace(args.file, archived)
+        print(f"🗄️ فایل قدیمی به {archived} منتقل شد")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
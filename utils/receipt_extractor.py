@@ -0,0 +1,296 @@
+# utils/receipt_extractor.py
+"""
+استخراج جفت‌های (کد سفارش، کد رهگیری) از PDF رسیدهای پستی
+
+صفحات هر فایل به چند بخش تقسیم شده و در یک process pool استخراج می‌شوند.
+workerها فقط ردیف‌های پاکسازی شده را برمی‌گردانند و پردازش ردیف‌ها
+(تشخیص شماره ردیف و کدها) به ترتیب صفحات در پروسه اصلی انجام می‌شود؛
+بنابراین نتیجه دقیقاً مشابه پردازش ترتیبی است.
+
+موتور سریع (words) ردیف‌ها را از روی کلمات و موقعیت عمودی آن‌ها می‌سازد
+و فقط اگر بررسی‌های اطمینان رد شوند، برای همان صفحه به extract_tables()
+برمی‌گردد.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+# نسخه منطق استخراج - با هر تغییر در نتیجه استخراج باید افزایش یابد
+# (نتایج ذخیره شده با نسخه قدیمی‌تر دوباره استخراج می‌شوند)
+RECEIPT_EXTRACTOR_VERSION = "2"
+
+# تعداد پروسه‌های استخراج و تعداد صفحات هر بخش
+RECEIPT_EXTRACT_WORKERS = int(os.getenv("RECEIPT_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+RECEIPT_PAGES_PER_TASK = int(os.getenv("RECEIPT_PAGES_PER_TASK", "4"))
+
+# موتور استخراج: auto (کلمات + بازگشت به جدول) یا tables (فقط جدول)
+RECEIPT_EXTRACT_ENGINE = os.getenv("RECEIPT_EXTRACT_ENGINE", "auto")
+RECEIPT_ENGINES = ("auto", "tables")
+
+TRACKING_PATTERN = re.compile(r'^\d{24}$')
+ORDER_PATTERN = re.compile(r'\b(\d{9})\b')
+ROW_NUM_PATTERN = re.compile(r'^\d{1,2}$')
+LONG_DIGITS_PATTERN = re.compile(r'^\d{13,}$')
+
+# فاصله مجاز (pt) برای تشخیص ستون شماره ردیف
+ROW_COLUMN_TOLERANCE = 15
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """process pool مشترک استخراج (در اولین استفاده ساخته می‌شود)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RECEIPT_EXTRACT_WORKERS)
+        return _pool
+
+
+def _reset_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def shutdown_process_pool():
+    """بستن process pool هنگام خاموش شدن سرور"""
+    _reset_process_pool()
+
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def page_rows_tables(page, min_columns: int = 0) -> list:
+    """ردیف‌های پاکسازی شده جداول یک صفحه (روش کامل و کند)"""
+    rows = []
+    tables = page.extract_tables()
+    if not tables:
+        return rows
+
+    for table in tables:
+        if not table or len(table[0]) < min_columns:
+            continue
+
+        for row in table:
+            if not row:
+                continue
+            rows.append([cell.strip() if cell else "" for cell in row])
+    return rows
+
+
+def page_rows_words(page):
+    """
+    ساخت ردیف‌های مصنوعی [کد سفارش، کد رهگیری، شماره ردیف] از کلمات صفحه
+
+    شماره‌های ردیف (ستون سمت راست) لنگر هستند و هر کد به ردیفی نسبت داده
+    می‌شود که در محدوده عمودی آن قرار دارد.
+
+    Returns:
+        لیست ردیف‌ها، یا None اگر نتیجه قابل اطمینان نباشد
+    """
+    words = page.extract_words()
+    if not words:
+        return []
+
+    # کد رهگیری شکسته شده (مثلاً با فاصله) فقط با روش جدول درست خوانده می‌شود
+    for word in words:
+        text = word['text']
+        if LONG_DIGITS_PATTERN.match(text) and not TRACKING_PATTERN.match(text):
+            return None
+
+    candidates = [w for w in words if ROW_NUM_PATTERN.match(w['text'])]
+    codes = []
+    for word in words:
+        if TRACKING_PATTERN.match(word['text']):
+            codes.append(('tracking', word['text'], word))
+        order_match = ORDER_PATTERN.search(word['text'])
+        if order_match:
+            codes.append(('order', order_match.group(1), word))
+
+    if not codes:
+        return []
+    if not candidates:
+        return None
+
+    # لنگرها: اعداد کوچک در راست‌ترین ستون
+    right_edge = max(w['x1'] for w in candidates)
+    anchors = sorted(
+        (w for w in candidates if w['x1'] >= right_edge - ROW_COLUMN_TOLERANCE),
+        key=lambda w: w['top']
+    )
+
+    # شماره ردیف‌ها باید پشت سر هم باشند
+    numbers = [int(w['text']) for w in anchors]
+    for previous, current in zip(numbers, numbers[1:]):
+        if current != previous + 1:
+            return None
+
+    centers = [(w['top'] + w['bottom']) / 2 for w in anchors]
+    if len(centers) > 1:
+        first_top = centers[0] - (centers[1] - centers[0]) / 2
+    else:
+        first_top = anchors[0]['top'] - (anchors[0]['bottom'] - anchors[0]['top']) * 2
+    boundaries = [(a + b) / 2 for a, b in zip(centers, centers[1:])]
+
+    bands = [{'tracking': set(), 'order': set()} for _ in anchors]
+    for kind, value, word in codes:
+        center = (word['top'] + word['bottom']) / 2
+        # کد بالاتر از اولین ردیف ممکن است متعلق به صفحه قبل یا سربرگ باشد
+        if center < first_top:
+            return None
+        index = sum(1 for boundary in boundaries if center >= boundary)
+        bands[index][kind].add(value)
+
+    rows = []
+    for anchor, band in zip(anchors, bands):
+        if len(band['tracking']) > 1 or len(band['order']) > 1:
+            return None
+        if bool(band['tracking']) != bool(band['order']):
+            return None
+
+        order_code = next(iter(band['order']), "")
+        tracking_code = next(iter(band['tracking']), "")
+        rows.append([order_code, tracking_code, anchor['text']])
+    return rows
+
+
+def extract_page_rows(pdf, page_indices, engine: str = RECEIPT_EXTRACT_ENGINE, min_table_columns: int = 0):
+    """
+    استخراج ردیف‌های صفحات مشخص شده از یک PDF باز
+
+    Returns:
+        (rows, stats) که stats تعداد صفحات هر موتور را نشان می‌دهد
+    """
+    rows = []
+    stats = {"fast": 0, "tables": 0}
+    for index in page_indices:
+        page = pdf.pages[index]
+        page_rows = page_rows_words(page) if engine == "auto" else None
+
+        if page_rows is None:
+            page_rows = page_rows_tables(page, min_table_columns)
+            stats["tables"] += 1
+        else:
+            stats["fast"] += 1
+
+        rows.extend(page_rows)
+        # آزاد کردن کش اشیای صفحه
+        page.flush_cache()
+    return rows, stats
+
+
+def extract_table_rows(pdf_path: str, page_indices, engine: str = RECEIPT_EXTRACT_ENGINE):
+    """استخراج ردیف‌های صفحات مشخص شده از فایل (اجرا در worker)"""
+    with pdfplumber.open(pdf_path) as pdf:
+        return extract_page_rows(pdf, page_indices, engine)
+
+
+def fold_rows(rows, records=None, last_row_num=None):
+    """
+    تخصیص کدهای یافت شده به آخرین شماره ردیف دیده شده
+
+    Returns:
+        (records, last_row_num) تا پردازش بخش بعدی از همان نقطه ادامه یابد
+    """
+    if records is None:
+        records = defaultdict(dict)
+
+    for cleaned_row in rows:
+        # شناسایی شماره ردیف
+        if cleaned_row and ROW_NUM_PATTERN.match(cleaned_row[-1]):
+            last_row_num = cleaned_row[-1]
+
+        # جستجو برای کدها
+        if last_row_num:
+            for cell in cleaned_row:
+                if TRACKING_PATTERN.match(cell):
+                    records[last_row_num]['کد رهگیری'] = cell
+
+                order_match = ORDER_PATTERN.search(cell)
+                if order_match:
+                    records[last_row_num]['شماره سفارش'] = order_match.group(1)
+
+    return records, last_row_num
+
+
+def records_to_pairs(records) -> list:
+    """تبدیل رکوردها به لیست جفت‌ها (به ترتیب رشته‌ای شماره ردیف)"""
+    results = []
+    for row_num, data in sorted(records.items()):
+        if 'کد رهگیری' in data and 'شماره سفارش' in data:
+            results.append({
+                "order_code": data['شماره سفارش'],
+                "tracking_code": data['کد رهگیری']
+            })
+    return results
+
+
+def dedupe_pairs(pairs, seen=None) -> list:
+    """حذف جفت‌های تکراری با حفظ ترتیب اولین رخداد"""
+    if seen is None:
+        seen = set()
+
+    unique = []
+    for item in pairs:
+        key = (item["order_code"], item["tracking_code"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+def page_chunks(page_count: int, pages_per_task: int = RECEIPT_PAGES_PER_TASK) -> list:
+    size = max(1, pages_per_task)
+    return [list(range(start, min(start + size, page_count))) for start in range(0, page_count, size)]
+
+
+def extract_receipt(pdf_path: str, use_pool: bool = True, engine: str = RECEIPT_EXTRACT_ENGINE) -> dict:
+    """
+    استخراج کامل یک رسید پستی (فراخوانی همگام - خارج از event loop اجرا شود)
+
+    Returns:
+        dict شامل pairs (بدون تکرار)، pages، seconds و engine (تعداد صفحات هر موتور)
+    """
+    started = time.perf_counter()
+    page_count = count_pages(pdf_path)
+    chunks = page_chunks(page_count)
+
+    if use_pool and len(chunks) > 1:
+        try:
+            pool = get_process_pool()
+            futures = [pool.submit(extract_table_rows, pdf_path, chunk, engine) for chunk in chunks]
+            chunk_results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            print("⚠️ process pool استخراج از کار افتاد - اجرای ترتیبی")
+            _reset_process_pool()
+            chunk_results = [extract_table_rows(pdf_path, chunk, engine) for chunk in chunks]
+    else:
+        chunk_results = [extract_table_rows(pdf_path, chunk, engine) for chunk in chunks]
+
+    # پردازش ترتیبی ردیف‌ها (شماره ردیف از صفحه قبل به صفحه بعد منتقل می‌شود)
+    records, last_row_num = defaultdict(dict), None
+    engine_stats = {"fast": 0, "tables": 0}
+    for rows, stats in chunk_results:
+        records, last_row_num = fold_rows(rows, records, last_row_num)
+        for key, value in stats.items():
+            engine_stats[key] += value
+
+    return {
+        "pairs": dedupe_pairs(records_to_pairs(records)),
+        "pages": page_count,
+        "seconds": round(time.perf_counter() - started, 3),
+        "engine": engine_stats,
+    }
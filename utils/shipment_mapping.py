@@ -0,0 +1,250 @@
+# utils/shipment_mapping.py
+"""
+خواندن جریانی فایل نگاشت سفارش به شناسه محموله (Excel / CSV)
+
+فقط دو ستون اول (A = کد سفارش، B = شناسه محموله) خوانده می‌شود؛ XML شیت
+xlsx ردیف به ردیف پیمایش شده و سلول‌های سایر ستون‌ها اصلاً تبدیل نمی‌شوند.
+فقط ردیف‌هایی که کدشان در لیست رسید وجود دارد در حافظه نگه داشته می‌شوند.
+"""
+
+import csv
+import io
+import os
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse, parse
+
+ORDER_KEY_PATTERN = re.compile(r'(\d{9})')
+CELL_COLUMN_PATTERN = re.compile(r'^([A-Z]+)')
+
+_REL_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+CSV_EXTENSIONS = (".csv",)
+LEGACY_EXCEL_EXTENSIONS = (".xls",)
+
+
+def _cell_to_str(value):
+    """تبدیل مقدار سلول به رشته - مشابه pd.read_excel(dtype=str)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _local(tag: str) -> str:
+    """نام تگ بدون namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _first_sheet_path(archive: zipfile.ZipFile) -> str:
+    """مسیر XML اولین شیت (مانند pandas: اولین شیت، نه لزوماً شیت فعال)"""
+    workbook = parse(archive.open('xl/workbook.xml')).getroot()
+    first_sheet = next(el for el in workbook.iter() if _local(el.tag) == 'sheet')
+    rel_id = first_sheet.get(_REL_ID)
+
+    rels = parse(archive.open('xl/_rels/workbook.xml.rels')).getroot()
+    target = next(el.get('Target') for el in rels if el.get('Id') == rel_id)
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join('xl', target))
+
+
+def _shared_strings(archive: zipfile.ZipFile) -> list:
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+
+    strings = []
+    for _, element in iterparse(archive.open('xl/sharedStrings.xml')):
+        if _local(element.tag) == 'si':
+            strings.append(''.join(
+                node.text or '' for node in element.iter() if _local(node.tag) == 't'
+            ))
+            element.clear()
+    return strings
+
+
+def _xml_cell_value(cell, shared_strings):
+    """مقدار یک سلول XML - مشابه تبدیل openpyxl/pandas"""
+    cell_type = cell.get('t', 'n')
+    value = None
+    for child in cell:
+        name = _local(child.tag)
+        if name == 'v':
+            value = child.text
+        elif name == 'is':
+            value = ''.join(node.text or '' for node in child.iter() if _local(node.tag) == 't')
+
+    if value is None:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return str(value == '1')
+    if cell_type == 'n':
+        if any(ch in value for ch in '.eE'):
+            return _cell_to_str(float(value))
+        return str(int(value))
+    return value
+
+
+def _iter_xlsx_xml(source):
+    """پیمایش سریع دو ستون اول با iterparse روی XML شیت"""
+    with zipfile.ZipFile(source) as archive:
+        shared_strings = _shared_strings(archive)
+        header_skipped = False
+
+        for _, element in iterparse(archive.open(_first_sheet_path(archive))):
+            if _local(element.tag) != 'row':
+                continue
+
+            if not header_skipped:
+                header_skipped = True
+                element.clear()
+                continue
+
+            values = [None, None]
+            for position, cell in enumerate(element):
+                reference = cell.get('r')
+                if reference:
+                    column = CELL_COLUMN_PATTERN.match(reference).group(1)
+                    index = {'A': 0, 'B': 1}.get(column)
+                else:
+                    index = position if position < 2 else None
+                if index is not None:
+                    values[index] = _xml_cell_value(cell, shared_strings)
+
+            element.clear()
+            yield values[0], values[1]
+
+
+def _iter_xlsx_openpyxl(source):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for row in sheet.iter_rows(min_row=2, max_col=2, values_only=True):
+            row = tuple(row) + (None,) * (2 - len(row))
+            yield _cell_to_str(row[0]), _cell_to_str(row[1])
+    finally:
+        workbook.close()
+
+
+def _iter_xlsx(source):
+    """xlsx: پیمایش مستقیم XML؛ در صورت ساختار غیرمعمول، openpyxl در حالت read-only"""
+    try:
+        rows = _iter_xlsx_xml(source)
+        first = next(rows, None)
+    except (KeyError, StopIteration, ValueError, zipfile.BadZipFile) as e:
+        print(f"⚠️ خواندن مستقیم XML ناموفق بود، استفاده از openpyxl: {e}")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        yield from _iter_xlsx_openpyxl(source)
+        return
+
+    if first is None:
+        return
+    yield first
+    yield from rows
+
+
+def _iter_csv(source):
+    if isinstance(source, (str, os.PathLike)):
+        stream = open(source, 'r', encoding='utf-8-sig', newline='')
+    else:
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+
+    try:
+        reader = csv.reader(stream)
+        next(reader, None)  # سطر عنوان
+        for row in reader:
+            if not row:
+                continue
+            order_cell = row[0] if len(row) > 0 and row[0] != '' else None
+            shipment_cell = row[1] if len(row) > 1 and row[1] != '' else None
+            yield order_cell, shipment_cell
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            stream.close()
+        else:
+            stream.detach()
+
+
+def _iter_legacy_excel(source):
+    """فایل‌های xls قدیمی حالت جریانی ندارند - خواندن با pandas"""
+    import pandas as pd
+
+    df = pd.read_excel(source, dtype=str, usecols=[0, 1])
+    for order_cell, shipment_cell in df.itertuples(index=False, name=None):
+        yield (
+            None if pd.isna(order_cell) else order_cell,
+            None if pd.isna(shipment_cell) else shipment_cell,
+        )
+
+
+def iter_mapping_rows(source, filename: str):
+    """
+    پیمایش ردیف‌های (کد سفارش، شناسه محموله) بدون سطر عنوان
+
+    Args:
+        source: مسیر فایل یا شیء فایل باینری
+        filename: نام فایل برای تشخیص فرمت
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in CSV_EXTENSIONS:
+        return _iter_csv(source)
+    if extension in LEGACY_EXCEL_EXTENSIONS:
+        return _iter_legacy_excel(source)
+    return _iter_xlsx(source)
+
+
+class ShipmentMatcher:
+    """
+    تطبیق تدریجی ردیف‌های فایل نگاشت با کدهای سفارش رسید
+
+    ترتیب خروجی merge مشابه pd.merge(..., how='inner') است: به ترتیب ردیف‌های
+    رسید و برای هر ردیف، ردیف‌های منطبق فایل به ترتیب خودشان.
+    """
+
+    def __init__(self, wanted_keys):
+        self.wanted_keys = set(wanted_keys)
+        self.matches = {}
+        self.rows_read = 0
+        self.rows_with_key = 0
+
+    def feed(self, order_cell, shipment_cell):
+        self.rows_read += 1
+        if order_cell is None:
+            return
+
+        key_match = ORDER_KEY_PATTERN.search(order_cell)
+        if not key_match:
+            return
+
+        self.rows_with_key += 1
+        key = key_match.group(1)
+        if key in self.wanted_keys:
+            self.matches.setdefault(key, []).append((order_cell, shipment_cell))
+
+    def feed_all(self, rows):
+        for order_cell, shipment_cell in rows:
+            self.feed(order_cell, shipment_cell)
+        return self
+
+    @property
+    def matched_keys(self) -> set:
+        return set(self.matches)
+
+    def merge(self, left_rows, key_func):
+        """
+        Returns:
+            لیست (ردیف رسید، کد سفارش فایل، شناسه محموله)
+        """
+        merged = []
+        for left in left_rows:
+            for order_cell, shipment_cell in self.matches.get(key_func(left), ()):
+                merged.append((left, order_cell, shipment_cell))
+        return merged
@@ -1,36 +1,128 @@
 # utils/sms_core.py
 
 import subprocess
+import sqlite3
 import streamlit as st
 import os
-from typing import Tuple, Set
-from utils.constants import DEVICE_ID, KDECONNECT_CLI_PATH, SENT_ORDERS_FILE, COMPANY_NAME
+import time
+from contextlib import closing
+from datetime import datetime
+from typing import Iterable, Tuple, Set
+from utils.constants import DEVICE_ID, KDECONNECT_CLI_PATH, SALES_DB_FILE, COMPANY_NAME
 
 # --- توابع مدیریت سوابق ارسال ---
+# سوابق در جدول sent_tracking_codes دیتابیس مشترک با backend نگهداری می‌شود
+# (کلید اصلی = کد رهگیری). فایل قدیمی sent_orders.txt با
+# scripts/import_sent_orders.py یک بار به این جدول منتقل می‌شود.
+
+SENT_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS sent_tracking_codes (
+    tracking_code VARCHAR(50) NOT NULL PRIMARY KEY,
+    order_id INTEGER REFERENCES orders(id),
+    source VARCHAR(20),
+    sent_at DATETIME
+)
+"""
+
+def _connect_sent_db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(SALES_DB_FILE) or ".", exist_ok=True)
+    conn = sqlite3.connect(SALES_DB_FILE, timeout=10)
+    conn.execute(SENT_TABLE_DDL)
+    return conn
+
 def load_sent_orders() -> Set[str]:
-    if not os.path.exists(SENT_ORDERS_FILE):
-        return set()
     try:
-        with open(SENT_ORDERS_FILE, "r", encoding="utf-8") as f:
-            return {line.strip() for line in f if line.strip()}
+        with closing(_connect_sent_db()) as conn:
+            return {row[0] for row in conn.execute("SELECT tracking_code FROM sent_tracking_codes")}
     except Exception as e:
-        st.error(f"خطا در خواندن فایل سوابق ارسال: {e}")
+        st.error(f"خطا در خواندن سوابق ارسال: {e}")
         return set()
 
+# حداکثر تعداد پارامتر در هر کوئری IN (محدودیت متغیرهای SQLite)
+SENT_QUERY_CHUNK_SIZE = 500
+
+def sent_codes_among(tracking_codes: Iterable[str]) -> Set[str]:
+    """کدهای رهگیری ارسال شده از میان کدهای داده شده (جستجوی ایندکس‌دار به صورت دسته‌ای)"""
+    codes = list({str(code) for code in tracking_codes if str(code).strip()})
+    sent = set()
+    try:
+        with closing(_connect_sent_db()) as conn:
+            for start in range(0, len(codes), SENT_QUERY_CHUNK_SIZE):
+                chunk = codes[start:start + SENT_QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                sent.update(row[0] for row in conn.execute(
+                    f"SELECT tracking_code FROM sent_tracking_codes WHERE tracking_code IN ({placeholders})",
+                    chunk
+                ))
+    except Exception as e:
+        st.error(f"خطا در خواندن سوابق ارسال: {e}")
+    return sent
+
+def is_order_sent(tracking_code: str) -> bool:
+    """بررسی ارسال یک کد رهگیری با جستجوی ایندکس‌دار"""
+    with closing(_connect_sent_db()) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM sent_tracking_codes WHERE tracking_code = ?", (str(tracking_code),)
+        ).fetchone()
+    return row is not None
+
+def add_sent_orders(tracking_codes: Iterable[str], source: str = "streamlit") -> int:
+    now = datetime.utcnow().isoformat(sep=" ")
+    with closing(_connect_sent_db()) as conn, conn:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO sent_tracking_codes (tracking_code, source, sent_at) VALUES (?, ?, ?)",
+            [(str(code), source, now) for code in tracking_codes if str(code).strip()]
+        )
+        return cursor.rowcount
+
+def remove_sent_orders(tracking_codes: Iterable[str]) -> int:
+    with closing(_connect_sent_db()) as conn, conn:
+        cursor = conn.executemany(
+            "DELETE FROM sent_tracking_codes WHERE tracking_code = ?",
+            [(str(code),) for code in tracking_codes]
+        )
+        return cursor.rowcount
+
 def save_sent_order(tracking_code: str):
-    with open(SENT_ORDERS_FILE, "a", encoding="utf-8") as f:
-        f.write(str(tracking_code) + "\n")
+    add_sent_orders([tracking_code])
 
 def overwrite_sent_orders(sent_codes: Set[str]):
+    """همگام‌سازی جدول با مجموعه داده شده (فقط تفاوت‌ها نوشته می‌شوند)"""
     try:
-        with open(SENT_ORDERS_FILE, "w", encoding="utf-8") as f:
-            for code in sorted(list(sent_codes)):
-                f.write(code + "\n")
+        current = load_sent_orders()
+        remove_sent_orders(current - set(sent_codes))
+        add_sent_orders(set(sent_codes) - current)
     except Exception as e:
-        st.error(f"خطا در ذخیره‌سازی فایل سوابق ارسال: {e}")
+        st.error(f"خطا در ذخیره‌سازی سوابق ارسال: {e}")
 
 # --- توابع KDE Connect (با منطق تست اتصال کاملاً جدید) ---
-def check_kde_connect_cli() -> Tuple[bool, str]:
+
+# نتیجه آخرین پینگ تا این مدت (ثانیه) معتبر است؛ خطای ارسال آن را باطل می‌کند
+KDE_STATUS_TTL_SECONDS = 60
+KDE_STATUS_FAILURE_TTL_SECONDS = 10
+_kde_status_cache = {"checked_at": 0.0, "result": None}
+
+def invalidate_kde_status():
+    _kde_status_cache["checked_at"] = 0.0
+    _kde_status_cache["result"] = None
+
+def check_kde_connect_cli(force: bool = False) -> Tuple[bool, str]:
+    """
+    وضعیت اتصال KDE Connect از کش؛ پینگ فقط وقتی اجرا می‌شود که نتیجه قبلی منقضی
+    یا باطل شده باشد (یا force=True).
+    """
+    cached = _kde_status_cache["result"]
+    if not force and cached is not None:
+        ttl = KDE_STATUS_TTL_SECONDS if cached[0] else KDE_STATUS_FAILURE_TTL_SECONDS
+        if time.monotonic() - _kde_status_cache["checked_at"] < ttl:
+            return cached
+
+    result = _ping_kde_connect()
+    _kde_status_cache["result"] = result
+    _kde_status_cache["checked_at"] = time.monotonic()
+    return result
+
+def _ping_kde_connect() -> Tuple[bool, str]:
     """
     ارتباط با KDE Connect را با بررسی exit-code دستور پینگ چک می‌کند (روش قابل اطمینان‌تر).
     """
@@ -73,8 +165,10 @@ def send_sms(phone_number: str, message: str, dry_run: bool = False) -> Tuple[bo
         subprocess.run(command, check=True, capture_output=True, timeout=15)
         return True, f"پیامک برای {phone_number} با موفقیت ارسال شد."
     except subprocess.CalledProcessError as e:
+        invalidate_kde_status()
         return False, f"خطا در اجرای دستور ارسال: {e.stderr.decode('utf-8', errors='ignore').strip()}"
     except Exception as e:
+        invalidate_kde_status()
         return False, f"خطایی ناشناخته در زمان ارسال: {e}"
 
 def get_sms_template(customer_name: str, tracking_code: str) -> str: